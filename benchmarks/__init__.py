@@ -0,0 +1,4 @@
+"""
+Benchmarks of the pipeline. They run offline, against a local stand-in of the organizations' websites, and never touch
+the project's database, logs or downloads: each run works in its own temporary directory (see `sandbox.py`).
+"""
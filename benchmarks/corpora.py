@@ -0,0 +1,91 @@
+"""
+Realistic inputs of the helpers of `src/common.py`, built from values seen on the organizations' websites: publication
+titles in several languages, language labels of UNDP/UN pages and unusual urls.
+"""
+
+# Titles of publications (UN languages and a few others)
+TITLES = [
+    "Human Development Report 2021-22: Uncertain Times, Unsettled Lives",
+    "2020 ASDR - EXECUTIVE SUMMARY (ENGLISH)",
+    "Rapport sur le développement humain 2021/2022 : Temps incertains, vies bouleversées",
+    "Informe sobre Desarrollo Humano 2021/2022: Tiempos inciertos, vidas inestables",
+    "Доклад о человеческом развитии 2021/2022",
+    "تقرير التنمية البشرية 2021/2022: زمن بلا يقين، حياة بلا استقرار",
+    "2021/2022年人类发展报告：不确定的时代，不稳定的生活",
+    "Gender Equality Strategy 2022-2025 (French version)",
+    "Climate Promise: Progress Report - Version française",
+    "Digital Strategy 2022-2025 (ESP)",
+    "Africa Sustainable Development Report 2022 (ARB)",
+    "Youth Employment in the Sahel | Emploi des jeunes au Sahel",
+    "COVID-19 Socio-Economic Impact Assessment: Lebanon\t\n",
+    "  Annual Report 2019  ",
+    "Rapport annuel 2022 - Deutsch Zusammenfassung",
+    "Lessons from the Pacific: Resilience & Recovery, Vol. 2, No. 3",
+    "Evaluation of UNDP Support to Energy Access and Transition (Russian)",
+    "Guía práctica para la igualdad de género en el sector público",
+    "Renforcer la résilience face aux changements climatiques au Niger",
+    "A/RES/70/1 Transforming our world: the 2030 Agenda for Sustainable Development",
+    "E/CN.3/2023/2 Report of the Secretary-General (chn)",
+    "Policy brief: Informal economy and social protection in the Arab States",
+    "National Human Development Report Bangladesh 2023 - Summary in English",
+    "Financing the SDGs in LDCs: The role of blended finance " * 3,
+]
+
+# Language labels, as they appear on the publication pages (UNDP's download modal, UN digital library, ...)
+LANGUAGES = [
+    "english", "English", "ENGLISH", "french", "Français", "français", "spanish", "Español", "español", "arabic",
+    "عربي", "chinese", "中文", "russian", "Русский", "en", "fr", "es", "ar", "zh", "ru", "eng", "fra", "(eng)", "(FRA)",
+    "(spa)", "(en)", "(fr)", "2020 ASDR - EXECUTIVE SUMMARY (ENGLISH)", "Summary (French)", "English version",
+    "version arabic", "Document in russian", "Full report in Chinese and English", "pdf", "PDF, 1.2 MB",
+    "Download (Spanish)", "Portuguese", "Deutsch", "Bahasa Indonesia", "", "  ",
+]
+
+# Texts in which a language is searched (file names, link texts, ...)
+TEXTS = LANGUAGES + TITLES + [
+    "UNDP-Africa_ASDR2020_ExecutiveSummary_French.pdf",
+    "HDR21-22_Overview_Spanish.pdf",
+    "hdr2021-22overviewarpdf.pdf",
+    "Download the report (English, 3.4 MB)",
+    "Télécharger le rapport (Français, 3,1 Mo)",
+]
+
+BASE_URLS = ["https://www.undp.org", "https://www.undp.org/", "https://digitallibrary.un.org", "https://www.wfp.org"]
+
+# Urls as found in the href attributes of the pages
+URLS = [
+    "https://www.undp.org/publications/human-development-report-2021-22",
+    "/publications/human-development-report-2021-22",
+    "publications/human-development-report-2021-22",
+    "//www.undp.org/sites/g/files/zskgke326/files/2022-09/hdr2021-22pdf_1.pdf",
+    "/sites/g/files/zskgke326/files/2022-09/hdr2021-22pdf_1.pdf",
+    "https:/www.undp.org/sites/g/files/zskgke326/files/publications/ASDR2020.pdf",
+    "http:/www.undp.org/sites/g/files/zskgke326/files/publications/ASDR2020.pdf",
+    "https://www.undp.orghttps://www.undp.org/sites/g/files/zskgke326/files/2023-01/report.pdf",
+    "https://www.undp.org/https://www.undp.org/africa/publications/report",
+    "https://digitallibrary.un.org/record/3923923/files/A_RES_70_1-EN.pdf?ln=en",
+    "https://digitallibrary.un.org/record/3923923/files/A_RES_70_1-FR.pdf?ln=fr#page=2",
+    "https://docs.wfp.org/api/documents/WFP-0000147452/download/?_ga=2.1.2.3",
+    "/sites/default/files/Rapport annuel 2022 (version française).pdf",
+    "/sites/default/files/تقرير التنمية البشرية.pdf",
+    "mailto:publications@undp.org",
+    "javascript:void(0)",
+    "#",
+    "",
+    "ftp://ftp.un.org/pub/document.pdf",
+    "https://www.who.int/publications/i/item/9789240064355",
+    "https://iris.paho.org/bitstream/handle/10665.2/57182/9789275126776_eng.pdf?sequence=1&isAllowed=y",
+]
+
+# (organization acronym, region) as used in the documents ids
+ORGANIZATIONS = [
+    ("UNDP", "Global"), ("UNDP", "Africa"), ("UNDP", "Asia and the Pacific"), ("WHO", "America-PAHO"),
+    ("World Bank", "Documents and Reports"), ("UNICEF", "West and Central Africa"),
+]
+
+# Publication dates, as written on the websites and returned by the APIs: (date, organization acronym)
+DATES = [
+    ("July 16, 2020", "UNDP"), ("December 1, 2022", "UNDP"), ("16 July 2020", "ILO"), ("3 March 2023", "UNAIDS"),
+    ("16 Jul 2020", "UNEP"), ("2020-07", "UNEP"), ("2021", "UNHabitat"), ("July 2020", "UNWTO"),
+    ("2023-08-04 16:17:48", "UN"), ("2020-07-16T12:00:00Z", "WFP"), ("2023-05-02T00:00:00Z", "WHO"),
+    ("August, 2021", "WHO"), ("Publication date unknown", "WIPO"), ("", "UNICEF"),
+]
@@ -0,0 +1,261 @@
+"""
+Local stand-in of the organizations' websites. It serves synthetic (but structurally faithful) pages and APIs:
+- UNDP: paginated listing (`content-card` divs) and publication pages (single download button or `download-list` modal)
+- WHO: publications API paginated with `$skip`
+- World Bank: `wds` search API (documents grouped by year, paginated with `os` and `rows`)
+- PDF payloads of configurable size and latency, answering `429 Too Many Requests` at a configurable rate
+
+The content is generated from the index of each publication, so that two runs with the same settings are identical.
+Run it alone with: python -m benchmarks.igo_server --port 8765
+"""
+import argparse
+import datetime
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+DEFAULT_SETTINGS = {
+    "nbr_publications": 60,  # Number of publications of each synthetic website
+    "undp_page_size": 6,  # Same as UNDP website
+    "who_page_size": 50,  # Same as WHO API
+    "wb_first_year": 2019,  # World Bank documents are spread over the years wb_first_year to current year
+    "pdf_size_kb": 64,
+    "pdf_latency_ms": 0,
+    "page_latency_ms": 0,
+    "rate_429": 0.0,  # Probability of answering `429 Too Many Requests` to a PDF request
+    "seed": 0,
+}
+
+LANGUAGES = ["English", "Français", "Español", "Русский", "العربية", "中文"]
+TITLE_WORDS = ["Human", "Development", "Report", "Climate", "Resilience", "Gender", "Equality", "Digital", "Finance",
+               "Governance", "Energy", "Access", "Poverty", "Health", "Youth", "Employment", "Sahel", "Pacific",
+               "Recovery", "Biodiversity", "Développement", "Résilience", "Desarrollo", "Género", "Informe"]
+TAGS = ["Climate change", "Gender equality", "Governance", "Health", "Poverty", "Energy", "Digital"]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+          "November", "December"]
+
+
+def get_title(ind: int) -> str:
+    rand = random.Random(ind)
+    return " ".join(rand.choice(TITLE_WORDS) for _ in range(rand.randint(4, 10))) + f" {ind}"
+
+
+def get_date(ind: int) -> datetime.date:
+    """ Publications are ordered from the most recent (index 0) to the oldest """
+    return datetime.date.today() - datetime.timedelta(days=3 * ind + 1)
+
+
+class IgoRequestHandler(BaseHTTPRequestHandler):
+    server_version = "IgoStandIn/1.0"
+
+    def log_message(self, format, *args):
+        pass  # Keep the output of the benchmarks readable
+
+    # --- Helpers
+    @property
+    def settings(self):
+        return self.server.settings
+
+    @property
+    def base_url(self):
+        return f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+
+    def count(self, key: str):
+        with self.server.stats_lock:
+            self.server.stats[key] = self.server.stats.get(key, 0) + 1
+
+    def send(self, body: bytes, content_type: str, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_html(self, html: str):
+        time.sleep(self.settings["page_latency_ms"] / 1000)
+        self.send(html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def send_json(self, obj):
+        time.sleep(self.settings["page_latency_ms"] / 1000)
+        self.send(json.dumps(obj).encode("utf-8"), "application/json; charset=utf-8")
+
+    # --- Routing
+    def do_GET(self):
+        parsed_url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed_url.query).items()}
+        path = parsed_url.path.rstrip("/")
+
+        if path == "/__stats":
+            with self.server.stats_lock:
+                return self.send_json(dict(self.server.stats))
+        if path == "/__reset":
+            with self.server.stats_lock:
+                self.server.stats = {}
+            return self.send_json({})
+
+        if path == "/undp/publications":
+            self.count("undp_listing_pages")
+            return self.send_html(self.get_undp_listing_page(page=int(query.get("page", 1))))
+        if path.startswith("/undp/publications/"):
+            self.count("undp_publication_pages")
+            return self.send_html(self.get_undp_publication_page(ind=int(path.split("-")[-1])))
+        if path == "/who/api/hubs/publications":
+            self.count("who_api_pages")
+            return self.send_json(self.get_who_api_page(skip=int(query.get("$skip", 0))))
+        if path == "/wb/api/v2/wds":
+            self.count("wb_api_pages")
+            return self.send_json(self.get_wb_api_page(year=int(query.get("strdate", "0")[:4]),
+                                                       skip=int(query.get("os", 0)),
+                                                       rows=int(query.get("rows", 500))))
+        if path.startswith("/pdf/"):
+            return self.send_pdf()
+
+        self.count("not_found")
+        self.send(b"Not found", "text/plain", status=404)
+
+    # --- PDF
+    def send_pdf(self):
+        with self.server.stats_lock:
+            too_many_requests = self.server.random.random() < self.settings["rate_429"]
+        if too_many_requests:
+            self.count("pdf_429")
+            return self.send(b"Too Many Requests", "text/plain", status=429)
+
+        self.count("pdf")
+        time.sleep(self.settings["pdf_latency_ms"] / 1000)
+        self.send(self.server.pdf_payload, "application/pdf")
+
+    # --- UNDP
+    def get_undp_listing_page(self, page: int) -> str:
+        page_size = self.settings["undp_page_size"]
+        nbr_publications = self.settings["nbr_publications"]
+        cards = []
+        for ind in range((page - 1) * page_size, min(page * page_size, nbr_publications)):
+            cards.append(f"""
+            <div class="content-card">
+                <a href="/undp/publications/publication-{ind}">
+                    <div class="content-card__image"><img src="/img/{ind}.jpg" alt=""></div>
+                    <h6>PUBLICATION</h6><h5>{get_title(ind)}</h5>
+                </a>
+            </div>""")
+
+        return f"""<!DOCTYPE html><html lang="en"><head><title>Publications | UNDP</title></head><body>
+        <header><nav>{"".join(f'<a href="/menu/{i}">Menu {i}</a>' for i in range(40))}</nav></header>
+        <div class="advanced-content-results">{nbr_publications} Results</div>
+        <div class="views-infinite-scroll-content-wrapper">{"".join(cards)}</div>
+        <footer>{"".join(f'<a href="/footer/{i}">Footer {i}</a>' for i in range(40))}</footer>
+        </body></html>"""
+
+    def get_undp_publication_page(self, ind: int) -> str:
+        date_ = get_date(ind)
+        tags = "".join(f'<a class="tag-link" href="/tags/{i}">{tag}</a>' for i, tag in
+                       enumerate(random.Random(ind).sample(TAGS, 3)))
+
+        if ind % 3:  # Publications with several versions: links in the `download-list` modal
+            download_button = '<a class="download" role="button" href="#">Download</a>'
+            rows = "".join(f"""
+                <li class="chapter-item download-row">
+                    <a class="text-link arrow-3 download-btn flex-container"
+                       href="/pdf/undp-{ind}-{lang_ind}.pdf"><div><div>{lang} (PDF, 1.2 MB)</div></div></a>
+                </li>""" for lang_ind, lang in enumerate(LANGUAGES[:1 + ind % 3]))
+            modal = f'<div class="modal"><ul class="chapter-list download-list">{rows}</ul></div>'
+        else:  # Publications with a single pdf: direct link on the button `Download`
+            download_button = f'<a class="download" role="button" href="{self.base_url}/pdf/undp-{ind}.pdf">' \
+                              f'Download</a>'
+            modal = ""
+
+        return f"""<!DOCTYPE html><html lang="en"><head><title>{get_title(ind)} | UNDP</title></head><body>
+        <header><nav>{"".join(f'<a href="/menu/{i}">Menu {i}</a>' for i in range(40))}</nav></header>
+        <div class="coh-inline-element column publication-card__title">
+            <h6 class="coh-heading">{MONTHS[date_.month - 1]} {date_.day}, {date_.year}</h6>
+            <h2 class="coh-heading">{get_title(ind)}</h2>
+        </div>
+        <div class="publication-content">{"<p>Lorem ipsum dolor sit amet.</p>" * 30}</div>
+        {download_button}{modal}
+        <div class="tags">{tags}</div>
+        <footer>{"".join(f'<a href="/footer/{i}">Footer {i}</a>' for i in range(40))}</footer>
+        </body></html>"""
+
+    # --- WHO
+    def get_who_api_page(self, skip: int) -> dict:
+        value = []
+        for ind in range(skip, min(skip + self.settings["who_page_size"], self.settings["nbr_publications"])):
+            date_ = get_date(ind)
+            value.append({
+                "Id": f"who-{ind}",
+                "TrimmedTitle": get_title(ind),
+                "DownloadUrl": f"{self.base_url}/pdf/who-{ind}.pdf",
+                "Links": f"<a href='{self.base_url}/who/publications/i/item/{ind}'>{get_title(ind)}</a>",
+                "PublicationDateAndTime": f"{date_.isoformat()}T00:00:00Z",
+                "Tag": "; ".join(random.Random(ind).sample(TAGS, 2)),
+            })
+        return {"@odata.context": f"{self.base_url}/who/api/$metadata#publications", "value": value}
+
+    # --- World Bank
+    def get_wb_api_page(self, year: int, skip: int, rows: int) -> dict:
+        first_year = self.settings["wb_first_year"]
+        nbr_years = datetime.date.today().year - first_year + 1
+        # Publications of the year `year`: every publication whose index modulo the number of years matches
+        year_publications = [ind for ind in range(self.settings["nbr_publications"])
+                             if first_year <= year and ind % nbr_years == year - first_year]
+
+        documents = {}
+        for ind in year_publications[skip:skip + rows]:
+            documents[f"D{ind}"] = {
+                "id": f"{ind}",
+                "display_title": get_title(ind),
+                "pdfurl": f"{self.base_url}/pdf/wb-{ind}.pdf",
+                "docdt": f"{year}-{1 + ind % 12:02d}-{1 + ind % 28:02d}T00:00:00Z",
+                "docty": "Report",
+                "topicv3": ",".join(random.Random(ind).sample(TAGS, 2)),
+                "lang": random.Random(ind).choice(["English", "French", "Spanish"]),
+                "url_friendly_title": f"{self.base_url}/wb/en/publication/{ind}",
+            }
+        documents["facets"] = {}  # As the real API, the last key is not a document
+
+        return {"rows": rows, "os": skip, "page": 1 + skip // max(rows, 1), "total": len(year_publications),
+                "documents": documents}
+
+
+def start_server(settings: dict = None, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    Start the server in a background thread.
+    :param settings: values overriding DEFAULT_SETTINGS
+    :param host:
+    :param port: 0 to let the system choose a free port
+    :return: the server. Its base url is f"http://{server.server_address[0]}:{server.server_address[1]}"
+    """
+    server = ThreadingHTTPServer((host, port), IgoRequestHandler)
+    server.daemon_threads = True
+    server.settings = {**DEFAULT_SETTINGS, **(settings if settings else {})}
+    server.stats = {}
+    server.stats_lock = threading.Lock()
+    server.random = random.Random(server.settings["seed"])
+    # Minimal valid pdf header, padded to the requested size
+    header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    server.pdf_payload = header + b"0" * max(0, int(server.settings["pdf_size_kb"] * 1024) - len(header) - 6) + \
+        b"\n%%EOF"
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local stand-in of the organizations' websites")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for key, value in DEFAULT_SETTINGS.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    igo_server = start_server(settings={key: getattr(args, key) for key in DEFAULT_SETTINGS},
+                              host=args.host, port=args.port)
+    print(f"Serving on http://{igo_server.server_address[0]}:{igo_server.server_address[1]} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        igo_server.shutdown()
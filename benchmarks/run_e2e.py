@@ -0,0 +1,297 @@
+"""
+End-to-end benchmark of the scrapers against the local stand-in websites (see `igo_server.py`).
+
+Each scraper runs in its own process and temporary working directory, with its URLs pointing at the local server.
+Reported per scraper: documents/sec, pages/sec (html pages and API responses), peak RSS and the time spent in the
+database. Results can be saved and compared against a previous run (the baseline):
+
+    python -m benchmarks.run_e2e --save benchmarks/results/baseline.json
+    python -m benchmarks.run_e2e --baseline benchmarks/results/baseline.json --threshold 0.1
+
+The exit code is 1 if a metric is worse than the baseline by more than the threshold.
+"""
+import argparse
+import contextlib
+import datetime
+import functools
+import importlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import threading
+import time
+import traceback
+
+import requests
+
+from benchmarks.igo_server import DEFAULT_SETTINGS, start_server
+from benchmarks.sandbox import prepare_sandbox, REPO_ROOT
+
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+# DatabaseHandler's methods measured to get the time spent in the database. Nested calls are counted once
+DB_METHODS = ["connect", "disconnect", "execute_query", "fetch_data"]
+
+# Metrics compared with the baseline: True if higher is better
+COMPARED_METRICS = {
+    "docs_per_sec": True,
+    "pages_per_sec": True,
+    "peak_rss_mib": False,
+    "db_time_sec": False,
+}
+
+
+def setup_undp(scraper, base_url: str):
+    scraper.publications_page_url = f"{base_url}/undp/publications"
+    scraper._download_base_url = base_url
+
+
+def setup_who_global(scraper, base_url: str):
+    scraper._api_url = f"{base_url}/who/api/hubs/publications"
+
+
+def setup_worldbank_documents_and_reports(scraper, base_url: str):
+    from src.http_fc import RateLimiter  # Imported in the working directory of the scraper (see run_scraper)
+
+    scraper._api_url = f"{base_url}/wb/api/v2/wds"
+    scraper._download_base_url = base_url
+    # The limit of the requests protects the real API: the local server is not limited, so that the benchmark
+    # measures the scraper and not the limit (worldbank_api.max_requests_per_second of the config file)
+    scraper.rate_limiter = RateLimiter(max_requests_per_second=0)
+
+
+# Scrapers that can be pointed at the local server. `setup` overrides the urls of a scraper's instance
+BENCHMARKED_SCRAPERS = {
+    "undp-global": {"module": "src.undp", "class": "UndpGlobalScraper", "setup": setup_undp},
+    "who-global": {"module": "src.who", "class": "WhoGlobalScraper", "setup": setup_who_global},
+    "worldbank-documents-and-reports": {"module": "src.worldbank", "class": "DocumentsReportsScraper",
+                                        "setup": setup_worldbank_documents_and_reports},
+}
+
+
+def instrument_database_handler(db_handler_class) -> dict:
+    """
+    Wrap the methods of DatabaseHandler to measure the time spent in the database
+    :return: a dict updated at each call: {"db_time_sec": ..., "db_calls": ...}
+    """
+    timer = {"db_time_sec": 0.0, "db_calls": 0}
+    local = threading.local()
+
+    def measure(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            depth = getattr(local, "depth", 0)
+            local.depth = depth + 1
+            start_time = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                local.depth = depth
+                if not depth:
+                    timer["db_time_sec"] += time.perf_counter() - start_time
+                    timer["db_calls"] += 1
+        return wrapper
+
+    for method_name in DB_METHODS:
+        setattr(db_handler_class, method_name, measure(getattr(db_handler_class, method_name)))
+
+    return timer
+
+
+def get_peak_rss_mib():
+    try:
+        import resource  # Not available on Windows
+    except ImportError:
+        return None
+
+    peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    return round(peak_rss / (1024 ** 2 if sys.platform == "darwin" else 1024), 2)
+
+
+def run_scraper_benchmark(name: str, base_url: str, config_overrides: dict, verbose: bool, keep_workdir: bool,
+                          results_queue):
+    """
+    Run one scraper (in a child process) and put its metrics in `results_queue`
+    """
+    workdir = prepare_sandbox(config_overrides=config_overrides)
+    result = {"scraper": name, "workdir": workdir}
+    try:
+        with contextlib.redirect_stdout(sys.stdout if verbose else open(os.devnull, 'w')):
+            import src
+            from src.db_handler import DatabaseHandler
+            from src.dir_fc import initialize_download_pdf_directory_for
+            from src.files_fc import CONFIG
+
+            db_timer = instrument_database_handler(DatabaseHandler)
+
+            scraper_spec = BENCHMARKED_SCRAPERS[name]
+            scraper_class = getattr(importlib.import_module(scraper_spec["module"]), scraper_spec["class"])
+            scraper = scraper_class(session=src.SESSION)
+            scraper_spec["setup"](scraper, base_url)
+            initialize_download_pdf_directory_for(
+                organization_acronym_region=f"{scraper.organization_acronym}-{scraper.organization_region}".lower(),
+                config=CONFIG)
+
+            requests.get(f"{base_url}/__reset")
+            db_timer.update({"db_time_sec": 0.0, "db_calls": 0})
+            start_time = time.perf_counter()
+            start_cpu_time = time.process_time()
+
+            run_result = scraper.run()
+
+            wall_time = time.perf_counter() - start_time
+            cpu_time = time.process_time() - start_cpu_time
+            server_stats = requests.get(f"{base_url}/__stats").json()
+            nbr_documents = len(DatabaseHandler().select_columns(
+                table_name=CONFIG["general"]["documents_table"],
+                columns=["id"],
+                condition="organization_id = ? AND error = 0",
+                condition_vals=(scraper.organization.id,)
+            ))
+
+        nbr_pages = sum(v for k, v in server_stats.items() if not k.startswith("pdf"))
+        result.update({
+            "run_result": run_result,
+            "wall_time_sec": round(wall_time, 3),
+            "cpu_time_sec": round(cpu_time, 3),
+            "nbr_documents": nbr_documents,
+            "nbr_pages": nbr_pages,
+            "nbr_pdf_requests": server_stats.get("pdf", 0) + server_stats.get("pdf_429", 0),
+            "nbr_429": server_stats.get("pdf_429", 0),
+            "docs_per_sec": round(nbr_documents / wall_time, 3) if wall_time else 0,
+            "pages_per_sec": round(nbr_pages / wall_time, 3) if wall_time else 0,
+            "peak_rss_mib": get_peak_rss_mib(),
+            "db_time_sec": round(db_timer["db_time_sec"], 3),
+            "db_calls": db_timer["db_calls"],
+            "server_stats": server_stats,
+        })
+    except BaseException as e:
+        result["error"] = f"{e.__str__()}\n{traceback.format_exc()}"
+    finally:
+        if not keep_workdir:
+            os.chdir(REPO_ROOT)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results_queue.put(result)
+
+
+def compare_with_baseline(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    :return: list of regressions (text). A metric regresses if it is worse than the baseline by more than `threshold`
+    """
+    regressions = []
+    for name, result in results.items():
+        baseline_result = baseline.get("results", {}).get(name)
+        if not baseline_result or "error" in result or "error" in baseline_result:
+            continue
+
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            value, baseline_value = result.get(metric), baseline_result.get(metric)
+            if not value or not baseline_value:
+                continue
+            change = (value - baseline_value) / baseline_value
+            result.setdefault("change_vs_baseline", {})[metric] = round(change, 4)
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"{name}: {metric} {baseline_value} -> {value} ({round(100 * change, 1)}%)")
+
+    return regressions
+
+
+def print_report(results: dict):
+    columns = ["docs_per_sec", "pages_per_sec", "peak_rss_mib", "db_time_sec", "wall_time_sec", "nbr_documents",
+               "nbr_pages", "nbr_429"]
+    name_width = max([len("scraper")] + [len(name) for name in results]) + 2
+    print("scraper".ljust(name_width) + "".join(col.rjust(15) for col in columns))
+    for name, result in results.items():
+        if "error" in result:
+            print(name.ljust(name_width) + f"ERROR: {result['error'].splitlines()[0]}")
+            continue
+        line = name.ljust(name_width)
+        for col in columns:
+            change = result.get("change_vs_baseline", {}).get(col)
+            value = f"{result[col]}" + (f" ({'+' if change >= 0 else ''}{round(100 * change)}%)" if change is not None
+                                        else "")
+            line += value.rjust(15)
+        print(line)
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the scrapers against a local server")
+    parser.add_argument("--scrapers", nargs="+", choices=list(BENCHMARKED_SCRAPERS.keys()),
+                        default=list(BENCHMARKED_SCRAPERS.keys()))
+    parser.add_argument("--nbr-publications", type=int, default=DEFAULT_SETTINGS["nbr_publications"])
+    parser.add_argument("--pdf-size-kb", type=float, default=DEFAULT_SETTINGS["pdf_size_kb"])
+    parser.add_argument("--pdf-latency-ms", type=float, default=DEFAULT_SETTINGS["pdf_latency_ms"])
+    parser.add_argument("--page-latency-ms", type=float, default=DEFAULT_SETTINGS["page_latency_ms"])
+    parser.add_argument("--rate-429", type=float, default=DEFAULT_SETTINGS["rate_429"],
+                        help="Probability (0 to 1) that a pdf request gets the answer `429 Too Many Requests`")
+    parser.add_argument("--parallel-downloads", action="store_true", help="Set `allow_parallel_downloads` to true")
+    parser.add_argument("--save", default=None, help="Path of the json file where results are saved")
+    parser.add_argument("--baseline", default=None, help="Path of the results of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative change considered as a regression when comparing with the baseline")
+    parser.add_argument("--keep-workdir", action="store_true", help="Keep the temporary directories (database, ...)")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the scrapers")
+    return parser.parse_args()
+
+
+def main():
+    args = get_arguments()
+    settings = {
+        "nbr_publications": args.nbr_publications,
+        "pdf_size_kb": args.pdf_size_kb,
+        "pdf_latency_ms": args.pdf_latency_ms,
+        "page_latency_ms": args.page_latency_ms,
+        "rate_429": args.rate_429,
+    }
+    config_overrides = {"allow_parallel_downloads": args.parallel_downloads}
+
+    server = start_server(settings=settings)
+    base_url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    print(f"Local server: {base_url} - settings: {json.dumps(settings)}\n")
+
+    # `spawn` gives each scraper a fresh interpreter (the package `src` is initialized at import)
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for name in args.scrapers:
+        print(f"Running {name}...")
+        results_queue = context.Queue()
+        process = context.Process(target=run_scraper_benchmark,
+                                  args=(name, base_url, config_overrides, args.verbose, args.keep_workdir,
+                                        results_queue))
+        process.start()
+        results[name] = results_queue.get()
+        process.join()
+
+    server.shutdown()
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results=results, baseline=baseline, threshold=args.threshold)
+
+    print("")
+    print_report(results)
+
+    save_path = args.save if args.save else os.path.join(
+        RESULTS_DIR, f"e2e_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(save_path)), exist_ok=True)
+    with open(save_path, 'w', encoding='utf-8') as f:
+        json.dump({"created_at": datetime.datetime.now().isoformat(), "settings": settings, "results": results}, f,
+                  ensure_ascii=False, indent=4)
+    print(f"\nResults saved in: {save_path}")
+
+    if regressions:
+        print(f"\nRegressions (threshold: {round(100 * args.threshold)}%):")
+        for regression in regressions:
+            print(f" - {regression}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+Microbenchmarks of the helpers of `src/common.py` that run once or more per link or document.
+
+Each benchmark calls a helper on every item of a realistic corpus (see `corpora.py`). The time per call is measured over
+several rounds (min, median, mean, standard deviation). Results can be recorded as the baseline and later runs are
+compared with it: a benchmark whose median is slower than the baseline by more than the threshold is a regression.
+
+    python -m benchmarks.run_micro --save-baseline
+    python -m benchmarks.run_micro --threshold 0.25
+    python -m benchmarks.run_micro -k language
+
+The exit code is 1 if a regression is found. Baselines depend on the machine: record them on the machine used to compare.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+
+from benchmarks.sandbox import prepare_sandbox, REPO_ROOT
+
+BASELINE_PATH = os.path.join(REPO_ROOT, "benchmarks", "baselines", "common_helpers.json")
+
+
+def get_benchmarks() -> dict:
+    """
+    :return: {benchmark name: (function called once per round, number of helper calls per round)}
+    """
+    from src import common, date_fc, lang_fc
+    from benchmarks.corpora import TITLES, LANGUAGES, TEXTS, URLS, BASE_URLS, ORGANIZATIONS, DATES
+
+    links = [common.add_base_url_if_missing(base_url=BASE_URLS[0], url=url) for url in URLS]
+    url_pairs = [(base_url, url) for base_url in BASE_URLS for url in URLS]
+    titles_links_orgs = [(title, link, org) for title, link, org in
+                         zip(TITLES * len(links), links * len(TITLES), ORGANIZATIONS * len(TITLES) * len(links))]
+    titles_langs_orgs = [(title, lang, org) for title, lang, org in
+                         zip(TITLES * 2, LANGUAGES, ORGANIZATIONS * len(LANGUAGES))]
+
+    # The helpers cached with lru_cache start each iteration with an empty cache: the corpus is resolved, not looked up
+    def bench_format_language():
+        lang_fc.format_language.cache_clear()
+        for lang in LANGUAGES:
+            common.format_language(lang=lang)
+
+    def bench_get_lan_from_text():
+        lang_fc._get_language_from_text.cache_clear()
+        for text_ in TEXTS:
+            common.get_lan_from_text(text_=text_)
+
+    def bench_generate_document_id():
+        for title, link, org in titles_links_orgs:
+            common.generate_document_id(organization_acronym=org[0], org_region=org[1], publication_title=title,
+                                        pdf_download_link=link)
+
+    def bench_format_file_name():
+        for title, lang, org in titles_langs_orgs:
+            common.format_file_name(org_acronym=org[0], org_region=org[1], publication_title=title, lang=lang)
+
+    def bench_hash_md5():
+        for title in TITLES:
+            common.hash_md5(data=title)
+
+    def bench_add_base_url_if_missing():
+        for base_url, url in url_pairs:
+            common.add_base_url_if_missing(base_url=base_url, url=url)
+
+    def bench_fix_url():
+        for url in URLS:
+            common.fix_url(url=url)
+
+    def bench_is_valid_url():
+        for url in URLS:
+            common.is_valid_url(url=url)
+
+    def bench_clean_text():
+        for title in TITLES:
+            common.clean_text(text=title)
+
+    def bench_format_publication_date():
+        date_fc.parse_date.cache_clear()
+        for raw_date, org in DATES:
+            date_fc.format_publication_date(raw_date=raw_date, organization_acronym=org)
+
+    return {
+        "format_language": (bench_format_language, len(LANGUAGES)),
+        "get_lan_from_text": (bench_get_lan_from_text, len(TEXTS)),
+        "generate_document_id": (bench_generate_document_id, len(titles_links_orgs)),
+        "format_file_name": (bench_format_file_name, len(titles_langs_orgs)),
+        "hash_md5": (bench_hash_md5, len(TITLES)),
+        "add_base_url_if_missing": (bench_add_base_url_if_missing, len(url_pairs)),
+        "fix_url": (bench_fix_url, len(URLS)),
+        "is_valid_url": (bench_is_valid_url, len(URLS)),
+        "clean_text": (bench_clean_text, len(TITLES)),
+        "format_publication_date": (bench_format_publication_date, len(DATES)),
+    }
+
+
+def run_benchmark(func, nbr_calls: int, rounds: int, min_round_time_sec: float) -> dict:
+    """
+    Run `func` for several rounds. Each round repeats `func` until it lasts at least `min_round_time_sec`
+    :return: statistics of the time per helper call, in microseconds
+    """
+    func()  # Warm up (caches, imports, ...)
+
+    # Calibration: number of iterations of `func` per round
+    iterations = 1
+    while True:
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        if time.perf_counter() - start_time >= min_round_time_sec:
+            break
+        iterations *= 2
+
+    times_per_call = []
+    for _ in range(rounds):
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        times_per_call.append(1e6 * (time.perf_counter() - start_time) / (iterations * nbr_calls))
+
+    return {
+        "min_us": round(min(times_per_call), 4),
+        "median_us": round(statistics.median(times_per_call), 4),
+        "mean_us": round(statistics.mean(times_per_call), 4),
+        "stddev_us": round(statistics.stdev(times_per_call), 4) if rounds > 1 else 0,
+        "rounds": rounds,
+        "iterations": iterations,
+        "calls_per_iteration": nbr_calls,
+    }
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the helpers of src/common.py")
+    parser.add_argument("-k", dest="keyword", default=None, help="Only run benchmarks whose name contains KEYWORD")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-round-time", type=float, default=0.05, help="Minimum duration of a round in seconds")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Path of the baseline file")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Record the results as the new baseline (merged with the existing one)")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Relative slowdown of the median considered as a regression")
+    return parser.parse_args()
+
+
+def main():
+    args = get_arguments()
+    workdir = prepare_sandbox()
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            benchmarks = get_benchmarks()
+    finally:
+        # The sandbox is only needed to import `src`
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark'.ljust(26)}{'min (us)'.rjust(12)}{'median (us)'.rjust(14)}{'stddev (us)'.rjust(14)}"
+          f"{'vs baseline'.rjust(14)}")
+    for name, (func, nbr_calls) in benchmarks.items():
+        if args.keyword and args.keyword not in name:
+            continue
+
+        result = run_benchmark(func=func, nbr_calls=nbr_calls, rounds=args.rounds,
+                               min_round_time_sec=args.min_round_time)
+        results[name] = result
+
+        comparison = ""
+        baseline_result = baseline.get("benchmarks", {}).get(name)
+        if baseline_result:
+            change = (result["median_us"] - baseline_result["median_us"]) / baseline_result["median_us"]
+            comparison = f"{'+' if change >= 0 else ''}{round(100 * change, 1)}%"
+            if change > args.threshold:
+                regressions.append(f"{name}: median {baseline_result['median_us']} us -> {result['median_us']} us "
+                                   f"({comparison})")
+
+        print(f"{name.ljust(26)}{str(result['min_us']).rjust(12)}{str(result['median_us']).rjust(14)}"
+              f"{str(result['stddev_us']).rjust(14)}{comparison.rjust(14)}")
+
+    if args.save_baseline:
+        baseline.setdefault("benchmarks", {}).update(results)
+        baseline.update({
+            "recorded_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "machine": f"{platform.system()} {platform.machine()} - Python {platform.python_version()}",
+        })
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+        print(f"\nBaseline saved in: {args.baseline}")
+
+    if regressions:
+        print(f"\nRegressions (threshold: {round(100 * args.threshold)}%):")
+        for regression in regressions:
+            print(f" - {regression}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
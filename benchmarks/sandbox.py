@@ -0,0 +1,73 @@
+"""
+Importing the package `src` creates folders, a database and a session in the current directory. This file prepares a
+temporary working directory (config file, links to `src` and `assets`) so that benchmarks never touch the project's data.
+It must be used BEFORE importing anything from `src`.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import yaml
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Default overrides of the key `general` of the config file. The waiting time after an error 429 is reduced, otherwise
+# a single `Too many requests` would block a benchmark for minutes
+DEFAULT_CONFIG_OVERRIDES = {
+    "max_waiting_time_sec": 1,
+    "allow_parallel_downloads": False,
+    "save_log_events": True,
+}
+
+
+def update_dict(dict_: dict, updates: dict) -> dict:
+    """
+    Recursively update the dictionary `dict_` with the values of `updates`
+    """
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(dict_.get(key), dict):
+            update_dict(dict_[key], value)
+        else:
+            dict_[key] = value
+    return dict_
+
+
+def link_or_copy(source: str, destination: str):
+    try:
+        os.symlink(source, destination, target_is_directory=os.path.isdir(source))
+    except OSError:
+        # Symbolic links are not always allowed (e.g. Windows without developer mode)
+        if os.path.isdir(source):
+            shutil.copytree(source, destination, ignore=shutil.ignore_patterns("__pycache__"))
+        else:
+            shutil.copy(source, destination)
+
+
+def prepare_sandbox(config_overrides: dict = None, workdir: str = None) -> str:
+    """
+    Create the working directory of a benchmark and move into it.
+    :param config_overrides: values overriding the key `general` of the project's config file
+    :param workdir: working directory. A new temporary directory is created if None
+    :return: path of the working directory
+    """
+    workdir = tempfile.mkdtemp(prefix="igo-scraper-bench-") if workdir is None else workdir
+    os.makedirs(workdir, exist_ok=True)
+
+    with open(os.path.join(REPO_ROOT, "config.yaml"), 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    config["on_azure_jupyter_cloud"] = False
+    update_dict(config["general"], DEFAULT_CONFIG_OVERRIDES)
+    update_dict(config["general"], config_overrides if config_overrides else {})
+    with open(os.path.join(workdir, "config.yaml"), 'w', encoding='utf-8') as f:
+        yaml.safe_dump(config, f, allow_unicode=True)
+
+    for name in ["src", "assets"]:
+        if not os.path.exists(os.path.join(workdir, name)):
+            link_or_copy(os.path.join(REPO_ROOT, name), os.path.join(workdir, name))
+
+    os.chdir(workdir)
+    if workdir not in sys.path:
+        sys.path.insert(0, workdir)
+
+    return workdir
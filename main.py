@@ -1,66 +1,149 @@
+import argparse
 import inspect
 from src import App, SESSION, scraper_instances
+from src.checkpoint_fc import CHECKPOINT
 from src.db_handler import reset_temp_publications_urls_table, reset_temp_documents_table
 from src.files_fc import LogEvent, LogLevel, CONFIG, SESSION_ERRORS
+from src.profiling_fc import PROFILE_MODES, run_with_profiler
+from src.selenium_fc import shutdown_webdriver_pool
+from src.parse_fc import shutdown_parse_pool
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(description=App['name'])
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=None,
+                        help="Profile each scraper (cpu or memory). Profiles are saved in logs/profiles/<session id>")
+    parser.add_argument("--only", action="append", default=None, metavar="SCRAPER_NAME",
+                        help="Run only the given active scraper (e.g. undp-africa). Can be repeated")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the last session if it was interrupted, from the checkpoints of its scrapers")
+    parser.add_argument("--full-sweep", action="store_true",
+                        help="Crawl the whole listings (ignore the update mode, the sitemaps and the listing segments)")
+    return parser.parse_args()
+
+
+def print_banner():
+    """
+    Printed once the session is known (the id of the resumed session with `--resume`)
+    """
+    print('=' * bar_length)
+    print(f"* {App['name']}  *")
+    print(f"* Version: {App['version']}  *")
+    print(f"* Release: {App['release']}  *")
+    print(f"* Session ID: {SESSION.id}  *")
+    print(f"* Started at: {SESSION.started_at}  *")
+    print(f"* Publications chunk size: {CONFIG['general']['max_publication_urls_chunk_size']}  *")
+    print(f"* PDFs chunk size: {CONFIG['general']['max_document_links_chunk_size']}  *")
+    print(f"* Allow parallel downloads: {CONFIG['general']['allow_parallel_downloads']}  *")
+    if CONFIG["general"]["allow_parallel_downloads"]:
+        print(f"* Concurrent downloads: {CONFIG['general']['max_concurrent_downloads']}  *")
+    print('=' * bar_length)
+    print("\n")
+
 
 bar_length = len(App['name']) + 6
-print('=' * bar_length)
-print(f"* {App['name']}  *")
-print(f"* Version: {App['version']}  *")
-print(f"* Release: {App['release']}  *")
-print(f"* Session ID: {SESSION.id}  *")
-print(f"* Started at: {SESSION.started_at}  *")
-print(f"* Publications chunk size: {CONFIG['general']['max_publication_urls_chunk_size']}  *")
-print(f"* PDFs chunk size: {CONFIG['general']['max_document_links_chunk_size']}  *")
-print(f"* Allow parallel downloads: {CONFIG['general']['allow_parallel_downloads']}  *")
-if CONFIG["general"]["allow_parallel_downloads"]:
-    print(f"* Concurrent downloads: {CONFIG['general']['max_concurrent_downloads']}  *")
-print('=' * bar_length)
-print("\n")
-
-total_organization = len(scraper_instances)
 
 # Press the green button in the gutter to run the script.
 if __name__ == '__main__':
+    args = get_arguments()
+
+    if args.only:
+        only_names = [name.lower() for name in args.only]
+        unknown_names = [name for name in only_names if name not in [p['name'].lower() for p in scraper_instances]]
+        if unknown_names:
+            msg = f"Unknown or inactive scraper(s): {', '.join(unknown_names)}. " \
+                  f"Active scrapers: {', '.join([p['name'].lower() for p in scraper_instances])}"
+            print(msg)
+            LogEvent(level=LogLevel.WARNING.value,
+                     message=msg,
+                     function_name=inspect.currentframe().f_code.co_name).save()
+        scraper_instances = [p for p in scraper_instances if p['name'].lower() in only_names]
+
+    if args.resume:
+        if SESSION.resume_last_session():
+            msg = f"Resuming the interrupted session {SESSION.id} (started at {SESSION.started_at})"
+        else:
+            msg = "No interrupted session to resume: a new session is started"
+        print_banner()
+        print(f"{msg}\n")
+        LogEvent(level=LogLevel.INFO.value,
+                 message=msg,
+                 function_name=inspect.currentframe().f_code.co_name).save()
+    else:
+        print_banner()
+
+    if args.full_sweep:
+        CONFIG["general"]["incremental_crawl"]["force_full_sweep"] = True  # See incremental_fc.is_full_sweep_forced
+        print("Full sweep: the whole listings are crawled\n")
+
+    if args.profile:
+        print(f"Profiling mode: {args.profile}\n")
+
+    total_organization = len(scraper_instances)
+
     nbr_pdfs_found = 0  # number of pdfs found in current session
     nbr_down_pdfs = 0  # number of downloaded pdfs in current session
     msg = ""
     run_result = True
 
     print(f"Website assessed: 0")
-    for i, p in enumerate(scraper_instances):
-        # Reset temporary tables
-        reset_temp_publications_urls_table()
-        reset_temp_documents_table()
+    try:
+        for i, p in enumerate(scraper_instances):
+            scraper = p['scraper']
 
-        scraper = p['scraper']
+            # Continue from the checkpoint of the scraper in the resumed session (see checkpoint_fc.py)
+            is_resumed = args.resume and CHECKPOINT.resume(session_id=SESSION.id, scraper_name=p['name'].lower())
+            if is_resumed and CHECKPOINT.stage == "done":
+                print(f"{p['name']} was completed before the interruption.\n")
+                continue
+            if is_resumed and not getattr(scraper, "resumable", False):
+                is_resumed = False  # The scraper can only start again from the beginning
 
-        # Save event in logs
-        msg = f"Working on {p['name']}'s publications..."
-        print(msg)
-        LogEvent(level=LogLevel.INFO.value,
-                 message=msg,
-                 function_name=inspect.currentframe().f_code.co_name).save()
+            if is_resumed:
+                print(f"Resuming {p['name']} at the stage '{CHECKPOINT.stage}'")
+            else:
+                # Reset temporary tables
+                reset_temp_publications_urls_table()
+                reset_temp_documents_table()
+                CHECKPOINT.start(session_id=SESSION.id, scraper_name=p['name'].lower())
 
-        # Start scraping pdfs from the current organization
-        run_result = scraper.run()
+            # Save event in logs
+            msg = f"Working on {p['name']}'s publications..."
+            print(msg)
+            LogEvent(level=LogLevel.INFO.value,
+                     message=msg,
+                     function_name=inspect.currentframe().f_code.co_name).save()
 
-        print(f"\nWebsite(s) assessed: {i + 1}/{total_organization}")
+            # Start scraping pdfs from the current organization
+            if args.profile:
+                run_result = run_with_profiler(scraper=scraper, scraper_name=p['name'], mode=args.profile,
+                                               session_id=SESSION.id)
+            else:
+                run_result = scraper.run()
 
-        # If run_result is False then an error might have happened
-        if not run_result:
-            msg = "The process was interrupted. Check your internet connection and/or the website's link. See logs.\n"
-            print(msg)
-            break
+            print(f"\nWebsite(s) assessed: {i + 1}/{total_organization}")
+
+            # If run_result is False then an error might have happened
+            if not run_result:
+                msg = "The process was interrupted. Check your internet connection and/or the website's link. " \
+                      "See logs.\n"
+                print(msg)
+                break
+
+            CHECKPOINT.save(stage="done")
+
+            nbr_pdfs_found = scraper.number_of_pdfs_found_in_current_session  # Increment number of pdfs found
+            nbr_down_pdfs += scraper.number_of_downloaded_pdfs_in_current_session  # Increment number of downloaded pdfs
 
-        nbr_pdfs_found = scraper.number_of_pdfs_found_in_current_session  # Increment number of pdfs found
-        nbr_down_pdfs += scraper.number_of_downloaded_pdfs_in_current_session  # Increment number of downloaded pdfs
+            if i < len(scraper_instances) - 1:
+                print('-' * bar_length, "\n")
+    finally:
+        shutdown_webdriver_pool()  # Close the browsers used by the scrapers, also if one of them raised an error
+        shutdown_parse_pool()  # Stop the processes parsing the pages
 
-        if i < len(scraper_instances) - 1:
-            print('-' * bar_length, "\n")
     # ---- Complete Scrapping
     SESSION.errors_number = SESSION_ERRORS["session"]["errors_number"]
-    SESSION.interrupt()  # End session
+    SESSION.interrupt(is_completed=run_result)  # End session. If it did not complete, it can be resumed
 
     # -- Report
     str_0 = "Web scrapping complete.\n" if run_result else msg
@@ -71,7 +154,10 @@ if __name__ == '__main__':
     msg += f" -> Total pdfs downloaded: {nbr_down_pdfs} / {nbr_pdfs_found} " \
            f"-- {downloaded_docs_percent}%\n"
 
-    msg += f"* End time: {SESSION.ended_at}"
+    if SESSION.ended_at:
+        msg += f"* End time: {SESSION.ended_at}"
+    else:
+        msg += "* Session not completed: it can be continued with `python main.py --resume`"
 
     LogEvent(level=LogLevel.INFO.value,
              message=msg).save()
@@ -214,3 +214,7 @@ scraper_instances = [
 
 # Filter scrapers' classes by removing the ones that are not active
 scraper_instances = [sp for sp in scraper_instances if sp['name'].lower() in active_scraper_names]
+
+# Name of each scraper in the register, used to read its settings (e.g. `incremental`)
+for sp in scraper_instances:
+    sp['scraper'].register_name = sp['name'].lower()
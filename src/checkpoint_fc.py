@@ -0,0 +1,93 @@
+"""
+This file contains the checkpoints of the scrapers, used to resume an interrupted session (`python main.py --resume`).
+While a scraper runs, its checkpoint records in the database the current stage and the position reached in it:
+- links: publications' listing (e.g. {"page": 12} or, for the World Bank's API, {"year": 1998, "skip": 1500})
+- details: publications' pages. `last_id_temp` is the id of the last processed row of the temporary publications' urls
+- filter: removal of the documents already downloaded
+- downloads: `last_id_temp` is the id_temp of the last processed row of the temporary documents
+- done
+The temporary tables are kept as they are when a scraper is resumed, so the stages already completed are skipped and
+the current one continues from its position. Only the scrapers with `resumable = True` use the stages `links` and
+`details`, the other ones start again from the beginning (the completed scrapers are skipped for all of them).
+"""
+import datetime
+import json
+
+from .db_handler import get_checkpoint, save_checkpoint
+
+STAGES = ["links", "details", "filter", "downloads", "done"]
+
+
+class Checkpoint:
+
+    def __init__(self):
+        self.session_id = None
+        self.scraper_name = ""
+        self.stage = STAGES[0]
+        self.position = {}
+        self.last_id_temp = 0
+
+    def start(self, session_id: int, scraper_name: str):
+        """
+        Start the checkpoints of a scraper from the first stage
+        :param session_id:
+        :param scraper_name: name of the scraper in the register (e.g. 'worldbank-documents-and-reports')
+        """
+        self.session_id = session_id
+        self.scraper_name = scraper_name
+        self.save(stage=STAGES[0])
+
+    def resume(self, session_id: int, scraper_name: str) -> bool:
+        """
+        Load the last checkpoint of a scraper in a session
+        :param session_id:
+        :param scraper_name:
+        :return: True if the scraper has a checkpoint in the session
+        """
+        checkpoint = get_checkpoint(session_id=session_id, scraper_name=scraper_name)
+        if checkpoint is None:
+            return False
+
+        self.session_id = session_id
+        self.scraper_name = scraper_name
+        self.stage = checkpoint['stage']
+        self.position = json.loads(checkpoint['position']) if checkpoint['position'] else {}
+        self.last_id_temp = checkpoint['last_id_temp'] or 0
+        return True
+
+    def is_stage_done(self, stage: str) -> bool:
+        return STAGES.index(self.stage) > STAGES.index(stage)
+
+    def get_position(self, stage: str) -> dict:
+        """
+        :return: the position reached in the stage, or {} if the stage is not the current one
+        """
+        return self.position if self.stage == stage else {}
+
+    def get_last_id_temp(self, stage: str) -> int:
+        """
+        :return: the id of the last row processed in the stage, or 0 if the stage is not the current one
+        """
+        return self.last_id_temp if self.stage == stage else 0
+
+    def save(self, stage: str, position: dict = None, last_id_temp: int = 0):
+        """
+        Record the stage of the scraper and the position reached in it
+        """
+        self.stage = stage
+        self.position = position if position else {}
+        self.last_id_temp = last_id_temp
+        if self.session_id is None:  # The scraper is not run from main.py
+            return
+        save_checkpoint(data={
+            "session_id": self.session_id,
+            "scraper": self.scraper_name,
+            "stage": self.stage,
+            "position": json.dumps(self.position),
+            "last_id_temp": self.last_id_temp,
+            "updated_at": datetime.datetime.utcnow().isoformat()
+        })
+
+
+# Checkpoint of the scraper currently running
+CHECKPOINT = Checkpoint()
@@ -3,18 +3,21 @@ import json
 import inspect
 import hashlib
 import time
-from functools import partial
+from collections import OrderedDict
+from functools import partial, lru_cache
 from multiprocessing import Pool
 from src.db_handler import get_total_temp_documents, get_chunk_temp_documents_as_dict, DatabaseHandler
 from src.files_fc import CONFIG, LogEvent, LogLevel
-from bs4 import BeautifulSoup  # for parsing HTML and XML documents
+from src import lang_fc
+from bs4 import BeautifulSoup, SoupStrainer  # for parsing HTML and XML documents
+from bs4.builder import builder_registry
 import requests  # for downloading pdf files and html files of targeted websites
 from urllib.parse import urlparse  # for validating urls
 from src.time_fc import timestamp_to_datetime_isoformat, get_now_utc_timestamp
-from selenium import webdriver
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options  # Options while setting up the webdriver with chrome
+from src.selenium_fc import get_webdriver_pool, create_webdriver, quit_webdriver, get_user_agent, count_webdriver_page
+from src.http_fc import get_http_session, decode_json_wrapped_html
 
 
 def get_request_response_error(response):
@@ -37,8 +40,19 @@ def is_valid_url(url: str):
         return False
 
 
+@lru_cache(maxsize=None)
+def get_html_parser() -> str:
+    """
+    Return the parser used by BeautifulSoup: key `html_parser` of the config file ('lxml' by default), or
+    Python's built-in 'html.parser' if it is not installed
+    """
+    html_parser = CONFIG['general'].get('html_parser', 'html.parser')
+    return html_parser if builder_registry.lookup(html_parser) is not None else 'html.parser'
+
+
 def get_page_from_url(url: str, timeout=CONFIG['general']['request_time_out_in_second'], get_response=False,
-                      ssl_verify=True, max_attempt=0, max_waiting_time_sec=0, headers=None):
+                      ssl_verify=True, max_attempt=0, max_waiting_time_sec=0, headers=None, parser: str = None,
+                      parse_only: SoupStrainer = None, get_beautifulsoup=True):
     """
     This function take a URL as argument and return a BeautifulSoup of the corresponding html file from the
     internet. If there is an error (client, server, ...), the function will return None while printing the error code
@@ -46,7 +60,13 @@ def get_page_from_url(url: str, timeout=CONFIG['general']['request_time_out_in_s
 
     param: max_attempt
     param: max_waiting_time_sec in seconds
+    param: parser: parser used by BeautifulSoup. Default: see `get_html_parser`
+    param: parse_only: if given, only the matching elements are kept in the BeautifulSoup object (e.g. the container
+    of the publications of a listing page). Much faster and lighter than parsing the whole page
+    param: get_beautifulsoup: if False, the content of the response (bytes) is returned instead of a BeautifulSoup
+    object, e.g. to parse it in another process (see parse_fc.py)
     """
+    parser = parser if parser else get_html_parser()
 
     if not headers:
         headers = {}
@@ -66,13 +86,15 @@ def get_page_from_url(url: str, timeout=CONFIG['general']['request_time_out_in_s
         try:
             for atp in range(max_attempt + 1):
                 time.sleep(current_waiting_time)  # wait before next request attempt
-                response = requests.get(url=url, timeout=timeout, verify=ssl_verify, headers=headers)
+                response = get_http_session().get(url=url, timeout=timeout, verify=ssl_verify, headers=headers)
 
                 if response.ok:
+                    page = BeautifulSoup(response.content, parser, parse_only=parse_only) if get_beautifulsoup \
+                        else response.content
                     if get_response:  # Return a response and a BeautifulSoup object
-                        return response, BeautifulSoup(response.content, 'html.parser')
+                        return response, page
                     else:
-                        return BeautifulSoup(response.content, 'html.parser')
+                        return page
                 if response.status_code == 429:  # If error is due to 'Too many requests'
                     if atp < max_attempt - 1:
                         current_waiting_time += waiting_time_step
@@ -118,41 +140,125 @@ def get_page_from_url(url: str, timeout=CONFIG['general']['request_time_out_in_s
             return None
 
 
+class PageMemo:
+    """
+    Pages already fetched while extracting the details of a publication (one instance per publication), to not fetch
+    and parse the same page again when the extraction goes through several functions (e.g. WHO America-PAHO: the
+    publication's page is fetched to know where it redirects, then the details are extracted from the final page).
+    The last `max_size` pages are kept, by requested and final url (after the redirects) and by the parameters changing
+    the parsed page (e.g. `parse_only`: a truncated page is not returned for the full page).
+    Usage:
+        page_memo = PageMemo()
+        response, page = page_memo.get_page(url=publication_url, get_response=True)
+        ...
+        page = page_memo.get_page(url=response.url)  # Not fetched again
+    """
+
+    def __init__(self, max_size: int = 4):
+        self.max_size = max_size
+        self.pages = OrderedDict()  # (url, parameters) -> (response, BeautifulSoup object)
+
+    @staticmethod
+    def get_key(url: str, kwargs: dict) -> tuple:
+        """
+        :return: key of a page: its url and the parameters of get_page_from_url changing the parsed page (the
+        `timeout` does not)
+        """
+        return url, tuple(sorted((name, repr(value)) for name, value in kwargs.items() if name != "timeout"))
+
+    def get_page(self, url: str, get_response=False, **kwargs):
+        """
+        Same as get_page_from_url (the other parameters are passed to it), but the page is fetched only once
+        """
+        key = self.get_key(url=url, kwargs=kwargs)
+        if key in self.pages:
+            self.pages.move_to_end(key)
+            response, page = self.pages[key]
+        else:
+            response, page = get_page_from_url(url=url, get_response=True, **kwargs)
+            if page is not None:  # An error is not memoized
+                for page_url in dict.fromkeys([url, response.url]):
+                    page_key = self.get_key(url=page_url, kwargs=kwargs)
+                    self.pages[page_key] = (response, page)
+                    self.pages.move_to_end(page_key)
+                while len(self.pages) > self.max_size:
+                    self.pages.popitem(last=False)
+
+        return (response, page) if get_response else page
+
+
+def get_json_wrapped_page_from_url(url: str, tag_name: str = None):
+    """
+    Same as `get_page_from_url`, for the APIs answering with html wrapped in JSON (e.g. UNICEF's mosaic API:
+    'for(;;); {...}'). See `decode_json_wrapped_html`
+    :param url:
+    :param tag_name: if given, only the first tag with this name is returned (e.g. 'form')
+    :return: a BeautifulSoup object, or None in case of error or if the tag was not found
+    """
+    response, _ = get_page_from_url(url=url, get_response=True)
+    if response is None:
+        return None
+
+    html_soup = BeautifulSoup(decode_json_wrapped_html(text=response.text), get_html_parser())
+    return html_soup.find(tag_name) if tag_name else html_soup
+
+
 def selenium_get_page_from_url(url: str, headers: list = None, wait_element_located_xpath: tuple = None,
-                               max_wait_time_sec=60, headless=True, get_beautifulsoup=True):
+                               max_wait_time_sec=60, headless=True, get_beautifulsoup=True, driver=None):
     """
-    Uses Selenium to get a webpage. If succeeded, returns the page as a BeautifulSoup object, else returns None
+    Uses Selenium to get a webpage. If succeeded, returns the page as a BeautifulSoup object, else returns None.
+    The browser is leased from the shared pool (see selenium_fc.py), unless `driver` is given.
     :param url:
-    :param headers:
+    :param headers: only the 'User-Agent' is used
     :param wait_element_located_xpath:
     :param max_wait_time_sec:
-    :param headless:
-    :param get_beautifulsoup:
+    :param headless: if False, a visible browser is started for this page only, then closed
+    :param get_beautifulsoup: if False, returns the driver itself. `driver` is then required: a browser of the pool
+    can't be used outside its lease
+    :param driver: a browser already leased by the caller (e.g. to click through the pages of a listing)
     :return:
     """
-    # Set up Chrome options
-    chrome_options = Options()
+    if driver is not None:
+        return load_page_with_driver(driver=driver, url=url, headers=headers,
+                                     wait_element_located_xpath=wait_element_located_xpath,
+                                     max_wait_time_sec=max_wait_time_sec, get_beautifulsoup=get_beautifulsoup)
 
-    # Add User-Agent header to the Chrome options
-    if not headers:
-        headers = CONFIG["general"]["request_default_headers"]
+    if not get_beautifulsoup:
+        raise ValueError("`driver` is required when `get_beautifulsoup` is False")
+
+    if not headless:  # show browser
+        driver = create_webdriver(headless=False, headers=headers)
+        try:
+            return load_page_with_driver(driver=driver, url=url, headers=None,
+                                         wait_element_located_xpath=wait_element_located_xpath,
+                                         max_wait_time_sec=max_wait_time_sec)
+        finally:
+            quit_webdriver(driver)
 
-    for item in headers:
-        chrome_options.add_argument(f"{list(item.keys())[0]}={list(item.values())[0]}")
+    with get_webdriver_pool().lease() as driver:
+        return load_page_with_driver(driver=driver, url=url, headers=headers,
+                                     wait_element_located_xpath=wait_element_located_xpath,
+                                     max_wait_time_sec=max_wait_time_sec)
 
-    # Set up web driver with Chrome options
-    if headless:  # Hide browser
-        # Run Chrome in headless mode: Without opening the Chrome browser in a visible window
-        chrome_options.add_argument(
-            "--headless")
-        driver = webdriver.Chrome(options=chrome_options)
-    else:  # show browser
-        driver = webdriver.Chrome()
 
-    # Navigate to the webpage
-    driver.get(url)
+def load_page_with_driver(driver, url: str, headers: list = None, wait_element_located_xpath: tuple = None,
+                          max_wait_time_sec=60, get_beautifulsoup=True):
+    """
+    Navigate to `url` with the given browser. See selenium_get_page_from_url
+    """
+    # The browsers of the pool use the default 'User-Agent'. Another one is only set for the current page
+    user_agent = get_user_agent(headers=headers)
+    default_user_agent = get_user_agent(headers=CONFIG["general"]["request_default_headers"])
+    override_user_agent = bool(user_agent) and user_agent != default_user_agent
 
     try:
+        if override_user_agent:
+            driver.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": user_agent})
+
+        # Navigate to the webpage
+        count_webdriver_page(driver=driver)
+        driver.get(url)
+
         if wait_element_located_xpath:
             # Wait for a specific element or attribute within the iframe to appear
             WebDriverWait(driver, max_wait_time_sec).until(
@@ -160,18 +266,19 @@ def selenium_get_page_from_url(url: str, headers: list = None, wait_element_loca
             )
 
         if get_beautifulsoup:
-            # Get the HTML source of the page
-            html_source = driver.page_source
-
-            # Create a BeautifulSoup object
-            soup = BeautifulSoup(html_source, "html.parser")
-
-            return soup
+            # Get the HTML source of the page and create a BeautifulSoup object
+            return BeautifulSoup(driver.page_source, get_html_parser())
         else:
             return driver
 
     except Exception as e:
         print("Error:", e)
+    finally:
+        if override_user_agent:
+            try:
+                driver.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": default_user_agent})
+            except:
+                pass
 
     return None
 
@@ -261,12 +368,11 @@ def get_total_number_pages(total_np: int, total_np_per_page: int) -> int:
 
 
 def get_lan_from_text(text_: str) -> str:
-    try:
-        lang = [lg for lg in CONFIG["general"]["un_languages"]["lang_dict"].values() if
-                lg.lower() in text_.lower()]
-        return lang[0]
-    except:
-        return ""
+    """
+    Return the name of the first language mentioned in the text (e.g. 'Report_French.pdf' -> 'FRENCH'), or ""
+    See src/lang_fc.py
+    """
+    return lang_fc.get_language_from_text(text_=text_)
 
 
 def download_pdf(url: str, file_dir: str, file_name: str,
@@ -716,43 +822,11 @@ def format_file_name(org_acronym: str, org_region: str, publication_title: str,
 
 
 def format_language(lang: str) -> str:
-    lang = lang.lower()
-    un_languages_lang_dict = CONFIG['general']['un_languages']['lang_dict']
-    un_languages_name = [un_languages_lang_dict[lg_key].lower() for lg_key in un_languages_lang_dict.keys()]
-    un_languages_code2 = [lg.lower() for lg in CONFIG['general']['un_languages']['code2']]
-    un_languages_code3 = [lg.lower() for lg in CONFIG['general']['un_languages']['code3']]
-    if lang in un_languages_name:
-        return un_languages_lang_dict[lang]
-
-    # For cases where lang = "2020 ASDR - EXECUTIVE SUMMARY (ENGLISH)"
-    # Check if a UN language exist in the string lang
-    lang_in_string = [lg for lg in un_languages_name if lg in lang]
-    # Check if there is only one language in lang_in_string
-    if len(lang_in_string) == 1:
-        lang_in_string = lang_in_string[0]
-        # Check if the language is surrounded by brackets OR if the lang has the word "version" OR if lang ends
-        # with lang_in_string
-        if f"({lang_in_string})" in lang or f"{lang_in_string} version" in lang or f"version {lang_in_string}" in \
-                lang or lang.endswith(lang_in_string):
-            return un_languages_lang_dict[lang_in_string]
-
-    # For languages code3 ('ENG', 'FRA', ...)
-    # Check if a UN language exist in the string lang
-    lang_in_string = [lg for lg in un_languages_code3 if f"({lg})" in lang]
-    # Check if there is only one language in lang_in_string
-    if len(lang_in_string) == 1:
-        lang_in_string = lang_in_string[0]
-        return un_languages_lang_dict[lang_in_string]
-
-    # For languages code3 ('EN', 'FR', ...)
-    # Check if a UN language exist in the string lang
-    lang_in_string = [lg for lg in un_languages_code2 if f"({lg})" in lang or lg == lang]
-    # Check if there is only one language in lang_in_string
-    if len(lang_in_string) == 1:
-        lang_in_string = lang_in_string[0]
-        return un_languages_lang_dict[lang_in_string]
-
-    return ""
+    """
+    Return the name of the language given in `lang` (e.g. 'en', 'English', 'Summary (ENGLISH)' -> 'ENGLISH'), or ""
+    See src/lang_fc.py
+    """
+    return lang_fc.format_language(lang=lang)
 
 
 def add_base_url_if_missing(base_url: str, url: str) -> str:
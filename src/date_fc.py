@@ -0,0 +1,119 @@
+"""
+This file contains the functions used to normalize the publication dates found on the organizations' websites and APIs
+into ISO format (e.g. 'July 16, 2020' -> '2020-07-16T00:00:00').
+Each organization has a small ordered list of formats (same directives as `datetime.strptime`), compiled once into
+regular expressions. The same raw strings come back for thousands of publications, so the results are memoized.
+"""
+import datetime
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+MONTHS = ["january", "february", "march", "april", "may", "june", "july", "august", "september", "october",
+          "november", "december"]
+MONTHS_ABBREVIATIONS = ["sept"] + [m[:3] for m in MONTHS]  # 'sept' first, so that 'sep' does not stop the match
+MONTHS_NUMBER = {**{m: i + 1 for i, m in enumerate(MONTHS)}, **{m[:3]: i + 1 for i, m in enumerate(MONTHS)},
+                 "sept": 9}
+
+# Regular expression of each supported directive. The groups' names are used to build the date
+DIRECTIVES = {
+    "%Y": r"(?P<Y>\d{4})",
+    "%m": r"(?P<m>\d{1,2})",
+    "%d": r"(?P<d>\d{1,2})",
+    "%B": r"(?P<B>" + "|".join(MONTHS) + ")",
+    "%b": r"(?P<b>" + "|".join(MONTHS_ABBREVIATIONS) + r")\.?",
+    "%H": r"\d{1,2}",  # Hours, minutes and seconds are matched but not kept
+    "%M": r"\d{2}",
+    "%S": r"\d{2}(?:\.\d+)?",
+    "%z": r"(?:z|[+-]\d{2}:?\d{2})",  # The time zone is ignored: the date is the one written in the string
+}
+
+# Formats of the publication dates, per organization (acronym), in the order they are tried
+ISO_FORMATS = ("%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+DATE_FORMATS = {
+    "ILO": ("%d %B %Y",),  # '16 July 2020'
+    "UN": ISO_FORMATS,  # '2023-08-04 16:17:48'
+    "UNHabitat": ("%Y",),  # '2020'
+    "UNAIDS": ("%d %B %Y",),
+    "UNCDF": ("%B %d, %Y",),  # 'July 16, 2020'
+    "UNDP": ("%B %d, %Y",),
+    "UNEP": ("%d %B %Y", "%d %b %Y", "%Y-%m-%d", "%Y-%m", "%Y"),  # '16 July 2020', '16 Jul 2020', '2020-07'
+    "UNICEF": ("%d %B %Y",) + ISO_FORMATS,  # `datetime` attribute of the <time> tags: '2020-07-16T12:00:00Z'
+    "UNWTO": ("%B %Y", "%Y"),  # 'July 2020'
+    "WFP": ISO_FORMATS,
+    "WHO": ISO_FORMATS + ("%d %B %Y", "%B, %Y", "%d %b %Y", "%Y-%m-%d", "%Y %m %d", "%Y-%m", "%Y"),
+    "WIPO": ("%Y",),
+    "World Bank": ISO_FORMATS,
+}
+DEFAULT_FORMATS = ISO_FORMATS + ("%d %B %Y", "%B %d, %Y", "%B %Y", "%Y")
+
+
+@lru_cache(maxsize=None)
+def compile_date_format(date_format: str) -> re.Pattern:
+    """
+    Compile a format (e.g. '%B %d, %Y') into a case-insensitive regular expression. Spaces match any run of spaces (or none)
+    :param date_format:
+    :return:
+    """
+    pattern = ""
+    for token in re.split(r"(%[a-zA-Z])", date_format):
+        if token.startswith("%"):
+            pattern += DIRECTIVES[token]
+        else:
+            pattern += r"\s*".join(re.escape(part) for part in token.split(" "))
+    return re.compile(pattern, flags=re.IGNORECASE)
+
+
+def get_date_formats(organization_acronym: str) -> tuple:
+    return DATE_FORMATS.get(organization_acronym, DEFAULT_FORMATS)
+
+
+@lru_cache(maxsize=8192)
+def parse_date(raw_date: str, date_formats: tuple = DEFAULT_FORMATS) -> str:
+    """
+    Return the date in ISO format, using the first format of `date_formats` matching `raw_date`, or "" if none matches.
+    The missing parts of a date are set to the first day/month (e.g. '2020' -> '2020-01-01T00:00:00').
+    :param raw_date: e.g. 'July 16, 2020'
+    :param date_formats: e.g. DATE_FORMATS['UNDP']
+    :return: e.g. '2020-07-16T00:00:00'
+    """
+    raw_date = " ".join(raw_date.replace("\xa0", " ").split())  # Remove extra spaces
+    for date_format in date_formats:
+        match = compile_date_format(date_format).fullmatch(raw_date)
+        if match is None:
+            continue
+        parts = match.groupdict()
+        month = parts.get("m") or MONTHS_NUMBER.get((parts.get("B") or parts.get("b") or "").lower(), 1)
+        try:
+            return datetime.datetime(int(parts["Y"]), int(month), int(parts.get("d") or 1)).isoformat()
+        except ValueError:  # e.g. 'February 30, 2020'
+            continue
+
+    return ""
+
+
+def format_publication_date(raw_date, organization_acronym: str = "") -> str:
+    """
+    Normalize a publication date found on the website (or API) of an organization
+    :param raw_date: text of the date. Anything else than a non-empty string gives ""
+    :param organization_acronym: key of DATE_FORMATS
+    :return: the date in ISO format, or ""
+    """
+    if not isinstance(raw_date, str) or not raw_date.strip():
+        return ""
+    return parse_date(raw_date=raw_date, date_formats=get_date_formats(organization_acronym=organization_acronym))
+
+
+def format_publication_dates(raw_dates: list, date_format: str = None) -> list:
+    """
+    Batch version of `format_publication_date` for the dates returned by an API, which all have the same format
+    (e.g. World Bank `docdt`: '2020-07-16T00:00:00Z'). The whole list is parsed at once with pandas.
+    :param raw_dates: list of strings (None or invalid values give "")
+    :param date_format: format of the dates. If None, it is inferred by pandas
+    :return: list of dates in ISO format, in the same order as `raw_dates`
+    """
+    if not raw_dates:
+        return []
+    dates = pd.to_datetime(pd.Series(raw_dates, dtype="object"), format=date_format, errors="coerce", utc=True)
+    return ["" if pd.isna(dt) else datetime.datetime(dt.year, dt.month, dt.day).isoformat() for dt in dates]
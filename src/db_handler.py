@@ -5,6 +5,7 @@ from sqlite3 import Connection
 import pandas as pd
 
 from src.files_fc import CONFIG, LogEvent, LogLevel
+from src.url_fc import canonicalize_url
 
 
 # CONFIG = load_yaml(filepath="config.yaml")
@@ -62,6 +63,12 @@ class DatabaseHandler:
         self.disconnect()
         return data
 
+    def get_columns(self, table_name: str) -> list:
+        """
+        Returns the names of the columns of the table
+        """
+        return [column['name'] for column in self.fetch_data(query=f"PRAGMA table_info({table_name})")]
+
     def table_exists(self, table_name):
         self.connect()
         q = "SELECT name FROM sqlite_master WHERE type='table' AND name=?"
@@ -132,6 +139,35 @@ class DatabaseHandler:
 
         return True
 
+    def insert_many_into_table(self, table_name: str, columns: list, rows: list,
+                               ignore_duplicates: bool = False, replace_duplicates: bool = False) -> int:
+        """
+        Inserts several rows into the specified table in a single transaction (one commit instead of one per row).
+        If `ignore_duplicates`, the rows violating a unique constraint are skipped (`INSERT OR IGNORE`). If
+        `replace_duplicates`, they replace the existing rows (`INSERT OR REPLACE`).
+        Returns the number of inserted rows.
+        """
+        conflict_clause = 'OR REPLACE ' if replace_duplicates else 'OR IGNORE ' if ignore_duplicates else ''
+        query = f"INSERT {conflict_clause}INTO {table_name} ({', '.join(columns)}) " \
+                f"VALUES ({', '.join('?' * len(columns))})"
+        self.connect()
+        try:
+            self.cursor.executemany(query, rows)
+            self.connection.commit()
+            nbr_inserted_rows = self.cursor.rowcount
+        except sqlite3.Error as e:
+            msg = f"Insertion failed: {e.__str__()}"
+            print(msg)
+            # Save event in logs
+            LogEvent(level=LogLevel.ERROR.value,
+                     message=f"{e.__str__()} - Query: {query} - Number of rows: {len(rows)}",
+                     function_name=inspect.currentframe().f_code.co_name,
+                     exception=e.__str__()).save()
+            nbr_inserted_rows = 0
+
+        self.disconnect()  # disconnect before leaving the function
+        return nbr_inserted_rows
+
     def update_table(self, table_name: str, data: dict, condition: str = "", condition_vals: tuple = None) -> bool:
         """
         Updates the specified columns' values in the table based on the condition.
@@ -389,6 +425,8 @@ def init_database() -> bool:
             # If error, close connection and return False
             # conn.close()
             return False
+    # A url is inserted once (see insert_temp_publications_urls)
+    add_unique_index(table_name=table, column="url")
 
     # Creating table temp_documents_table
     table = CONFIG["general"]["temp_documents_table"]
@@ -428,6 +466,162 @@ def init_database() -> bool:
             # conn.close()
             return False
 
+    # Creating table scraper_states_table
+    table = CONFIG["general"]["scraper_states_table"]
+    if not db_handler.table_exists(table_name=table):
+        msg = f"--------- Creating SQL Lite database table '{table}' in '{db_handler.db_file}'"
+        print(msg)
+
+        try:
+            query = f'''CREATE TABLE {table} (
+                                name TEXT PRIMARY KEY,
+                                last_full_sweep_at TEXT,
+                                watermark TEXT,
+                                pending_watermark TEXT
+                            )'''
+
+            db_handler.execute_query(query=query)
+        except BaseException as e:
+            msg = f"--------- An error occurred  while creating table '{table}' in SQL Lite database at " \
+                  f"{db_handler.db_file} "
+            print(msg)
+            # Save event in logs
+            LogEvent(level=LogLevel.ERROR.value,
+                     message=msg,
+                     function_name=inspect.currentframe().f_code.co_name,
+                     exception=e.__str__()).save()
+
+            return False
+
+    # Columns added to the table after its creation
+    add_missing_columns(table_name=table, columns={"watermark": "TEXT", "pending_watermark": "TEXT"})
+
+    # Creating table checkpoints_table
+    table = CONFIG["general"]["checkpoints_table"]
+    if not db_handler.table_exists(table_name=table):
+        msg = f"--------- Creating SQL Lite database table '{table}' in '{db_handler.db_file}'"
+        print(msg)
+
+        try:
+            query = f'''CREATE TABLE {table} (
+                                session_id INTEGER,
+                                scraper TEXT,
+                                stage TEXT,
+                                position TEXT,
+                                last_id_temp INTEGER DEFAULT 0,
+                                updated_at TEXT,
+                                PRIMARY KEY (session_id, scraper),
+                                FOREIGN KEY (session_id) REFERENCES sessions(id)
+                            )'''
+
+            db_handler.execute_query(query=query)
+        except BaseException as e:
+            msg = f"--------- An error occurred  while creating table '{table}' in SQL Lite database at " \
+                  f"{db_handler.db_file} "
+            print(msg)
+            # Save event in logs
+            LogEvent(level=LogLevel.ERROR.value,
+                     message=msg,
+                     function_name=inspect.currentframe().f_code.co_name,
+                     exception=e.__str__()).save()
+
+            return False
+
+    # Creating table publication_pages_table
+    table = CONFIG["general"]["publication_pages_table"]
+    if not db_handler.table_exists(table_name=table):
+        msg = f"--------- Creating SQL Lite database table '{table}' in '{db_handler.db_file}'"
+        print(msg)
+
+        try:
+            query = f'''CREATE TABLE {table} (
+                                url TEXT,
+                                organization_id INTEGER,
+                                first_seen_at TEXT,
+                                last_fetched_at TEXT,
+                                fingerprint TEXT,
+                                documents_number INTEGER DEFAULT 0,
+                                last_status TEXT,
+                                PRIMARY KEY (url, organization_id),
+                                FOREIGN KEY (organization_id) REFERENCES organization(id)
+                            )'''
+
+            db_handler.execute_query(query=query)
+        except BaseException as e:
+            msg = f"--------- An error occurred  while creating table '{table}' in SQL Lite database at " \
+                  f"{db_handler.db_file} "
+            print(msg)
+            # Save event in logs
+            LogEvent(level=LogLevel.ERROR.value,
+                     message=msg,
+                     function_name=inspect.currentframe().f_code.co_name,
+                     exception=e.__str__()).save()
+
+            return False
+
+    # Creating table listing_segments_table
+    table = CONFIG["general"]["listing_segments_table"]
+    if not db_handler.table_exists(table_name=table):
+        msg = f"--------- Creating SQL Lite database table '{table}' in '{db_handler.db_file}'"
+        print(msg)
+
+        try:
+            query = f'''CREATE TABLE {table} (
+                                scraper TEXT,
+                                segment TEXT,
+                                nbr_items INTEGER,
+                                last_page INTEGER,
+                                completed_at TEXT,
+                                nbr_errors INTEGER DEFAULT 0,
+                                PRIMARY KEY (scraper, segment)
+                            )'''
+
+            db_handler.execute_query(query=query)
+        except BaseException as e:
+            msg = f"--------- An error occurred  while creating table '{table}' in SQL Lite database at " \
+                  f"{db_handler.db_file} "
+            print(msg)
+            # Save event in logs
+            LogEvent(level=LogLevel.ERROR.value,
+                     message=msg,
+                     function_name=inspect.currentframe().f_code.co_name,
+                     exception=e.__str__()).save()
+
+            return False
+
+    # Columns added to the table after its creation
+    add_missing_columns(table_name=table, columns={"nbr_errors": "INTEGER DEFAULT 0"})
+
+    # Creating table record_files_table
+    table = CONFIG["general"]["record_files_table"]
+    if not db_handler.table_exists(table_name=table):
+        msg = f"--------- Creating SQL Lite database table '{table}' in '{db_handler.db_file}'"
+        print(msg)
+
+        try:
+            query = f'''CREATE TABLE {table} (
+                                recid TEXT,
+                                organization_id INTEGER,
+                                files TEXT,
+                                last_modified TEXT,
+                                fetched_at TEXT,
+                                PRIMARY KEY (recid, organization_id),
+                                FOREIGN KEY (organization_id) REFERENCES organization(id)
+                            )'''
+
+            db_handler.execute_query(query=query)
+        except BaseException as e:
+            msg = f"--------- An error occurred  while creating table '{table}' in SQL Lite database at " \
+                  f"{db_handler.db_file} "
+            print(msg)
+            # Save event in logs
+            LogEvent(level=LogLevel.ERROR.value,
+                     message=msg,
+                     function_name=inspect.currentframe().f_code.co_name,
+                     exception=e.__str__()).save()
+
+            return False
+
     # ------- Insert organizations list from csv file into organizations' table
     organizations_list_csv_file_path = os.path.join("assets", "data", "organizations_list.csv")  # Get csv file path
     # Start inserting...
@@ -436,6 +630,33 @@ def init_database() -> bool:
     return True
 
 
+def add_missing_columns(table_name: str, columns: dict):
+    """
+    Add to an existing table the columns created in a later version of the program
+    :param table_name:
+    :param columns: {column name: type}, e.g. {"watermark": "TEXT"}
+    """
+    db_handler = DatabaseHandler()
+    existing_columns = db_handler.get_columns(table_name=table_name)
+    for column, column_type in columns.items():
+        if column not in existing_columns:
+            db_handler.execute_query(query=f"ALTER TABLE {table_name} ADD COLUMN {column} {column_type}")
+
+
+def add_unique_index(table_name: str, column: str):
+    """
+    Create a unique index on a column of a table if it does not exist. The duplicates already in the table are removed
+    (the first row is kept)
+    :param table_name:
+    :param column:
+    """
+    db_handler = DatabaseHandler()
+    db_handler.execute_query(query=f"DELETE FROM {table_name} WHERE rowid NOT IN "
+                                   f"(SELECT MIN(rowid) FROM {table_name} GROUP BY {column})")
+    db_handler.execute_query(query=f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table_name}_{column} "
+                                   f"ON {table_name} ({column})")
+
+
 def initialize_sql_lite_database_folder():
     parent_folder = ""
     db_file_path_dirs = CONFIG['general']['database']['sql_lite']['azure_path'] if \
@@ -490,6 +711,37 @@ def get_total_temp_publications_urls() -> int:
     return len(temps_docs)
 
 
+def insert_temp_publications_urls(urls: list) -> int:
+    """
+    Insert publications' urls in the temporary table in bulk. The urls are canonicalized (see url_fc.py) and the ones
+    already in the table are skipped
+    :param urls:
+    :return: number of inserted urls
+    """
+    db_handler = DatabaseHandler()
+    return db_handler.insert_many_into_table(table_name=CONFIG["general"]["temp_publications_urls_table"],
+                                             columns=["url"],
+                                             rows=[(canonicalize_url(url=url),) for url in urls if url],
+                                             ignore_duplicates=True)
+
+
+def insert_temp_documents(documents: list) -> int:
+    """
+    Insert documents in the temporary table in bulk. The documents already in the table are skipped
+    :param documents: list of dicts with the columns of the temporary documents' table (see Document.to_dict)
+    :return: number of inserted documents
+    """
+    if not documents:
+        return 0
+    db_handler = DatabaseHandler()
+    columns = list(documents[0].keys())
+    return db_handler.insert_many_into_table(table_name=CONFIG["general"]["temp_documents_table"],
+                                             columns=columns,
+                                             rows=[tuple(document[column] for column in columns)
+                                                   for document in documents],
+                                             ignore_duplicates=True)
+
+
 def get_chunk_temp_publications_urls(from_id: int, limit: int = 1) -> list:
     """
     Get a set of temporary documents
@@ -524,3 +776,258 @@ def get_chunk_temp_documents_as_dict(from_id_temp: int, limit: int = 1) -> list:
                                      condition=condition,
                                      condition_vals=(from_id_temp, limit)
                                      )
+
+
+def get_known_publications(organization_id: int) -> tuple:
+    """
+    Get the publications of an organization already in the documents table. If the failed downloads are retried in
+    the next sessions (`retry_download_in_next_session`), the documents with an error are not considered as known,
+    nor the publications with at least one of them
+    :param organization_id:
+    :return: (set of publication urls, set of pdf links, set of document ids)
+    """
+    db_handler = DatabaseHandler()
+    documents = db_handler.select_columns(table_name=CONFIG["general"]["documents_table"],
+                                          columns=["id", "publication_url", "pdf_link", "error"],
+                                          condition="organization_id = ?",
+                                          condition_vals=(organization_id,)
+                                          )
+    if CONFIG["general"]["retry_download_in_next_session"]:
+        failed_publication_urls = {doc['publication_url'] for doc in documents if doc['error']}
+        documents = [doc for doc in documents if not doc['error']]
+    else:
+        failed_publication_urls = set()
+    return {doc['publication_url'] for doc in documents if doc['publication_url']} - failed_publication_urls, \
+        {doc['pdf_link'] for doc in documents if doc['pdf_link']}, {doc['id'] for doc in documents}
+
+
+def get_failed_publications_urls(organization_id: int) -> set:
+    """
+    :param organization_id:
+    :return: the urls of the publications of an organization with at least one document whose download failed
+    """
+    db_handler = DatabaseHandler()
+    documents = db_handler.select_columns(table_name=CONFIG["general"]["documents_table"],
+                                          columns=["publication_url"],
+                                          condition="organization_id = ? AND error = 1",
+                                          condition_vals=(organization_id,)
+                                          )
+    return {doc['publication_url'] for doc in documents if doc['publication_url']}
+
+
+def get_failed_documents_dates(organization_id: int) -> list:
+    """
+    :param organization_id:
+    :return: the publication dates of the documents of an organization whose download failed ("" if unknown)
+    """
+    db_handler = DatabaseHandler()
+    documents = db_handler.select_columns(table_name=CONFIG["general"]["documents_table"],
+                                          columns=["publication_date"],
+                                          condition="organization_id = ? AND error = 1",
+                                          condition_vals=(organization_id,)
+                                          )
+    return [doc['publication_date'] or "" for doc in documents]
+
+
+def get_known_publications_signature(organization_id: int) -> str:
+    """
+    :param organization_id:
+    :return: a summary of the documents of an organization (number, errors, last download), which changes when
+    documents are added or updated
+    """
+    db_handler = DatabaseHandler()
+    query = "SELECT COUNT(*) AS nbr_documents, SUM(error) AS nbr_errors, MAX(downloaded_at) AS downloaded_at " \
+            f"FROM {CONFIG['general']['documents_table']} WHERE organization_id = ?"
+    summary = db_handler.fetch_data(query=query, parameters=(organization_id,))[0]
+    return f"{summary['nbr_documents']}|{summary['nbr_errors'] or 0}|{summary['downloaded_at'] or ''}|" \
+           f"{CONFIG['general']['retry_download_in_next_session']}"
+
+
+def get_scraper_state(name: str):
+    """
+    :param name: name of the scraper in the register (e.g. 'ilo-beirut')
+    :return: the row of the scraper in the scraper states' table, or None
+    """
+    db_handler = DatabaseHandler()
+    states = db_handler.select_columns(table_name=CONFIG["general"]["scraper_states_table"],
+                                       columns=["*"],
+                                       condition="name = ?",
+                                       condition_vals=(name,)
+                                       )
+    return states[0] if states else None
+
+
+def save_scraper_state(name: str, data: dict) -> bool:
+    """
+    Insert or update the state of a scraper
+    :param name: name of the scraper in the register (e.g. 'ilo-beirut')
+    :param data: columns to update, e.g. {"last_full_sweep_at": "2023-10-01T00:00:00"}
+    :return:
+    """
+    db_handler = DatabaseHandler()
+    table = CONFIG["general"]["scraper_states_table"]
+    if get_scraper_state(name=name) is None:
+        return db_handler.insert_data_into_table(table_name=table, data={"name": name, **data})
+    return db_handler.update_table(table_name=table, data=data, condition="name = ?", condition_vals=(name,))
+
+
+def get_checkpoint(session_id: int, scraper_name: str):
+    """
+    :param session_id:
+    :param scraper_name: name of the scraper in the register (e.g. 'ilo-beirut')
+    :return: the checkpoint of the scraper in the session, or None
+    """
+    db_handler = DatabaseHandler()
+    checkpoints = db_handler.select_columns(table_name=CONFIG["general"]["checkpoints_table"],
+                                            columns=["*"],
+                                            condition="session_id = ? AND scraper = ?",
+                                            condition_vals=(session_id, scraper_name)
+                                            )
+    return checkpoints[0] if checkpoints else None
+
+
+def save_checkpoint(data: dict) -> bool:
+    """
+    Insert or replace the checkpoint of a scraper in a session
+    :param data: {"session_id": ..., "scraper": ..., "stage": ..., "position": ..., "last_id_temp": ...,
+    "updated_at": ...}
+    :return:
+    """
+    db_handler = DatabaseHandler()
+    columns = ', '.join(data.keys())
+    values = ', '.join('?' * len(data))
+    query = f"INSERT OR REPLACE INTO {CONFIG['general']['checkpoints_table']} ({columns}) VALUES ({values})"
+    try:
+        db_handler.execute_query(query=query, parameters=tuple(data.values()))
+    except sqlite3.Error as e:
+        LogEvent(level=LogLevel.ERROR.value,
+                 message=f"{e.__str__()} - Query: {query} - Data: {data}",
+                 function_name=inspect.currentframe().f_code.co_name,
+                 exception=e.__str__()).save()
+        return False
+    return True
+
+
+def get_publication_pages(organization_id: int) -> dict:
+    """
+    :param organization_id:
+    :return: {url: row} of the publications' pages of an organization already processed in previous sessions
+    """
+    db_handler = DatabaseHandler()
+    pages = db_handler.select_columns(table_name=CONFIG["general"]["publication_pages_table"],
+                                      columns=["*"],
+                                      condition="organization_id = ?",
+                                      condition_vals=(organization_id,)
+                                      )
+    return {page['url']: page for page in pages}
+
+
+def save_publication_page(data: dict) -> bool:
+    """
+    Insert a publication's page or update it. The date it was first seen is kept
+    :param data: {"url": ..., "organization_id": ..., "first_seen_at": ..., "last_fetched_at": ..., "fingerprint": ...,
+    "documents_number": ..., "last_status": ...}
+    :return:
+    """
+    db_handler = DatabaseHandler()
+    columns = ', '.join(data.keys())
+    values = ', '.join('?' * len(data))
+    updates = ', '.join(f"{column} = excluded.{column}" for column in data
+                       if column not in ("url", "organization_id", "first_seen_at"))
+    query = f"INSERT INTO {CONFIG['general']['publication_pages_table']} ({columns}) VALUES ({values}) " \
+            f"ON CONFLICT(url, organization_id) DO UPDATE SET {updates}"
+    try:
+        db_handler.execute_query(query=query, parameters=tuple(data.values()))
+    except sqlite3.Error as e:
+        LogEvent(level=LogLevel.ERROR.value,
+                 message=f"{e.__str__()} - Query: {query} - Data: {data}",
+                 function_name=inspect.currentframe().f_code.co_name,
+                 exception=e.__str__()).save()
+        return False
+    return True
+
+
+def get_last_completed_session_start(scraper_name: str):
+    """
+    :param scraper_name: name of the scraper in the register (e.g. 'who-africa')
+    :return: the start date (isoformat) of the last session in which the scraper completed, or None
+    """
+    db_handler = DatabaseHandler()
+    query = f"SELECT MAX(s.started_at) AS started_at FROM {CONFIG['general']['sessions_table']} s " \
+            f"JOIN {CONFIG['general']['checkpoints_table']} c ON c.session_id = s.id " \
+            f"WHERE c.scraper = ? AND c.stage = 'done'"
+    sessions = db_handler.fetch_data(query=query, parameters=(scraper_name,))
+    return sessions[0]['started_at'] if sessions else None
+
+
+def get_listing_segments(scraper_name: str) -> dict:
+    """
+    :param scraper_name: name of the scraper in the register (e.g. 'un-global')
+    :return: {segment: row} of the segments of the scraper's listing completely crawled in previous sessions
+    """
+    db_handler = DatabaseHandler()
+    segments = db_handler.select_columns(table_name=CONFIG["general"]["listing_segments_table"],
+                                         columns=["*"],
+                                         condition="scraper = ?",
+                                         condition_vals=(scraper_name,)
+                                         )
+    return {segment['segment']: segment for segment in segments}
+
+
+def save_listing_segment(data: dict) -> bool:
+    """
+    Insert or replace the state of a segment of a listing
+    :param data: {"scraper": ..., "segment": ..., "nbr_items": ..., "last_page": ..., "completed_at": ...,
+    "nbr_errors": ...}
+    :return:
+    """
+    db_handler = DatabaseHandler()
+    columns = ', '.join(data.keys())
+    values = ', '.join('?' * len(data))
+    query = f"INSERT OR REPLACE INTO {CONFIG['general']['listing_segments_table']} ({columns}) VALUES ({values})"
+    try:
+        db_handler.execute_query(query=query, parameters=tuple(data.values()))
+    except sqlite3.Error as e:
+        LogEvent(level=LogLevel.ERROR.value,
+                 message=f"{e.__str__()} - Query: {query} - Data: {data}",
+                 function_name=inspect.currentframe().f_code.co_name,
+                 exception=e.__str__()).save()
+        return False
+    return True
+
+
+def get_record_files(organization_id: int, recids: list) -> dict:
+    """
+    :param organization_id:
+    :param recids: ids of records (e.g. UN digital library: '1633001')
+    :return: {recid: row} of the records already in the table
+    """
+    db_handler = DatabaseHandler()
+    records = {}
+    for i in range(0, len(recids), 500):  # Below the maximum number of parameters of a query
+        recids_chunk = recids[i:i + 500]
+        placeholders = ', '.join('?' * len(recids_chunk))
+        rows = db_handler.select_columns(table_name=CONFIG["general"]["record_files_table"],
+                                         columns=["*"],
+                                         condition=f"organization_id = ? AND recid IN ({placeholders})",
+                                         condition_vals=(organization_id, *recids_chunk)
+                                         )
+        records.update({row['recid']: row for row in rows})
+    return records
+
+
+def save_record_files(records: list) -> int:
+    """
+    Insert or replace the files of records in bulk
+    :param records: list of dicts {"recid": ..., "organization_id": ..., "files": ..., "last_modified": ...,
+    "fetched_at": ...}
+    :return: number of saved records
+    """
+    if not records:
+        return 0
+    db_handler = DatabaseHandler()
+    columns = list(records[0].keys())
+    return db_handler.insert_many_into_table(table_name=CONFIG["general"]["record_files_table"],
+                                             columns=columns,
+                                             rows=[tuple(record[column] for column in columns) for record in records],
+                                             replace_duplicates=True)
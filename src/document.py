@@ -7,6 +7,7 @@ from .dir_fc import is_pdf_already_exist
 from .organizations import get_organization_by_id
 from .files_fc import LogEvent, LogLevel, CONFIG
 from .time_fc import get_now_utc_timestamp, get_remaining_time_estimate
+from .checkpoint_fc import CHECKPOINT
 
 
 class Document:
@@ -197,7 +198,8 @@ def start_downloads(pdf_files_directory: str) -> dict:
         chunk_total = length_temp_documents / chunk_size
         chunk_total = int(chunk_total) + 1 if int(chunk_total) < chunk_total else int(chunk_total)
 
-        start_id = 0
+        # Resumed session: the documents before the checkpoint were already processed (see checkpoint_fc.py)
+        start_id = CHECKPOINT.get_last_id_temp(stage="downloads") + 1
         for i in range(chunk_total):
             elapse_time_msg = " "
             if i > 0:
@@ -210,6 +212,8 @@ def start_downloads(pdf_files_directory: str) -> dict:
             print(f"  Chunk: {i + 1} / {chunk_total}{elapse_time_msg}")
 
             result_temp_documents = get_chunk_temp_documents_as_dict(from_id_temp=start_id, limit=chunk_size)
+            if not result_temp_documents:
+                break
             max_tmp_doc_id_tmp = max([tmp_doc['id_temp'] for tmp_doc in result_temp_documents])
             max_id_tmp_tmp_doc = [tmp_doc for tmp_doc in result_temp_documents if tmp_doc['id_temp'] ==
                                   max_tmp_doc_id_tmp]
@@ -230,6 +234,7 @@ def start_downloads(pdf_files_directory: str) -> dict:
             total_of_pdfs_found += n_fd
             total_of_pdfs_downloaded += n_dwd
             total_assessed_docs += len(list_publications_to_download)
+            CHECKPOINT.save(stage="downloads", last_id_temp=max_tmp_doc_id_tmp)
             print("\n")
 
     return {"total_of_pdfs_found": total_of_pdfs_found, "total_of_pdfs_downloaded": total_of_pdfs_downloaded}
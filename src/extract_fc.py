@@ -0,0 +1,85 @@
+"""
+This file contains the declarative extraction of the publications' details. Instead of chains of BeautifulSoup
+`find`/`find_all` calls (one walk of the tree per field), each scraper describes the fields of a publication's page as
+XPath expressions (its `_extraction_spec`). The expressions are compiled once, when the scraper's module is imported,
+and evaluated by lxml (libxml2) on a single tree: no BeautifulSoup tree is built for the pages of the publications.
+
+e.g.
+    ExtractionSpec(fields={
+        "title": "string((//h1)[1])",  # string() -> a string
+        "tags": f"//aside[{has_class('meta-data')}]//a",  # nodes -> the list of their texts
+        "links": ("//a[@href]", {"href": "@href", "text": "string(.)"}),  # one dict per 'a' tag
+    })
+"""
+from lxml import etree, html as lxml_html
+
+
+def has_class(*class_names) -> str:
+    """
+    Return the XPath condition matching the elements having all the classes (like BeautifulSoup's `class_`)
+    e.g. has_class('item-title') -> "contains(concat(' ', normalize-space(@class), ' '), ' item-title ')"
+    """
+    return " and ".join(f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+                        for class_name in class_names)
+
+
+def get_xpath_value(value):
+    """
+    Convert the result of an XPath expression: a string (e.g. 'string(...)'), or a list of strings (texts of the
+    elements, attributes, text nodes)
+    """
+    if isinstance(value, list):
+        return [item.text_content() if isinstance(item, etree.ElementBase) else str(item) for item in value]
+    if isinstance(value, float):  # e.g. 'count(...)'
+        return int(value) if value.is_integer() else value
+    return value
+
+
+def parse_html(page) -> etree.ElementBase:
+    """
+    :param page: html of a page (bytes or str), or an already parsed tree
+    :return: root of the lxml tree
+    """
+    if isinstance(page, etree.ElementBase):
+        return page
+    return lxml_html.fromstring(page)
+
+
+class ExtractionSpec:
+    """
+    Compiled XPath expressions of the fields of a page. A field is either an expression, or a tuple (expression of
+    the items, {name: expression relative to an item}) returning one dict per item
+    """
+
+    def __init__(self, fields: dict):
+        self.fields = fields
+        self.xpaths = {}
+        for name, expression in fields.items():
+            if isinstance(expression, tuple):
+                items_expression, item_fields = expression
+                self.xpaths[name] = (etree.XPath(items_expression, smart_strings=False),
+                                     {item_name: etree.XPath(item_expression, smart_strings=False)
+                                      for item_name, item_expression in item_fields.items()})
+            else:
+                self.xpaths[name] = etree.XPath(expression, smart_strings=False)
+
+    def __reduce__(self):
+        # Compiled expressions cannot be pickled: they are compiled again in the other process
+        return ExtractionSpec, (self.fields,)
+
+    def extract(self, page) -> dict:
+        """
+        :param page: html of a page (bytes or str), or its lxml tree
+        :return: {field name: value}
+        """
+        tree = parse_html(page)
+        values = {}
+        for name, xpath in self.xpaths.items():
+            if isinstance(xpath, tuple):
+                items_xpath, item_xpaths = xpath
+                values[name] = [{item_name: get_xpath_value(item_xpath(item))
+                                 for item_name, item_xpath in item_xpaths.items()}
+                                for item in items_xpath(tree)]
+            else:
+                values[name] = get_xpath_value(xpath(tree))
+        return values
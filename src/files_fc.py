@@ -2,6 +2,7 @@
 import os
 import datetime
 import json
+import threading
 from json import JSONDecodeError
 
 import yaml
@@ -152,6 +153,9 @@ except JSONDecodeError:
     SESSION_ERRORS = load_json(os.path.join("logs", "lst_err.json"))
 
 
+LOG_EVENTS_LOCK = threading.Lock()  # Serializes the saves of the log events (see LogEvent.save)
+
+
 def update_lst_err():
     save_to_json(SESSION_ERRORS, filepath=os.path.join("logs", "lst_err.json"))
 
@@ -202,17 +206,20 @@ class LogEvent:
 
     def save(self):
         # get_config()
-        # If the event's level is ERROR then increment the number of error in the config. It will then been used
-        # to update the number of errors occurred in the session object
-        if self.level == LogLevel.ERROR.value:
-            SESSION_ERRORS['session']['errors_number'] += 1
-            update_lst_err()
-
-        if CONFIG['general']['save_log_events']:
-            return add_to_log(
-                obj=self.get_event(),
-                log_file_name=self.log_event_file_name,
-                logs_dir=self.log_event_dir_name)
+        # The events are also saved by the threads of the scrapers (prefetched pages, listing segments...): the log file
+        # and the number of errors are read then rewritten, so only one event is saved at a time
+        with LOG_EVENTS_LOCK:
+            # If the event's level is ERROR then increment the number of error in the config. It will then been used
+            # to update the number of errors occurred in the session object
+            if self.level == LogLevel.ERROR.value:
+                SESSION_ERRORS['session']['errors_number'] += 1
+                update_lst_err()
+
+            if CONFIG['general']['save_log_events']:
+                return add_to_log(
+                    obj=self.get_event(),
+                    log_file_name=self.log_event_file_name,
+                    logs_dir=self.log_event_dir_name)
 
     def get_event(self):
         return {
@@ -0,0 +1,120 @@
+"""
+This file contains the persistent frontier of the publications' pages (table `publication_pages`). Unlike the temporary
+table of the publications' urls, emptied for each scraper, it keeps for each page of a publication the date it was
+first seen and last fetched, the fingerprint of its details, the number of documents it produced and the status of its
+last fetch. The scrapers use it to only process the new or changed publications:
+- a page whose documents were all downloaded (see known_fc.KnownDocuments) is not fetched again before
+  `publication_pages.refetch_after_days` days
+- when such a page is fetched again, its documents are only created if its fingerprint (hash of the details extracted
+  from the page: title, date, tags, links...) changed. The hash of the details, not of the html, is used since the
+  html of a page changes at each request on some websites (tokens, dates of generation...)
+"""
+import datetime
+import hashlib
+import inspect
+import json
+
+from .db_handler import get_publication_pages, save_publication_page
+from .files_fc import CONFIG, LogEvent, LogLevel
+from .known_fc import KnownDocuments
+
+PAGE_STATUS_OK = "ok"  # The page produced at least one document
+PAGE_STATUS_NO_DOCUMENT = "no_document"  # The page could not be fetched or parsed, or has no supported file
+
+
+def get_fingerprint(publication_details: list) -> str:
+    """
+    :param publication_details: details extracted from a publication's page (plain dicts)
+    :return: hash of the details
+    """
+    return hashlib.sha1(json.dumps(publication_details, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class PublicationPages:
+    """
+    Usage in a scraper (details of the publications):
+        self.publication_pages.start(organization_id=self.organization.id)
+        urls_to_fetch = self.publication_pages.get_urls_to_fetch(urls=publications_urls)
+        for each page fetched and parsed:
+            if self.publication_pages.save_page(publication_url=page_url, publication_details=publication_details):
+                ...  # New or changed publication: create its documents
+        self.publication_pages.end()
+    """
+
+    def __init__(self):
+        self.organization_id = None
+        self.pages = {}  # url -> row of the table `publication_pages`
+        self.known_documents = KnownDocuments()
+        self.nbr_up_to_date_pages = 0  # Pages not fetched
+        self.nbr_unchanged_pages = 0  # Pages fetched whose fingerprint did not change
+
+    def start(self, organization_id: int):
+        self.organization_id = organization_id
+        self.pages = get_publication_pages(organization_id=organization_id)
+        self.known_documents.load(organization_id=organization_id)
+        self.nbr_up_to_date_pages = 0
+        self.nbr_unchanged_pages = 0
+
+    def has_known_documents(self, publication_url: str) -> bool:
+        """
+        :return: True if the last fetch of the page produced documents and they are in the documents' table
+        """
+        page = self.pages.get(publication_url)
+        return page is not None and page['last_status'] == PAGE_STATUS_OK and page['documents_number'] > 0 and \
+            self.known_documents.is_known(publication_url=publication_url)
+
+    def is_up_to_date(self, publication_url: str) -> bool:
+        """
+        :return: True if the page does not need to be fetched in this session
+        """
+        refetch_after_days = CONFIG["general"]["publication_pages"]["refetch_after_days"]
+        if refetch_after_days <= 0 or not self.has_known_documents(publication_url=publication_url):
+            return False
+        last_fetched_at = datetime.datetime.fromisoformat(self.pages[publication_url]['last_fetched_at'])
+        return datetime.datetime.utcnow() - last_fetched_at < datetime.timedelta(days=refetch_after_days)
+
+    def get_urls_to_fetch(self, urls: list) -> list:
+        """
+        :param urls: urls of publications' pages
+        :return: the urls of the new pages and of the pages due for a new fetch
+        """
+        urls_to_fetch = [url for url in urls if not self.is_up_to_date(publication_url=url)]
+        self.nbr_up_to_date_pages += len(urls) - len(urls_to_fetch)
+        return urls_to_fetch
+
+    def save_page(self, publication_url: str, publication_details: list) -> bool:
+        """
+        Record the fetch of a publication's page
+        :param publication_url:
+        :param publication_details: details extracted from the page, one dict per document (empty if the page could
+        not be fetched or parsed)
+        :return: False if the page did not change since its documents were saved, True otherwise
+        """
+        fingerprint = get_fingerprint(publication_details=publication_details)
+        is_unchanged = self.has_known_documents(publication_url=publication_url) and \
+            self.pages[publication_url]['fingerprint'] == fingerprint
+
+        now = datetime.datetime.utcnow().isoformat()
+        page = {
+            "url": publication_url,
+            "organization_id": self.organization_id,
+            "first_seen_at": now,  # Ignored if the page is already in the table
+            "last_fetched_at": now,
+            "fingerprint": fingerprint,
+            "documents_number": len(publication_details),
+            "last_status": PAGE_STATUS_OK if publication_details else PAGE_STATUS_NO_DOCUMENT
+        }
+        save_publication_page(data=page)
+        self.pages[publication_url] = page
+
+        if is_unchanged:
+            self.nbr_unchanged_pages += 1
+        return not is_unchanged
+
+    def end(self):
+        msg = f"Publications' pages: {self.nbr_up_to_date_pages} not fetched (up to date), " \
+              f"{self.nbr_unchanged_pages} unchanged"
+        print(f"\n {msg}")
+        LogEvent(level=LogLevel.INFO.value,
+                 message=msg,
+                 function_name=inspect.currentframe().f_code.co_name).save()
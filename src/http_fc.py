@@ -0,0 +1,243 @@
+"""
+This file contains the HTTP client shared by the scrapers. A `requests.Session` keeps the connections to a website open
+between requests (no new TCP/TLS handshake for each page). Sessions are not guaranteed to be thread-safe, so each thread
+has its own one.
+"""
+import codecs
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .files_fc import CONFIG
+
+_thread_data = threading.local()
+
+
+def get_default_headers() -> dict:
+    """
+    :return: the default headers of the config file as a dict
+    """
+    headers = {}
+    for item in CONFIG["general"]["request_default_headers"]:
+        headers[list(item.keys())[0]] = list(item.values())[0]
+    return headers
+
+
+def create_http_session() -> requests.Session:
+    pool_size = CONFIG["general"]["http_pool_size"]
+    http_session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    http_session.mount("http://", adapter)
+    http_session.mount("https://", adapter)
+    http_session.headers.update(get_default_headers())
+    return http_session
+
+
+def get_http_session() -> requests.Session:
+    """
+    Return the HTTP session of the current thread (created at the first call)
+    """
+    http_session = getattr(_thread_data, "http_session", None)
+    if http_session is None:
+        http_session = create_http_session()
+        _thread_data.http_session = http_session
+    return http_session
+
+
+# --- JSON-wrapped html
+# Prefixes added by some APIs in front of their JSON to prevent JSON hijacking (e.g. UNICEF: 'for(;;); {...}')
+JSON_PREFIXES = ["for(;;);", "while(1);", ")]}'"]
+
+
+def get_html_strings_from_json(payload) -> list:
+    """
+    Return the html strings contained in a JSON payload (e.g. Drupal's AJAX commands: [{"command": "insert",
+    "data": "<div>...</div>"}, ...]), in order
+    """
+    html_parts = []
+
+    def collect(obj):
+        if isinstance(obj, str):
+            if "<" in obj and ">" in obj:
+                html_parts.append(obj)
+        elif isinstance(obj, dict):
+            for value in obj.values():
+                collect(value)
+        elif isinstance(obj, list):
+            for value in obj:
+                collect(value)
+
+    collect(payload)
+    return html_parts
+
+
+def decode_json_wrapped_html(text: str) -> str:
+    """
+    Return the html of an API answering with html strings wrapped in JSON (prefix and escape sequences removed).
+    If the text is not valid JSON, the escape sequences ('\\u003C', '\\n', ...) are decoded without parsing it.
+    :param text: body of the response, e.g. 'for(;;); {"html": "\\u003Cform ...\\u003C/form\\u003E"}'
+    :return: the concatenation of the html strings
+    """
+    text = text.strip()
+    for prefix in JSON_PREFIXES:
+        if text.startswith(prefix):
+            text = text[len(prefix):].lstrip()
+            break
+
+    try:
+        return "".join(get_html_strings_from_json(json.loads(text)))
+    except ValueError:
+        return text.encode("latin-1", "backslashreplace").decode("unicode_escape")
+
+
+# --- Streamed JSON
+class StreamedJsonReader:
+    """
+    Read JSON values one after the other from a stream of bytes, without decoding the whole document at once
+    """
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, chunks):
+        """
+        :param chunks: iterable of bytes (e.g. response.iter_content(chunk_size=...))
+        """
+        self.chunks = iter(chunks)
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.position = 0
+        self.is_finished = False
+
+    def read_more(self) -> bool:
+        """
+        Append the next chunk to the buffer (the text already read is dropped)
+        :return: False at the end of the stream
+        """
+        if self.is_finished:
+            return False
+        chunk = next(self.chunks, None)
+        self.is_finished = chunk is None
+        self.buffer = self.buffer[self.position:] + self.text_decoder.decode(chunk or b"", final=self.is_finished)
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        :return: the next character which is not a whitespace (not consumed), or "" at the end of the stream
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in " \t\n\r":
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read_more():
+                return ""
+
+    def skip(self, char: str, is_optional: bool = False):
+        if self.peek() == char:
+            self.position += 1
+        elif not is_optional:
+            raise ValueError(f"Invalid JSON: '{char}' expected, got '{self.peek()}'")
+
+    def read_value(self):
+        """
+        :return: the next JSON value (string, number, object, ...)
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.position)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.is_finished or not isinstance(value, (int, float)):
+                    self.position = end
+                    return value
+            except ValueError:
+                if self.is_finished:
+                    raise
+            self.read_more()
+
+
+def iter_json_object_items(chunks, member: str, other_members: dict = None):
+    """
+    Parse a JSON object incrementally and yield the items of one of its members (an object) as soon as they are read.
+    e.g. '{"total": 2, "documents": {"D1": {...}, "D2": {...}}}' and member='documents' -> ("D1", {...}), ("D2", {...})
+    :param chunks: iterable of bytes (e.g. response.iter_content(chunk_size=...))
+    :param member: key of the member whose items are yielded
+    :param other_members: if given, the other members of the object are stored in it (e.g. {"total": 2})
+    :return: generator of (key, value)
+    """
+    reader = StreamedJsonReader(chunks=chunks)
+    reader.skip("{")
+    while reader.peek() not in ("}", ""):
+        key = reader.read_value()
+        reader.skip(":")
+        if key == member and reader.peek() == "{":
+            reader.skip("{")
+            while reader.peek() not in ("}", ""):
+                item_key = reader.read_value()
+                reader.skip(":")
+                yield item_key, reader.read_value()
+                reader.skip(",", is_optional=True)
+            reader.skip("}")
+        else:
+            value = reader.read_value()
+            if other_members is not None:
+                other_members[key] = value
+        reader.skip(",", is_optional=True)
+    reader.skip("}")
+
+
+# --- Rate limiting
+class RateLimiter:
+    """
+    Spread the requests sent to a website by several threads: at most `max_requests_per_second` requests are started
+    per second (0: no limit)
+    """
+
+    def __init__(self, max_requests_per_second: float):
+        self.interval = 1 / max_requests_per_second if max_requests_per_second > 0 else 0
+        self.next_request_time = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """
+        To call before each request: wait for the turn of the current thread
+        """
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            waiting_time = self.next_request_time - now
+            self.next_request_time = max(now, self.next_request_time) + self.interval
+        if waiting_time > 0:
+            time.sleep(waiting_time)
+
+
+# --- Prefetching
+def iter_prefetched_pages(get_page, first_page_number: int = 0, nbr_prefetched_pages: int = 0):
+    """
+    Yield the pages of a listing in order (first_page_number, first_page_number + 1, ...), while the next ones are
+    already being requested in other threads. The caller stops the iteration (`break`) after the last page: the pages
+    requested in advance are then discarded.
+    :param get_page: function(page_number) -> page (e.g. a BeautifulSoup object). It is called in the threads: it can
+    save log events (see LogEvent.save) but must not update other shared objects
+    :param first_page_number:
+    :param nbr_prefetched_pages: number of pages requested at the same time. Default: key `nbr_prefetched_pages` of
+    the config file
+    """
+    nbr_prefetched_pages = max(1, nbr_prefetched_pages or CONFIG["general"]["nbr_prefetched_pages"])
+    executor = ThreadPoolExecutor(max_workers=nbr_prefetched_pages)
+    futures = deque()
+    next_page_number = first_page_number
+    try:
+        while True:
+            while len(futures) < nbr_prefetched_pages:
+                futures.append(executor.submit(get_page, next_page_number))
+                next_page_number += 1
+            yield futures.popleft().result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
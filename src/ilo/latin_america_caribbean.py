@@ -4,18 +4,24 @@ import datetime
 import inspect
 
 import urllib3
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
 from src import CONFIG
 from src.common import filter_list_publications_and_details, get_page_from_url, generate_document_id, \
     add_base_url_if_missing, clean_text
-from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls
+from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls, \
+    insert_temp_publications_urls
 from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.document import start_downloads, Document
 from src.files_fc import LogEvent, LogLevel
 from src.organizations import get_organization_by_condition
+from src.checkpoint_fc import CHECKPOINT
+from src.incremental_fc import IncrementalCrawl
+from src.frontier_fc import PublicationPages
 from src.session import Session
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.date_fc import format_publication_date
+from src.extract_fc import ExtractionSpec, has_class
+from src.parse_fc import fetch_and_parse_pages
 
 # Disable the InsecureRequestWarning
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -24,7 +30,19 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 class IloLatinAmericaCaribbeanScraper:
     _organization_acronym: str = "ILO"
     _organization_region: str = "Latin America and the Caribbean"
+    register_name: str = ""  # Name of the scraper in src/scrapers_register.yaml (set in src/__init__.py)
+    resumable: bool = True  # Can continue from its checkpoint in a resumed session (see checkpoint_fc.py)
     _download_base_url = "https://www.ilo.org"
+    # Only the publications of the listing pages are parsed (see `get_page_from_url`)
+    _listing_page_strainer = SoupStrainer("h5", class_="item-title")
+    # Fields of the publications' pages (see extract_fc.py)
+    _extraction_spec = ExtractionSpec(fields={
+        "title": f"string((//h1[{has_class('long-title')}]//h1)[1])",
+        # Text following the first <strong> tag of the <aside> tags with class "meta-data"
+        "tags": f"(//aside[{has_class('meta-data')}]//strong)[1]/following-sibling::node()[1][self::text()]",
+        "publication_date": "string((//th[contains(., 'Date issued')])[1]/following-sibling::*[1])",
+        "links": ("//a[@href]", {"href": "string(@href)"}),
+    })
 
     def __init__(self, session: Session):
         self.session = session
@@ -37,6 +55,8 @@ class IloLatinAmericaCaribbeanScraper:
         self.total_number_of_pages = 0
         self.number_of_pdfs_found_in_current_session = 0
         self.number_of_downloaded_pdfs_in_current_session = 0
+        self.incremental_crawl = IncrementalCrawl()  # Update mode (see incremental_fc.py)
+        self.publication_pages = PublicationPages()  # Publications already processed (see frontier_fc.py)
 
         self.pdf_files_directory = generate_organization_download_pdf_directory_path(
             organization_acronym_region=self.organization_acronym + "-" + self.organization_region,
@@ -56,13 +76,21 @@ class IloLatinAmericaCaribbeanScraper:
 
     def run(self):
         # step 1: Get links of all publications
-        self.get_all_publications_links()
+        if not CHECKPOINT.is_stage_done("links"):
+            self.incremental_crawl.start(register_name=self.register_name, organization_id=self.organization.id)
+            self.get_all_publications_links()
+            self.incremental_crawl.end()
+            CHECKPOINT.save(stage="details")
 
         # step 2: Get details togethers with the download links of each publication on the current page
-        self.get_publications_details_from_urls()
+        if not CHECKPOINT.is_stage_done("details"):
+            self.get_publications_details_from_urls()
+            CHECKPOINT.save(stage="filter")
 
         # step 3: Apply filter to the list of publications list
-        filter_list_publications_and_details()
+        if not CHECKPOINT.is_stage_done("filter"):
+            filter_list_publications_and_details()
+            CHECKPOINT.save(stage="downloads")
 
         # step 4: Download new publications
         results = start_downloads(pdf_files_directory=self.pdf_files_directory)
@@ -83,16 +111,20 @@ class IloLatinAmericaCaribbeanScraper:
         max_nbr_none = 3  # Maximum number of consecutive None values for `current_page_soup` before exiting the
         # `while` loop
         last_page = False
-        page = self.starting_page  # 0 is the first page
+        position = CHECKPOINT.get_position(stage="links")  # Resumed session (see checkpoint_fc.py)
+        page = position.get("page", self.starting_page)  # 0 is the first page
+        self.max_pb_per_page = position.get("max_pb_per_page", self.max_pb_per_page)
         nbr_none = 0  # Number of consecutive None values for `current_page_soup`
         while not last_page:
             if nbr_none >= max_nbr_none:
+                self.incremental_crawl.is_partial_crawl = True  # The end of the listing was not reached
                 break
             # Get the url of the page
             page_ulr = self.get_page_url(page_number=page)
 
             # Get the current page (as a BeautifulSoup object)
-            current_page_soup = get_page_from_url(url=page_ulr, ssl_verify=False)
+            current_page_soup = get_page_from_url(url=page_ulr, ssl_verify=False,
+                                                  parse_only=self._listing_page_strainer)
 
             if current_page_soup is None:
                 nbr_none += 1
@@ -131,23 +163,16 @@ class IloLatinAmericaCaribbeanScraper:
             except:
                 publ_links = []
 
-            for publ_link in publ_links:
-                existing_url = self.session.db_handler.select_columns(
-                    columns=["*"],
-                    table_name=CONFIG["general"]["temp_publications_urls_table"],
-                    condition="url = ?",
-                    condition_vals=(publ_link,)
-                )
-
-                if not existing_url:
-                    self.session.db_handler.insert_data_into_table(
-                        table_name=CONFIG["general"]["temp_publications_urls_table"],
-                        data={"url": publ_link})
-                    nbr_retrieved_publications += 1
+            nbr_retrieved_publications += insert_temp_publications_urls(urls=publ_links)
 
             print(end=f"\r Retrieving publications: {nbr_retrieved_publications}")
 
+            # Update mode: the rest of the listing is already known (see incremental_fc.py)
+            if self.incremental_crawl.add_listing_items(publication_urls=publ_links):
+                break
+
             page += 1
+            CHECKPOINT.save(stage="links", position={"page": page, "max_pb_per_page": self.max_pb_per_page})
         print("")
 
     def get_publication_tags_list(self, publication_page_soup: BeautifulSoup) -> str:
@@ -160,141 +185,117 @@ class IloLatinAmericaCaribbeanScraper:
 
         return tags_list
 
-    def get_publication_details(self, publication_url: str) -> list:
+    @staticmethod
+    def get_publication_page_content(publication_url: str):
         """
-        Return the details of a publication
+        Return the html (bytes) of a publication's page, or None. It is parsed in another process (see parse_fc.py)
         """
-        results = []
-
-        # Get publication's page
-        pub_page = get_page_from_url(url=publication_url,
-                                     ssl_verify=False,
-                                     max_attempt=CONFIG["general"]["max_request_attempt"],
-                                     max_waiting_time_sec=CONFIG["general"]["max_waiting_time_sec"]  # 15 minutes
-                                     )
-
-        if not pub_page:  # No page related to the publication's url were returned
-            return []
+        return get_page_from_url(url=publication_url,
+                                 ssl_verify=False,
+                                 max_attempt=CONFIG["general"]["max_request_attempt"],
+                                 max_waiting_time_sec=CONFIG["general"]["max_waiting_time_sec"],  # 15 minutes
+                                 get_beautifulsoup=False
+                                 )
+
+    @classmethod
+    def extract_publication_details(cls, page, publication_url: str) -> list:
+        """
+        Return the details of each version of a publication found on its page (html or lxml tree), as dicts. Called in
+        the processes parsing the pages: only the class (not the scraper and its database connection) is sent to them
+        """
+        fields = cls._extraction_spec.extract(page)
 
         # --- Get publication's title
-        publication_title = self.get_title(soup_page=pub_page)
-        publication_title = publication_url if publication_title is None else publication_title
+        publication_title = clean_text(fields["title"])
 
         # --- Get Tags
-        tags_list = self.get_tags(soup_page=pub_page)
+        tags_list = cls.get_tags(raw_tags=fields["tags"])
 
         # --- Publication's date
-        publication_date = self.get_publication_date(soup_page=pub_page)
+        publication_date = format_publication_date(raw_date=fields["publication_date"],
+                                                   organization_acronym=cls._organization_acronym)
 
         # -- Get versions languages and file urls
-        pub_versions_links_n_lang = self.get_links_n_lang_from_page(soup_page=pub_page)
-
-        for pub_version in pub_versions_links_n_lang:
-            # --- Get download link
-            link = pub_version['url']
-
-            # --- Get current file's language
-            lang = pub_version['lang']
+        return [{"title": publication_title,
+                 "tags": tags_list,
+                 "publication_date": publication_date,
+                 "url": pub_version['url'],
+                 "lang": pub_version['lang']}
+                for pub_version in cls.get_links_n_lang(links=fields["links"])]
+
+    def get_documents(self, publication_url: str, publication_details: list) -> list:
+        """
+        Create the documents of a publication from its details (see extract_publication_details)
+        """
+        results = []
+        for pub_version in publication_details:
             # Create and id for the current pdf
             document_id = generate_document_id(organization_acronym=self.organization_acronym,
                                                org_region=self.organization_region,
-                                               publication_title=publication_title,
-                                               pdf_download_link=link)
+                                               publication_title=pub_version['title'],
+                                               pdf_download_link=pub_version['url'])
 
             results.append(
                 Document(_id=document_id,
                          session_id=self.session.id,
                          organization_id=self.organization.id,
-                         title=publication_title,
-                         tags=tags_list,
-                         publication_date=f"{publication_date}",
+                         title=pub_version['title'],
+                         tags=pub_version['tags'],
+                         publication_date=f"{pub_version['publication_date']}",
                          publication_url=publication_url,
                          downloaded_at=datetime.datetime.utcnow().isoformat(),
-                         pdf_link=link,
-                         lang=lang
+                         pdf_link=pub_version['url'],
+                         lang=pub_version['lang']
                          )
             )
 
         return results
 
-    def get_title(self, soup_page: BeautifulSoup) -> str:
-        try:
-            return clean_text(soup_page.find("h1", class_="long-title"
-                                             ).find('h1').text)
-        except:
-            return ""
-
-    def get_tags(self, soup_page: BeautifulSoup) -> str:
-        tags_list = []
-
-        # Find the <aside> tag with class "meta-data"
-        aside_tags = soup_page.find_all('aside', class_='meta-data')
+    def get_publication_details(self, publication_url: str) -> list:
+        """
+        Return the details of a publication
+        """
+        # Get publication's page
+        pub_page = self.get_publication_page_content(publication_url=publication_url)
 
-        # Get the text after the <strong> tag within the <aside> tag
-        if aside_tags:
-            strong_tag = [aside_tag.find('strong') for aside_tag in aside_tags if aside_tag.find('strong')]
-            if strong_tag:
-                strong_tag = strong_tag[0]
-                text_after_strong = strong_tag.next_sibling.strip()
+        if not pub_page:  # No page related to the publication's url were returned
+            return []
 
-                text_after_strong = text_after_strong.split(":")
-                tags = text_after_strong[0] if len(text_after_strong) < 2 else "".join(text_after_strong[1:])
-                tags_list = [clean_text(tag) for tag in tags.split(",")]
+        return self.get_documents(publication_url=publication_url,
+                                  publication_details=self.extract_publication_details(
+                                      page=pub_page, publication_url=publication_url))
 
-        tags_list = "; ".join(tags_list) if len(tags_list) else ""
+    @staticmethod
+    def get_tags(raw_tags: list) -> str:
+        """
+        :param raw_tags: field `tags` of `_extraction_spec`, e.g. ['Tags: labour migration, social protection']
+        """
+        if not raw_tags:
+            return ""
 
-        return tags_list
+        text_after_strong = raw_tags[0].strip().split(":")
+        tags = text_after_strong[0] if len(text_after_strong) < 2 else "".join(text_after_strong[1:])
 
-    def get_publication_date(self, soup_page: BeautifulSoup) -> str:
-
-        try:
-            ths = soup_page.find_all("th")
-            date_th = [th for th in ths if "Date issued" in th.text]
-            date_th = date_th[0]
-            p_date = date_th.next_sibling.text.strip()
-            d, m, y = p_date.split(" ")
-            month_number = datetime.datetime.strptime(m, '%B').month  # get the integer representation of a month
-            d, y = int(d), int(y)
-            publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-            p_date = timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
-
-            return p_date if p_date else ""
-        except:
-            return ""
+        return "; ".join([clean_text(tag) for tag in tags.split(",")])
 
-    def get_links_n_lang_from_page(self, soup_page: BeautifulSoup):
+    @classmethod
+    def get_links_n_lang(cls, links: list) -> list:
         """
         This method retrieve language and link of all available versions .
 
-        :param soup_page:
+        :param links: 'a' tags of the page (field `links` of `_extraction_spec`)
         :return:
         """
-
-        # Find all links on the page
-        all_links = soup_page.find_all("a")
-
-        if all_links is None:
-            return []
-
-        # Extract 'a' tags those href point on at least one supported file types of our list
-        a_tag_list = [atag for atag in all_links
-                      if atag.get("href") and
-                      any([atag.get("href").endswith(ftype) for ftype in CONFIG["general"]["file_types"]])
-                      ]
-        if not len(a_tag_list):
-            return []
-
-        # Extract the link langs and links
-        list_links = [
+        # Links those href point on at least one supported file types of our list
+        return [
             {
                 'lang': "",  # No language are provided
-                'url': add_base_url_if_missing(base_url=self.download_base_url, url=atag.get("href"))
+                'url': add_base_url_if_missing(base_url=cls._download_base_url, url=link["href"])
             }
-            for atag in a_tag_list
+            for link in links
+            if any([link["href"].endswith(ftype) for ftype in CONFIG["general"]["file_types"]])
         ]
 
-        return list_links
-
     def get_publications_details_from_urls(self):
         """
         This function takes a list of publication links and
@@ -308,19 +309,37 @@ class IloLatinAmericaCaribbeanScraper:
         chunk_total = length_publications_urls / chunk_size
         chunk_total = int(chunk_total) + 1 if int(chunk_total) < chunk_total else int(chunk_total)
 
-        start_id = 0
+        self.publication_pages.start(organization_id=self.organization.id)
+
+        start_id = CHECKPOINT.get_last_id_temp(stage="details") + 1  # Resumed session (see checkpoint_fc.py)
         ind = 0
         for i in range(chunk_total):
             result_publications_urls = get_chunk_temp_publications_urls(from_id=start_id,
                                                                         limit=chunk_size)
+            if not result_publications_urls:
+                break
 
             publications_urls = [purl['url'] for purl in result_publications_urls]
             last_url = result_publications_urls[-1]
             start_id = last_url['id'] + 1
 
-            for page_url in publications_urls:
-                publication_details = self.get_publication_details(
-                    publication_url=page_url)  # Get the download link
+            # The publications whose documents were recently saved are not fetched again (see frontier_fc.py)
+            urls_to_fetch = self.publication_pages.get_urls_to_fetch(urls=publications_urls)
+            ind += len(publications_urls) - len(urls_to_fetch)
+
+            # The pages are fetched in threads and parsed in other processes, the documents are stored here
+            for page_url, publication_details in fetch_and_parse_pages(urls=urls_to_fetch,
+                                                                       fetch=self.get_publication_page_content,
+                                                                       extract=self.extract_publication_details,
+                                                                       parser=None):
+                # Unchanged publication: its documents are already saved
+                if not self.publication_pages.save_page(publication_url=page_url,
+                                                        publication_details=publication_details):
+                    ind += 1
+                    continue
+
+                publication_details = self.get_documents(publication_url=page_url,
+                                                         publication_details=publication_details)
                 if not publication_details:
                     print("Warning. A pdf will be missing: Download link was not found for: ", page_url)
                 else:
@@ -334,6 +353,10 @@ class IloLatinAmericaCaribbeanScraper:
 
                 print(end=f"\r Retrieving publication details: {round(100 * ind / length_publications_urls, 2)}% ")
 
+            CHECKPOINT.save(stage="details", last_id_temp=last_url['id'])
+
+        self.publication_pages.end()
+
     def get_page_url(self, page_number: int) -> str:
         """
         This function generate the url of a page based on the page number
@@ -0,0 +1,144 @@
+"""
+This file contains the update mode of the scrapers whose listing is sorted from the newest to the oldest publication.
+Instead of walking all the pages of the listing at each session, the crawl stops once a number of consecutive items of
+the listing (`incremental_crawl.nbr_known_items_to_stop` of the config file) are already in the documents table: the
+rest of the listing was collected by a previous session.
+A full crawl is still done periodically (`incremental_crawl.full_sweep_every_days`), e.g. to catch the publications
+added in the middle of the listing or the ones whose download failed.
+The update mode is enabled per scraper with the key `incremental` of src/scrapers_register.yaml.
+"""
+import datetime
+import inspect
+import os
+from functools import lru_cache
+
+from .db_handler import get_scraper_state, save_scraper_state
+from .files_fc import CONFIG, LogEvent, LogLevel, load_yaml
+from .known_fc import KnownDocuments
+
+
+@lru_cache(maxsize=None)
+def get_registered_scrapers() -> dict:
+    return load_yaml(filepath=os.path.join('src', 'scrapers_register.yaml'))
+
+
+def is_incremental_scraper(register_name: str) -> bool:
+    """
+    :param register_name: name of the scraper in the register (e.g. 'ilo-beirut')
+    :return: True if the update mode is enabled for the scraper
+    """
+    return bool((get_registered_scrapers().get(register_name) or {}).get("incremental", False))
+
+
+def is_full_sweep_forced() -> bool:
+    """
+    :return: True if the whole listings must be crawled in this session (`incremental_crawl.force_full_sweep` of the
+    config file or option `--full-sweep` of main.py)
+    """
+    return bool(CONFIG["general"]["incremental_crawl"].get("force_full_sweep", False))
+
+
+def is_full_sweep_due(register_name: str) -> bool:
+    """
+    :param register_name:
+    :return: True if the whole listing was never crawled, if the last full crawl is too old or if it is forced
+    """
+    if is_full_sweep_forced():
+        return True
+    full_sweep_every_days = CONFIG["general"]["incremental_crawl"]["full_sweep_every_days"]
+    state = get_scraper_state(name=register_name)
+    if state is None or not state['last_full_sweep_at']:
+        return True
+    if full_sweep_every_days <= 0:
+        return False
+    last_full_sweep_at = datetime.datetime.fromisoformat(state['last_full_sweep_at'])
+    return datetime.datetime.utcnow() - last_full_sweep_at >= datetime.timedelta(days=full_sweep_every_days)
+
+
+class IncrementalCrawl:
+    """
+    Follow the items of a listing (newest first) to know when the already known publications are reached.
+    Usage in a scraper:
+        self.incremental_crawl.start(register_name=self.register_name, organization_id=self.organization.id)
+        for each page of the listing:
+            ...
+            if self.incremental_crawl.add_listing_items(publication_urls=publ_links):
+                break  # The rest of the listing is already known
+        self.incremental_crawl.end()
+    If the crawl of a listing stops before its end for another reason (e.g. pages that could not be loaded), the
+    scraper sets `is_partial_crawl` to True: the date of the full crawl is then not saved.
+    Before `start`, the listing is always crawled entirely.
+    """
+
+    def __init__(self):
+        self.register_name = ""
+        self.is_active = False  # False if the update mode is disabled or if a full crawl is due
+        self.known_documents = KnownDocuments()
+        self.nbr_consecutive_known_items = 0
+        self.frontier_reached = False  # True if the crawl of the current listing can stop
+        self.is_partial_crawl = False  # True if a listing was not crawled entirely during this session
+
+    def start(self, register_name: str, organization_id: int):
+        """
+        :param register_name: name of the scraper in the register (e.g. 'ilo-beirut')
+        :param organization_id:
+        """
+        self.register_name = register_name
+        self.is_partial_crawl = False
+        self.start_listing()
+        self.is_active = is_incremental_scraper(register_name=register_name) and \
+            not is_full_sweep_due(register_name=register_name)
+        if self.is_active:
+            self.known_documents.load(organization_id=organization_id)
+            print(f" Update mode: {self.known_documents.nbr_documents} known documents")
+
+    def start_listing(self):
+        """
+        To call before crawling another listing of the same scraper (e.g. second source of ILO global)
+        """
+        self.nbr_consecutive_known_items = 0
+        self.frontier_reached = False
+
+    def is_known(self, publication_url: str = "", document_id: str = "") -> bool:
+        return self.is_active and self.known_documents.is_known(publication_url=publication_url,
+                                                                document_id=document_id)
+
+    def add_listing_items(self, publication_urls: list = None, document_ids: list = None) -> bool:
+        """
+        Follow the items of a page of the listing, in the order of the listing
+        :param publication_urls: urls of the publications of the page
+        :param document_ids: or ids of the documents of the page (e.g. for the APIs returning the documents directly)
+        :return: True if the crawl of the listing can stop (the known publications are reached)
+        """
+        if not self.is_active or self.frontier_reached:
+            return self.frontier_reached
+
+        for publication_url in publication_urls or []:
+            self.follow_item(is_known=self.is_known(publication_url=publication_url))
+        for document_id in document_ids or []:
+            self.follow_item(is_known=self.is_known(document_id=document_id))
+
+        nbr_known_items_to_stop = CONFIG["general"]["incremental_crawl"]["nbr_known_items_to_stop"]
+        if self.nbr_consecutive_known_items >= nbr_known_items_to_stop:
+            self.frontier_reached = True
+            self.is_partial_crawl = True
+            msg = f"Update mode: {self.nbr_consecutive_known_items} known publications in a row for " \
+                  f"{self.register_name}. The rest of the listing is skipped."
+            print(f"\n {msg}")
+            LogEvent(level=LogLevel.INFO.value,
+                     message=msg,
+                     function_name=inspect.currentframe().f_code.co_name).save()
+
+        return self.frontier_reached
+
+    def follow_item(self, is_known: bool):
+        self.nbr_consecutive_known_items = self.nbr_consecutive_known_items + 1 if is_known else 0
+
+    def end(self):
+        """
+        To call once the listing was crawled. If it was crawled entirely (`is_partial_crawl` is False), the date of
+        the full crawl is saved
+        """
+        if self.register_name and not self.is_partial_crawl:
+            save_scraper_state(name=self.register_name,
+                               data={"last_full_sweep_at": datetime.datetime.utcnow().isoformat()})
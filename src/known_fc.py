@@ -0,0 +1,156 @@
+"""
+This file contains the filter of the documents already downloaded for an organization, queried while the listings are
+crawled to not fetch again the pages of the known publications (see incremental_fc.py and frontier_fc.py).
+The publications' urls, pdf links and ids of the documents are hashed once (64 bits) and kept in:
+- a Bloom filter, sized from the number of documents: most of the urls of a listing are not known, and the filter
+  answers `no` with a few bit tests
+- a set of the hashes, to check its `yes` answers: the filter has no false positive
+The publications' urls are canonicalized (see url_fc.py), so that the variants of the url of a known publication are
+known too. The filter is saved in `known_documents.files_path` with a summary of the documents table (number of
+documents, of errors, date of the last download). The next sessions load the file instead of reading all the
+documents of the organization, and build it again from the table only if the summary changed.
+"""
+import hashlib
+import inspect
+import json
+import math
+import os
+from array import array
+
+from .db_handler import get_known_publications, get_known_publications_signature
+from .files_fc import CONFIG, LogEvent, LogLevel
+from .url_fc import canonicalize_url
+
+FILE_VERSION = 2  # Changed when the keys of the filter change (2: canonical urls). The older files are built again
+
+
+def get_key_hash(key: str) -> int:
+    """
+    :return: 64 bits hash of a key (e.g. 'url:https://...')
+    """
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+
+
+class BloomFilter:
+
+    def __init__(self, nbr_items: int, false_positive_rate: float = 0.001):
+        """
+        :param nbr_items: expected number of items
+        :param false_positive_rate:
+        """
+        nbr_items = max(nbr_items, 1)
+        self.nbr_bits = max(8, int(math.ceil(-nbr_items * math.log(false_positive_rate) / math.log(2) ** 2)))
+        self.nbr_hashes = max(1, round(self.nbr_bits / nbr_items * math.log(2)))
+        self.bits = bytearray((self.nbr_bits + 7) // 8)
+
+    def get_positions(self, key_hash: int):
+        # Double hashing: the positions are derived from the two halves of the hash
+        h1, h2 = key_hash & 0xFFFFFFFF, (key_hash >> 32) | 1
+        return ((h1 + i * h2) % self.nbr_bits for i in range(self.nbr_hashes))
+
+    def add(self, key_hash: int):
+        for position in self.get_positions(key_hash=key_hash):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key_hash: int) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self.get_positions(key_hash=key_hash))
+
+
+class KnownDocuments:
+    """
+    Usage:
+        known_documents = KnownDocuments()
+        known_documents.load(organization_id=self.organization.id)
+        if known_documents.is_known(publication_url=url):
+            ...  # All the documents of the publication were downloaded in previous sessions
+    """
+
+    def __init__(self):
+        self.organization_id = None
+        self.bloom_filter = BloomFilter(nbr_items=0)
+        self.hashes = set()
+        self.nbr_documents = 0
+
+    @staticmethod
+    def get_filepath(organization_id: int) -> str:
+        return os.path.join(*CONFIG["general"]["known_documents"]["files_path"], f"{organization_id}.bin")
+
+    def load(self, organization_id: int):
+        """
+        Load the saved filter of the organization, or build it from the documents table if the documents changed
+        :param organization_id:
+        """
+        self.organization_id = organization_id
+        signature = get_known_publications_signature(organization_id=organization_id)
+        if self.load_file(signature=signature):
+            return
+
+        publication_urls, pdf_links, document_ids = get_known_publications(organization_id=organization_id)
+        keys = [f"url:{canonicalize_url(url=url)}" for url in publication_urls] + \
+            [f"pdf:{link}" for link in pdf_links] + [f"id:{document_id}" for document_id in document_ids]
+        self.nbr_documents = len(document_ids)
+        self.bloom_filter = BloomFilter(nbr_items=len(keys),
+                                        false_positive_rate=CONFIG["general"]["known_documents"]["false_positive_rate"])
+        self.hashes = set()
+        for key in keys:
+            key_hash = get_key_hash(key=key)
+            self.bloom_filter.add(key_hash=key_hash)
+            self.hashes.add(key_hash)
+        self.save_file(signature=signature)
+
+    def load_file(self, signature: str) -> bool:
+        """
+        :return: True if the saved filter is up-to-date with the documents table and was loaded
+        """
+        filepath = self.get_filepath(organization_id=self.organization_id)
+        if not os.path.exists(filepath):
+            return False
+        try:
+            with open(filepath, "rb") as file:
+                header = json.loads(file.readline())
+                if header.get("version") != FILE_VERSION or header["signature"] != signature:
+                    return False
+                bloom_filter = BloomFilter(nbr_items=0)
+                bloom_filter.nbr_bits, bloom_filter.nbr_hashes = header["nbr_bits"], header["nbr_hashes"]
+                bloom_filter.bits = bytearray(file.read(header["nbr_bytes"]))
+                hashes = array("Q")
+                hashes.frombytes(file.read())
+        except:
+            return False
+        self.bloom_filter = bloom_filter
+        self.hashes = set(hashes)
+        self.nbr_documents = header["nbr_documents"]
+        return True
+
+    def save_file(self, signature: str):
+        filepath = self.get_filepath(organization_id=self.organization_id)
+        header = {"version": FILE_VERSION, "signature": signature, "nbr_documents": self.nbr_documents,
+                  "nbr_bits": self.bloom_filter.nbr_bits, "nbr_hashes": self.bloom_filter.nbr_hashes,
+                  "nbr_bytes": len(self.bloom_filter.bits)}
+        try:
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, "wb") as file:
+                file.write(json.dumps(header).encode() + b"\n")
+                file.write(bytes(self.bloom_filter.bits))
+                file.write(array("Q", self.hashes).tobytes())
+        except BaseException as e:
+            LogEvent(level=LogLevel.WARNING.value,
+                     message=f"The filter of the known documents could not be saved in {filepath}",
+                     function_name=inspect.currentframe().f_code.co_name,
+                     exception=e.__str__()).save()
+
+    def contains(self, key: str) -> bool:
+        key_hash = get_key_hash(key=key)
+        return key_hash in self.bloom_filter and key_hash in self.hashes
+
+    def is_known(self, publication_url: str = "", pdf_link: str = "", document_id: str = "") -> bool:
+        """
+        :param publication_url: known if all its documents were downloaded (see db_handler.get_known_publications)
+        :param pdf_link:
+        :param document_id:
+        :return: True if one of the given values is known
+        """
+        return bool(publication_url and self.contains(key=f"url:{canonicalize_url(url=publication_url)}")) or \
+            bool(pdf_link and self.contains(key=f"pdf:{pdf_link}")) or \
+            bool(document_id and self.contains(key=f"id:{document_id}"))
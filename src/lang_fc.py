@@ -0,0 +1,173 @@
+"""
+This file contains the functions used to identify the language of a publication (UN languages of the config file).
+The lists of languages of the config file are compiled once into dictionaries and regular expressions, so that
+resolving a language costs a single pass on the text, whatever the number of languages.
+"""
+import re
+from functools import lru_cache
+
+from .files_fc import CONFIG
+
+
+def compile_words_regex(words: list) -> str:
+    """
+    Build a regular expression matching any of the words. The words are merged in a prefix tree (trie) so that, at each
+    position of a text, the regex engine follows only one branch instead of trying every word one after another.
+    e.g ['en', 'eng', 'es'] -> 'e(?:n(?:g)?|s)'
+    :param words:
+    :return: the pattern (not compiled)
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True  # End of a word
+
+    def trie_to_pattern(node: dict) -> str:
+        is_word_end = "" in node
+        branches = [re.escape(char) + trie_to_pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if is_word_end:
+            # The word can stop here: the rest is optional
+            pattern = f"(?:{pattern})?" if len(branches) == 1 else f"{pattern}?"
+        return pattern
+
+    return trie_to_pattern(trie)
+
+
+class LanguageIndex:
+    """
+    Compiled version of the key `un_languages` of the config file:
+    - lang_dict: any form of a language -> language name (e.g. 'eng' -> 'ENGLISH')
+    - code2: 2-letters codes (e.g. 'en')
+    - code3: 3-letters codes (e.g. 'ENG')
+    """
+
+    def __init__(self, un_languages: dict):
+        lang_dict = un_languages['lang_dict']
+
+        # Language names in lower case -> language name as written in the config (e.g 'english' -> 'ENGLISH'). The rank
+        # is the position of the first occurrence of the name in lang_dict (used to break ties)
+        self.names = {}
+        self.names_rank = {}
+        for lg in lang_dict.values():
+            if lg.lower() not in self.names:
+                self.names[lg.lower()] = lg
+                self.names_rank[lg.lower()] = len(self.names_rank)
+
+        # A name can start with another one (e.g 'arab' and 'arabic'): the regex only returns the longest at a position
+        self.names_prefixes = {name: [nm for nm in self.names if nm != name and name.startswith(nm)]
+                               for name in self.names}
+
+        self.code2 = {lg.lower(): lang_dict.get(lg.lower(), "") for lg in un_languages['code2']}
+        self.code3 = {lg.lower(): lang_dict.get(lg.lower(), "") for lg in un_languages['code3']}
+
+        # The lookahead `(?=(...))` returns every occurrence, even overlapping ones
+        self.names_regex = re.compile(f"(?=({compile_words_regex(list(self.names.keys()))}))")
+        self.code2_regex = re.compile(rf"\(({compile_words_regex(list(self.code2.keys()))})\)")
+        self.code3_regex = re.compile(rf"\(({compile_words_regex(list(self.code3.keys()))})\)")
+
+    def find_names(self, text_: str) -> set:
+        """
+        Return the set of language names (lower case) found in the text (lower case)
+        """
+        names = set(self.names_regex.findall(text_))
+        for name in list(names):
+            names.update(self.names_prefixes[name])
+        return names
+
+    def format_language(self, lang: str) -> str:
+        """
+        Return the name of the language (e.g. 'ENGLISH') given in `lang`, or "" if no language or several languages
+        were found. Checks, in this order:
+        - `lang` is a language name: 'English'
+        - `lang` contains one language name, between brackets, next to the word 'version' or at the end:
+        '2020 ASDR - EXECUTIVE SUMMARY (ENGLISH)', 'English version'
+        - `lang` contains one 3-letters code between brackets: 'Report (ENG)'
+        - `lang` is a 2-letters code or contains one between brackets: 'en', 'Report (en)'
+        :param lang:
+        :return:
+        """
+        lang = lang.lower()
+        if lang in self.names:
+            return self.names[lang]
+
+        # For cases where lang = "2020 ASDR - EXECUTIVE SUMMARY (ENGLISH)"
+        lang_in_string = self.find_names(text_=lang)
+        if len(lang_in_string) == 1:
+            lang_in_string = lang_in_string.pop()
+            if f"({lang_in_string})" in lang or f"{lang_in_string} version" in lang or \
+                    f"version {lang_in_string}" in lang or lang.endswith(lang_in_string):
+                return self.names[lang_in_string]
+
+        # For languages code3 ('ENG', 'FRA', ...)
+        lang_in_string = set(self.code3_regex.findall(lang))
+        if len(lang_in_string) == 1:
+            return self.code3[lang_in_string.pop()]
+
+        # For languages code2 ('EN', 'FR', ...)
+        lang_in_string = set(self.code2_regex.findall(lang))
+        if lang in self.code2:
+            lang_in_string.add(lang)
+        if len(lang_in_string) == 1:
+            return self.code2[lang_in_string.pop()]
+
+        return ""
+
+    def get_language_from_text(self, text_: str) -> str:
+        """
+        Return the name of the language mentioned in the text (e.g. 'HDR 2022 - French.pdf' -> 'FRENCH'), or "" if
+        none. If several languages are mentioned, the first one in the config file's `lang_dict` is returned.
+        :param text_:
+        :return:
+        """
+        if not isinstance(text_, str):
+            return ""
+
+        languages = self.find_names(text_=text_.lower())
+        if not languages:
+            return ""
+
+        return self.names[min(languages, key=lambda lg: self.names_rank[lg])]
+
+
+LANGUAGE_INDEX = LanguageIndex(un_languages=CONFIG['general']['un_languages'])
+
+
+@lru_cache(maxsize=4096)
+def format_language(lang: str) -> str:
+    return LANGUAGE_INDEX.format_language(lang=lang)
+
+
+@lru_cache(maxsize=4096)
+def _get_language_from_text(text_: str) -> str:
+    return LANGUAGE_INDEX.get_language_from_text(text_=text_)
+
+
+def get_language_from_text(text_: str) -> str:
+    if not isinstance(text_, str):
+        return ""
+    return _get_language_from_text(text_=text_)
+
+
+def format_languages(langs: list) -> list:
+    """
+    Batch version of `format_language`: each distinct value is resolved once
+    :param langs: list of strings
+    :return: list of language names, in the same order as `langs`
+    """
+    results = {lang: format_language(lang=lang) for lang in set(langs)}
+    return [results[lang] for lang in langs]
+
+
+def get_languages_from_texts(texts: list) -> list:
+    """
+    Batch version of `get_language_from_text`: each distinct text is processed once
+    :param texts: list of strings
+    :return: list of language names, in the same order as `texts`
+    """
+    results = {text_: get_language_from_text(text_=text_) for text_ in set(texts)}
+    return [results[text_] for text_ in texts]
@@ -0,0 +1,167 @@
+"""
+This file contains the parse stage of the scrapers: the pages of the publications are fetched in threads (network
+bound) and parsed in a pool of processes (CPU bound), so that parsing uses all the cores of the machine.
+
+The extraction function of a scraper receives the page (BeautifulSoup object, or its raw html: see extract_fc.py) and
+its url, and returns plain dicts (e.g. {"title": ..., "url": ...}). It is sent to the other processes, so it must be
+picklable: a function of a module or a classmethod (not a method of a scraper instance, which holds the database
+connection). The dicts are turned into `Document` rows in the main process.
+The processes are forked (on the systems which cannot fork, e.g. Windows, the pages are parsed in the main process).
+The pool of processes is started once, at the first page to parse, before the threads fetching the pages,
+and reused by the next chunks of pages and the next scrapers: forking a process while other threads are running can
+deadlock it. It is shut down at the end of the session (see shutdown_parse_pool).
+"""
+import inspect
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from bs4 import BeautifulSoup
+
+from .files_fc import CONFIG, LogEvent, LogLevel
+from .http_fc import iter_prefetched_pages
+
+
+def get_nbr_parse_processes() -> int:
+    """
+    :return: number of processes parsing the pages (key `parsing.nbr_processes` of the config file, 0: one per CPU)
+    """
+    nbr_processes = CONFIG["general"]["parsing"]["nbr_processes"]
+    return nbr_processes if nbr_processes > 0 else (os.cpu_count() or 1)
+
+
+def is_fork_available() -> bool:
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def wake_up() -> bool:
+    return True
+
+
+_PARSE_POOL = None
+_PARSE_POOL_SIZE = 0
+_PARSE_POOL_LOCK = threading.Lock()
+
+
+def get_parse_pool(nbr_processes: int) -> ProcessPoolExecutor:
+    """
+    Return the pool of processes shared by the scrapers (started at the first call, or again if the number of
+    processes changed)
+    """
+    global _PARSE_POOL, _PARSE_POOL_SIZE
+    with _PARSE_POOL_LOCK:
+        if _PARSE_POOL is None or _PARSE_POOL_SIZE != nbr_processes:
+            if _PARSE_POOL is not None:
+                _PARSE_POOL.shutdown(wait=True, cancel_futures=True)
+            _PARSE_POOL = ProcessPoolExecutor(max_workers=nbr_processes, mp_context=multiprocessing.get_context("fork"))
+            _PARSE_POOL_SIZE = nbr_processes
+            # The processes are started by the first task: they must be forked before the threads fetching the pages
+            _PARSE_POOL.submit(wake_up).result()
+        return _PARSE_POOL
+
+
+def shutdown_parse_pool():
+    """
+    Stop the processes of the shared pool. A new pool is started if pages are parsed afterwards
+    """
+    global _PARSE_POOL, _PARSE_POOL_SIZE
+    with _PARSE_POOL_LOCK:
+        pool, _PARSE_POOL, _PARSE_POOL_SIZE = _PARSE_POOL, None, 0
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def parse_page(extract, url: str, content: bytes, parser: str) -> tuple:
+    """
+    Parse a page and apply the extraction function to it. Runs in a process of the pool
+    :param extract: function(soup_page, url) -> list of dicts
+    :param url:
+    :param content: raw html of the page
+    :param parser: parser of BeautifulSoup. If None, the raw html is given to the extraction function
+    :return: (list of dicts, error message)
+    """
+    try:
+        return extract(BeautifulSoup(content, parser) if parser else content, url), ""
+    except BaseException as e:
+        return [], e.__str__()
+
+
+def iter_parsed_pages(pages, extract, parser: str, nbr_processes: int = 0, max_pages_in_flight: int = 0):
+    """
+    Parse the pages in a pool of processes. The results are yielded as soon as they are ready (not in the order of
+    `pages`). At most `max_pages_in_flight` pages are waiting to be parsed: the next pages are only read from `pages`
+    when a page is parsed.
+    :param pages: iterable of (url, content). content is None if the page could not be fetched
+    :param extract: picklable function(soup_page, url) -> list of dicts
+    :param parser: parser of BeautifulSoup (e.g. 'lxml'), or None (see parse_page)
+    :param nbr_processes: default: see get_nbr_parse_processes. If 1, the pages are parsed in the current process, as
+    on the systems which cannot fork processes (a spawned process imports the package again, creating a new session)
+    :param max_pages_in_flight: default: key `parsing.max_pages_in_flight` of the config file
+    :return: generator of (url, list of dicts). The list is empty if the page could not be fetched or parsed
+    """
+    nbr_processes = (nbr_processes if nbr_processes else get_nbr_parse_processes()) if is_fork_available() else 1
+    max_pages_in_flight = max(nbr_processes, max_pages_in_flight if max_pages_in_flight else
+                              CONFIG["general"]["parsing"]["max_pages_in_flight"])
+
+    def get_results(url: str, results: tuple) -> tuple:
+        items, error = results
+        if error:
+            msg = f"The page '{url}' could not be parsed: {error}"
+            LogEvent(level=LogLevel.ERROR.value,
+                     message=msg,
+                     function_name=inspect.currentframe().f_code.co_name).save()
+        return url, items
+
+    if nbr_processes <= 1:
+        for url, content in pages:
+            yield (url, []) if content is None else get_results(url, parse_page(extract, url, content, parser))
+        return
+
+    executor = get_parse_pool(nbr_processes=nbr_processes)  # Before the first page is read from `pages`
+    in_flight = {}  # future -> url
+    try:
+        for url, content in pages:
+            if content is None:
+                yield url, []
+                continue
+
+            in_flight[executor.submit(parse_page, extract, url, content, parser)] = url
+            while len(in_flight) >= max_pages_in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield get_results(in_flight.pop(future), future.result())
+
+        for future in list(in_flight):
+            yield get_results(in_flight.pop(future), future.result())
+    finally:
+        for future in in_flight:  # The iteration was stopped: the pages not parsed yet are discarded
+            future.cancel()
+
+
+def fetch_and_parse_pages(urls: list, fetch, extract, parser: str, nbr_processes: int = 0,
+                          max_pages_in_flight: int = 0):
+    """
+    Fetch the pages in threads (see iter_prefetched_pages) and parse them in a pool of processes (see
+    iter_parsed_pages)
+    :param urls:
+    :param fetch: function(url) -> content of the page (bytes), or None
+    :param extract: picklable function(soup_page, url) -> list of dicts
+    :param parser: parser of BeautifulSoup (e.g. 'lxml'), or None (see parse_page)
+    :param nbr_processes:
+    :param max_pages_in_flight:
+    :return: generator of (url, list of dicts)
+    """
+    def fetch_page(index: int):
+        return (urls[index], fetch(urls[index])) if index < len(urls) else None
+
+    def iter_fetched_pages():
+        pages = iter_prefetched_pages(get_page=fetch_page)
+        try:
+            for _ in urls:
+                yield next(pages)
+        finally:
+            pages.close()
+
+    return iter_parsed_pages(pages=iter_fetched_pages(), extract=extract, parser=parser, nbr_processes=nbr_processes,
+                             max_pages_in_flight=max_pages_in_flight)
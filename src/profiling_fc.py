@@ -0,0 +1,172 @@
+"""
+This file contains functions used to profile the execution of a scraper (CPU and memory). It is used by `main.py`
+when the program is started with the option `--profile`
+"""
+import cProfile
+import inspect
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from .files_fc import CONFIG, LogEvent, LogLevel
+
+PROFILE_MODES = ["cpu", "memory"]
+
+
+def get_profiles_directory(session_id: int) -> str:
+    """
+    Return (and create if needed) the directory where the profiles of a session are stored: logs/profiles/<session id>
+    :param session_id: id of the current session
+    :return:
+    """
+    profiles_dir = os.path.join("logs", "profiles", f"{session_id}")
+    if not os.path.exists(profiles_dir):
+        os.makedirs(profiles_dir)
+        print(f"Directory '{profiles_dir}' created successfully.")
+
+    return profiles_dir
+
+
+def format_profile_file_name(scraper_name: str) -> str:
+    return scraper_name.lower().replace(" ", "-")
+
+
+class StackSampler:
+    """
+    Sampling profiler. A background thread periodically records the call stack of the profiled thread.
+    Stacks are saved in the `collapsed` format (one line per stack: frame_1;frame_2;...;frame_n count), which can be
+    given directly to flamegraph tools (flamegraph.pl, speedscope, ...)
+    """
+
+    def __init__(self, interval_ms: float, thread_id: int = None):
+        self.interval_sec = interval_ms / 1000
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.stacks = {}  # collapsed stack -> number of samples
+        self.nbr_samples = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+
+    def _sample(self):
+        while not self._stop_event.wait(self.interval_sec):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                             .replace(";", ":"))
+                frame = frame.f_back
+            collapsed_stack = ";".join(reversed(stack))
+
+            self.stacks[collapsed_stack] = self.stacks.get(collapsed_stack, 0) + 1
+            self.nbr_samples += 1
+
+    def save(self, filepath: str) -> bool:
+        try:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                for stack, count in sorted(self.stacks.items(), key=lambda x: x[1], reverse=True):
+                    f.write(f"{stack} {count}\n")
+            return True
+        except BaseException as e:
+            print(e.__str__())
+            return False
+
+
+def save_top_allocations(snapshot: tracemalloc.Snapshot, filepath: str, top_n: int, peak_size: int) -> bool:
+    """
+    Write a report of the `top_n` lines of code that allocated the most memory
+    :param snapshot: tracemalloc snapshot taken at the end of the run
+    :param filepath:
+    :param top_n: number of lines to keep in the report
+    :param peak_size: peak of traced memory, in bytes
+    :return:
+    """
+    # Hide allocations made by the profiler itself
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+    stats = snapshot.statistics('traceback')
+
+    try:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(f"Peak traced memory: {round(peak_size / 1024 ** 2, 2)} MiB\n")
+            f.write(f"Memory still allocated at the end of the run: "
+                    f"{round(sum(stat.size for stat in stats) / 1024 ** 2, 2)} MiB\n\n")
+            f.write(f"Top {top_n} allocations\n")
+            for ind, stat in enumerate(stats[:top_n]):
+                f.write(f"\n#{ind + 1}: {round(stat.size / 1024, 1)} KiB in {stat.count} blocks\n")
+                for line in stat.traceback.format():
+                    f.write(f"{line}\n")
+        return True
+    except BaseException as e:
+        print(e.__str__())
+        return False
+
+
+def run_with_profiler(scraper, scraper_name: str, mode: str, session_id: int):
+    """
+    Run the scraper and profile it.
+    - cpu: save a cProfile file (<scraper name>.prof) and the collapsed stacks of a sampling profiler
+    (<scraper name>.collapsed)
+    - memory: save a report of the top allocations made with tracemalloc (<scraper name>_memory.txt)
+    :param scraper: scraper instance. Its method `run` is called
+    :param scraper_name: name of the scraper. Used to name the files
+    :param mode: 'cpu' or 'memory'
+    :param session_id: id of the current session. Files are saved in logs/profiles/<session id>
+    :return: the value returned by `scraper.run()`
+    """
+    profiling_config = CONFIG["general"]["profiling"]
+    filepath = os.path.join(get_profiles_directory(session_id=session_id), format_profile_file_name(scraper_name))
+
+    run_result = None
+    start_time = time.perf_counter()
+    if mode == "cpu":
+        profiler = cProfile.Profile()
+        sampler = StackSampler(interval_ms=profiling_config["sampling_interval_ms"])
+        sampler.start()
+        profiler.enable()
+        try:
+            run_result = scraper.run()
+        finally:
+            profiler.disable()
+            sampler.stop()
+            profiler.dump_stats(f"{filepath}.prof")
+            sampler.save(filepath=f"{filepath}.collapsed")
+            files = [f"{filepath}.prof", f"{filepath}.collapsed"]
+    elif mode == "memory":
+        tracemalloc.start(profiling_config["tracemalloc_nframes"])
+        try:
+            run_result = scraper.run()
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak_size = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            save_top_allocations(snapshot=snapshot,
+                                 filepath=f"{filepath}_memory.txt",
+                                 top_n=profiling_config["top_n_allocations"],
+                                 peak_size=peak_size)
+            files = [f"{filepath}_memory.txt"]
+    else:
+        raise ValueError(f"Unknown profile mode '{mode}'. Expected one of {PROFILE_MODES}")
+
+    msg = f"{scraper_name} profiled ({mode}) in {round(time.perf_counter() - start_time, 2)} sec. " \
+          f"Profile saved in: {', '.join(files)}"
+    print(f"\n{msg}")
+    LogEvent(level=LogLevel.INFO.value,
+             message=msg,
+             function_name=inspect.currentframe().f_code.co_name).save()
+
+    return run_result
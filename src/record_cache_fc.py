@@ -0,0 +1,108 @@
+"""
+This file contains the cache of the files of the records returned by an API, one request per record (e.g. UN digital
+library: `api/v1/file?recid=...`). The files of a record are kept in the table `record_files` with the date of their
+last modification (`modified` of the API) and the date they were requested:
+- the records not modified for `record_files.stable_after_days` days are never requested again: the files of the old
+  records do not change
+- the other ones are requested again after `record_files.refetch_after_days` days
+The records not in the cache (or due for a new request) are requested by several threads at a time, the database is
+only used by the main thread. A failed request is not cached: the record is requested again in the next session.
+"""
+import datetime
+import inspect
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from .db_handler import get_record_files, save_record_files
+from .files_fc import CONFIG, LogEvent, LogLevel
+
+
+class RecordFilesCache:
+    """
+    Usage in a scraper (details of the publications):
+        self.record_files_cache.start(organization_id=self.organization.id)
+        for each chunk of records:
+            files_by_recid = self.record_files_cache.get_files(recids=recids,
+                                                               fetch_files=self.get_publications_details_from_api)
+        self.record_files_cache.end()
+    """
+
+    def __init__(self):
+        self.organization_id = None
+        self.nbr_cached_records = 0  # Records not requested
+        self.nbr_fetched_records = 0
+        self.nbr_failed_records = 0
+
+    def start(self, organization_id: int):
+        self.organization_id = organization_id
+        self.nbr_cached_records = 0
+        self.nbr_fetched_records = 0
+        self.nbr_failed_records = 0
+
+    @staticmethod
+    def is_up_to_date(record: dict) -> bool:
+        """
+        :param record: row of the table `record_files`
+        :return: True if the files of the record do not need to be requested again
+        """
+        now = datetime.datetime.utcnow()
+        stable_after_days = CONFIG["general"]["record_files"]["stable_after_days"]
+        if stable_after_days > 0 and record['last_modified']:
+            try:
+                last_modified = datetime.datetime.fromisoformat(record['last_modified'][:19])
+                if now - last_modified >= datetime.timedelta(days=stable_after_days):
+                    return True
+            except:
+                pass
+        fetched_at = datetime.datetime.fromisoformat(record['fetched_at'])
+        return now - fetched_at < datetime.timedelta(days=CONFIG["general"]["record_files"]["refetch_after_days"])
+
+    def get_files(self, recids: list, fetch_files) -> dict:
+        """
+        :param recids: ids of the records
+        :param fetch_files: function requesting the files of a record: fetch_files(recid) -> (list of dicts with the
+        key 'modified' (e.g. '2023-08-04 16:17:48'), "") or (None, error message) if the request failed. Called in
+        threads: the errors are logged here, by the main thread
+        :return: {recid: list of files} (the records whose request failed are missing)
+        """
+        records = get_record_files(organization_id=self.organization_id, recids=recids)
+        files_by_recid = {recid: json.loads(records[recid]['files']) for recid in recids
+                          if recid in records and self.is_up_to_date(record=records[recid])}
+        self.nbr_cached_records += len(files_by_recid)
+
+        recids_to_fetch = [recid for recid in dict.fromkeys(recids) if recid not in files_by_recid]
+        if not recids_to_fetch:
+            return files_by_recid
+
+        fetched_at = datetime.datetime.utcnow().isoformat()
+        new_records = []
+        with ThreadPoolExecutor(max_workers=CONFIG["general"]["record_files"]["nbr_workers"]) as executor:
+            for recid, (files, error) in zip(recids_to_fetch, executor.map(fetch_files, recids_to_fetch)):
+                if files is None:
+                    self.nbr_failed_records += 1
+                    print(f"\n {error}")
+                    LogEvent(level=LogLevel.ERROR.value,
+                             message=error,
+                             function_name=inspect.currentframe().f_code.co_name).save()
+                    continue
+                files_by_recid[recid] = files
+                new_records.append({
+                    "recid": recid,
+                    "organization_id": self.organization_id,
+                    "files": json.dumps(files),
+                    "last_modified": max([str(file.get('modified') or "") for file in files
+                                          if isinstance(file, dict)], default=""),
+                    "fetched_at": fetched_at
+                })
+
+        save_record_files(records=new_records)
+        self.nbr_fetched_records += len(new_records)
+        return files_by_recid
+
+    def end(self):
+        msg = f"Records' files: {self.nbr_cached_records} taken from the cache, {self.nbr_fetched_records} " \
+              f"requested, {self.nbr_failed_records} failed"
+        print(f"\n {msg}")
+        LogEvent(level=LogLevel.INFO.value,
+                 message=msg,
+                 function_name=inspect.currentframe().f_code.co_name).save()
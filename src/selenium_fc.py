@@ -0,0 +1,625 @@
+"""
+This file contains the pool of Selenium web drivers (headless Chrome) shared by all scrapers.
+Starting Chrome takes seconds, so the browsers are started once, lent to the scrapers (one page or one sequence of
+clicks at a time) and reused. A browser is recycled (quit and replaced) after a number of leases or as soon as it stops
+responding, and all browsers are closed at the end of the session.
+
+    with get_webdriver_pool().lease() as driver:
+        driver.get(url)
+        html = driver.page_source
+"""
+import atexit
+import inspect
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+
+from .files_fc import CONFIG, LogEvent, LogLevel
+
+
+def get_user_agent(headers: list = None) -> str:
+    """
+    :param headers: list of headers in the format of the config file: [{"User-Agent": "..."}]
+    :return: the value of the header 'User-Agent' ("" if absent)
+    """
+    for item in headers if headers else []:
+        for key, value in item.items():
+            if key.lower() == "user-agent":
+                return value
+    return ""
+
+
+# --- Lean profile
+# Url patterns of each type of resource that can be blocked (`Network.setBlockedURLs` only filters on urls)
+RESOURCE_TYPES_URL_PATTERNS = {
+    "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp", "*.avif"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "media": ["*.mp4", "*.webm", "*.ogg", "*.mp3", "*.wav", "*.m3u8", "*.m4a"],
+    "stylesheet": ["*.css"],
+}
+
+
+def get_lean_profile_config() -> dict:
+    """
+    :return: the settings of the lean profile (config file), or {} if it is disabled
+    """
+    lean_profile = CONFIG["general"]["webdriver_pool"].get("lean_profile", {})
+    return lean_profile if lean_profile.get("enabled") else {}
+
+
+def get_blocked_url_patterns(lean_profile: dict) -> list:
+    """
+    :param lean_profile: settings of the lean profile
+    :return: list of url patterns blocked by the browsers (resource types and url patterns of the config file)
+    """
+    patterns = []
+    for resource_type in lean_profile.get("blocked_resource_types", []):
+        patterns += RESOURCE_TYPES_URL_PATTERNS.get(resource_type.lower(), [])
+    patterns += lean_profile.get("blocked_url_patterns", [])
+    # Patterns also match the urls with a query string (e.g. 'logo.png?v=2')
+    patterns += [f"{pattern}?*" for pattern in patterns if not pattern.endswith("*")]
+    return patterns
+
+
+def apply_lean_profile_options(chrome_options: Options, lean_profile: dict):
+    """
+    Set the options of the lean profile applied before the start of the browser
+    """
+    chrome_options.page_load_strategy = lean_profile.get("page_load_strategy", "normal")
+    if lean_profile.get("window_size"):
+        chrome_options.add_argument(f"--window-size={lean_profile['window_size']}")
+    if lean_profile.get("disable_images"):
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    for argument in ["--disable-extensions", "--disable-gpu", "--mute-audio", "--no-first-run",
+                     "--disable-background-networking"]:
+        chrome_options.add_argument(argument)
+
+
+def block_urls(driver, url_patterns: list):
+    """
+    Prevent the browser from loading the urls matching the patterns (Chrome DevTools Protocol)
+    """
+    if not url_patterns:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": url_patterns})
+    except BaseException as e:
+        msg = f"Urls could not be blocked in the browser: {e.__str__()}"
+        LogEvent(level=LogLevel.WARNING.value,
+                 message=msg,
+                 function_name=inspect.currentframe().f_code.co_name).save()
+
+
+# --- Waits
+# Counts the XHR/fetch requests in progress in the page (installed in every new document, see install_network_tracker)
+NETWORK_TRACKER_SCRIPT = """
+(function () {
+    if (window.__nbrPendingRequests !== undefined) { return; }
+    window.__nbrPendingRequests = 0;
+    window.__lastNetworkActivity = Date.now();
+    function start() { window.__nbrPendingRequests++; window.__lastNetworkActivity = Date.now(); }
+    function end() {
+        window.__nbrPendingRequests = Math.max(0, window.__nbrPendingRequests - 1);
+        window.__lastNetworkActivity = Date.now();
+    }
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        start();
+        this.addEventListener('loadend', end);
+        try { return send.apply(this, arguments); } catch (e) { end(); throw e; }
+    };
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            start();
+            try { return fetch.apply(this, arguments).finally(end); } catch (e) { end(); throw e; }
+        };
+    }
+})();
+"""
+
+# arguments: css selector of the observed element (or null for the body), quiet period (ms), timeout (ms), callback
+DOM_QUIET_SCRIPT = """
+var target = arguments[0] ? document.querySelector(arguments[0]) : document.body;
+var quietPeriod = arguments[1], timeout = arguments[2], done = arguments[arguments.length - 1];
+if (!target) { done(false); return; }
+new Promise(function (resolve) {
+    var quietTimer = null, timeoutTimer = null;
+    var observer = new MutationObserver(function () {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(finish, quietPeriod, true);
+    });
+    function finish(result) {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(timeoutTimer);
+        resolve(result);
+    }
+    timeoutTimer = setTimeout(finish, timeout, false);
+    observer.observe(target, {childList: true, subtree: true, attributes: true, characterData: true});
+    quietTimer = setTimeout(finish, quietPeriod, true);
+}).then(done);
+"""
+
+
+def get_waits_config() -> dict:
+    return CONFIG["general"]["webdriver_waits"]
+
+
+def install_network_tracker(driver):
+    """
+    Make the browser count its XHR/fetch requests in progress, in the current page and in the next ones (Chrome
+    DevTools Protocol). Used by `wait_for_network_idle`
+    """
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": NETWORK_TRACKER_SCRIPT})
+        driver.execute_script(NETWORK_TRACKER_SCRIPT)
+    except BaseException as e:
+        msg = f"The network tracker could not be installed in the browser: {e.__str__()}"
+        LogEvent(level=LogLevel.WARNING.value,
+                 message=msg,
+                 function_name=inspect.currentframe().f_code.co_name).save()
+
+
+def wait_until(driver, condition, timeout_sec: float = None) -> bool:
+    """
+    Wait until `condition(driver)` is true. The errors raised by the condition (e.g. page being reloaded) are ignored
+    :param driver:
+    :param condition: function(driver) -> bool
+    :param timeout_sec: default: key `webdriver_waits.timeout_sec` of the config file
+    :return: False if the timeout was reached
+    """
+    waits_config = get_waits_config()
+
+    def safe_condition(d):
+        try:
+            return condition(d)
+        except:
+            return False
+
+    try:
+        WebDriverWait(driver, timeout_sec if timeout_sec is not None else waits_config["timeout_sec"],
+                      poll_frequency=waits_config["poll_frequency_sec"]).until(safe_condition)
+        return True
+    except TimeoutException:
+        return False
+
+
+def count_items(driver, css_selector: str) -> int:
+    return driver.execute_script("return document.querySelectorAll(arguments[0]).length;", css_selector)
+
+
+def wait_for_items_count_change(driver, css_selector: str, previous_count: int, timeout_sec: float = None) -> int:
+    """
+    Wait until the number of elements matching `css_selector` is different from `previous_count` (e.g. after a click
+    on "View More")
+    :return: the number of elements (`previous_count` if it did not change before the timeout)
+    """
+    counts = [previous_count]
+
+    def has_changed(d):
+        counts.append(count_items(driver=d, css_selector=css_selector))
+        return counts[-1] != previous_count
+
+    wait_until(driver=driver, condition=has_changed, timeout_sec=timeout_sec)
+    return counts[-1]
+
+
+def get_attribute_value(driver, css_selector: str, attribute: str):
+    """
+    :return: the value of the attribute of the first element matching `css_selector` (None if there is no element)
+    """
+    script = "var element = document.querySelector(arguments[0]); " \
+             "return element ? element.getAttribute(arguments[1]) : null;"
+    return driver.execute_script(script, css_selector, attribute)
+
+
+def wait_for_attribute_change(driver, css_selector: str, attribute: str, previous_value,
+                              timeout_sec: float = None) -> bool:
+    """
+    Wait until the attribute of the first element matching `css_selector` is different from `previous_value` (e.g. the
+    link of the first result, after a click on "Next")
+    :return: False if the timeout was reached
+    """
+    def has_changed(d):
+        value = get_attribute_value(driver=d, css_selector=css_selector, attribute=attribute)
+        return value is not None and value != previous_value
+
+    return wait_until(driver=driver, condition=has_changed, timeout_sec=timeout_sec)
+
+
+def wait_for_network_idle(driver, idle_time_ms: int = None, timeout_sec: float = None) -> bool:
+    """
+    Wait until no XHR/fetch request has been in progress for `idle_time_ms` (see install_network_tracker)
+    :param idle_time_ms: default: key `webdriver_waits.quiet_period_ms` of the config file
+    :return: False if the timeout was reached
+    """
+    idle_time_ms = idle_time_ms if idle_time_ms is not None else get_waits_config()["quiet_period_ms"]
+    script = "return window.__nbrPendingRequests === undefined || (window.__nbrPendingRequests === 0 && " \
+             "Date.now() - window.__lastNetworkActivity >= arguments[0]);"
+    return wait_until(driver=driver, condition=lambda d: d.execute_script(script, idle_time_ms),
+                      timeout_sec=timeout_sec)
+
+
+def wait_for_dom_quiet(driver, css_selector: str = None, quiet_period_ms: int = None,
+                       timeout_sec: float = None) -> bool:
+    """
+    Wait until an element of the page (the whole body by default) has not changed for `quiet_period_ms`
+    (MutationObserver)
+    :param css_selector: selector of the observed element
+    :param quiet_period_ms: default: key `webdriver_waits.quiet_period_ms` of the config file
+    :param timeout_sec: default: key `webdriver_waits.timeout_sec` of the config file
+    :return: False if the timeout was reached or if the element was not found
+    """
+    waits_config = get_waits_config()
+    quiet_period_ms = quiet_period_ms if quiet_period_ms is not None else waits_config["quiet_period_ms"]
+    timeout_sec = timeout_sec if timeout_sec is not None else waits_config["timeout_sec"]
+    try:
+        driver.set_script_timeout(timeout_sec + 5)
+        return bool(driver.execute_async_script(DOM_QUIET_SCRIPT, css_selector, quiet_period_ms, timeout_sec * 1000))
+    except:
+        return False
+
+
+def create_webdriver(headless: bool = True, headers: list = None, lean: bool = False,
+                     capture_network: bool = False) -> webdriver.Chrome:
+    """
+    Start a new Chrome browser
+    :param headless: if False, the browser is shown
+    :param headers: default headers of the browser. Only the 'User-Agent' can be set
+    :param lean: if True, use the lean profile of the config file (if enabled): no images, fonts, videos, analytics...
+    :param capture_network: if True, the network activity is recorded in the performance log (see xhr_fc.py)
+    :return:
+    """
+    chrome_options = Options()
+    if headless:
+        # Run Chrome in headless mode: Without opening the Chrome browser in a visible window
+        chrome_options.add_argument("--headless")
+
+    user_agent = get_user_agent(headers=headers if headers else CONFIG["general"]["request_default_headers"])
+    if user_agent:
+        chrome_options.add_argument(f"--user-agent={user_agent}")
+
+    lean_profile = get_lean_profile_config() if lean else {}
+    if lean_profile:
+        apply_lean_profile_options(chrome_options=chrome_options, lean_profile=lean_profile)
+
+    if capture_network:
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    driver = webdriver.Chrome(options=chrome_options)
+
+    if lean_profile:
+        block_urls(driver=driver, url_patterns=get_blocked_url_patterns(lean_profile=lean_profile))
+
+    install_network_tracker(driver=driver)
+
+    return driver
+
+
+def quit_webdriver(driver):
+    try:
+        driver.quit()
+    except:
+        pass
+
+
+class WebDriverPool:
+    """
+    Pool of at most `size` browsers. Browsers are started on demand, then kept warm and reused.
+    """
+
+    def __init__(self, size: int = 2, max_pages_per_driver: int = 50, lease_timeout_sec: float = 600,
+                 headless: bool = True, lean: bool = True):
+        """
+        :param size: maximum number of browsers running at the same time
+        :param max_pages_per_driver: number of pages loaded (see count_page) after which a browser is quit and
+        replaced when it is returned (memory of Chrome grows with the number of pages visited)
+        :param lease_timeout_sec: maximum waiting time for a browser when all of them are in use
+        :param headless:
+        :param lean: if True, the browsers use the lean profile of the config file
+        """
+        self.size = max(1, size)
+        self.max_pages_per_driver = max(1, max_pages_per_driver)
+        self.lease_timeout_sec = lease_timeout_sec
+        self.headless = headless
+        self.lean = lean
+
+        self._idle_drivers = queue.LifoQueue()  # The most recently used browser is reused first
+        self._nbr_pages = {}  # id(driver) -> number of pages loaded by the browser
+        self._lock = threading.Lock()
+        self._nbr_drivers = 0  # Number of browsers started and not yet quit (idle or leased)
+        self._closed = False
+
+    @property
+    def nbr_drivers(self):
+        return self._nbr_drivers
+
+    def is_healthy(self, driver) -> bool:
+        """
+        Check that the browser still answers (it may have crashed or been killed)
+        """
+        try:
+            return driver.execute_script("return 1;") == 1
+        except:
+            return False
+
+    def _start_driver(self):
+        driver = create_webdriver(headless=self.headless, lean=self.lean)
+        self._nbr_pages[id(driver)] = 0
+        return driver
+
+    def _discard_driver(self, driver):
+        with self._lock:
+            self._nbr_pages.pop(id(driver), None)
+            self._nbr_drivers -= 1
+        quit_webdriver(driver)
+
+    def _acquire(self, avoid: set = None):
+        """
+        Return an idle browser, or start a new one if less than `size` browsers are running, or else wait for a
+        browser to be returned
+        :param avoid: ids of browsers not to be used, unless no other browser is available without waiting (e.g. the
+        browser in which a page just failed)
+        """
+        set_aside = []  # Idle browsers to be avoided
+        try:
+            while True:
+                try:
+                    driver = self._idle_drivers.get_nowait()
+                    if avoid and id(driver) in avoid:
+                        set_aside.append(driver)
+                        continue
+                except queue.Empty:
+                    with self._lock:
+                        if self._closed:
+                            raise RuntimeError("The web driver pool is shut down")
+                        can_start = self._nbr_drivers < self.size
+                        if can_start:
+                            self._nbr_drivers += 1
+                    if can_start:
+                        try:
+                            return self._start_driver()
+                        except:
+                            with self._lock:
+                                self._nbr_drivers -= 1
+                            raise
+                    if set_aside:  # No other browser is available: an avoided one is used
+                        driver = set_aside.pop()
+                    else:
+                        try:
+                            driver = self._idle_drivers.get(timeout=self.lease_timeout_sec)
+                        except queue.Empty:
+                            raise TimeoutError(f"No web driver of the pool available after {self.lease_timeout_sec} "
+                                               f"s (webdriver_pool.lease_timeout_sec)") from None
+
+                if self.is_healthy(driver):
+                    return driver
+
+                msg = "A web driver of the pool stopped responding. It is replaced by a new one."
+                LogEvent(level=LogLevel.WARNING.value,
+                         message=msg,
+                         function_name=inspect.currentframe().f_code.co_name).save()
+                self._discard_driver(driver)
+        finally:
+            for driver in set_aside:
+                self._idle_drivers.put(driver)
+
+    def count_page(self, driver):
+        """
+        Count a page loaded by a browser of the pool (see common.load_page_with_driver)
+        """
+        with self._lock:
+            if id(driver) in self._nbr_pages:
+                self._nbr_pages[id(driver)] += 1
+
+    def _release(self, driver, nbr_pages_at_lease: int, broken: bool = False):
+        """
+        :param nbr_pages_at_lease: number of pages of the browser when it was lent. If no page was counted during the
+        lease (the scraper navigated by itself), the lease counts as one page
+        """
+        with self._lock:
+            nbr_pages = self._nbr_pages.get(id(driver), 0)
+            if nbr_pages == nbr_pages_at_lease:
+                nbr_pages += 1
+                self._nbr_pages[id(driver)] = nbr_pages
+            closed = self._closed
+
+        if broken or closed or nbr_pages >= self.max_pages_per_driver:
+            self._discard_driver(driver)
+        else:
+            self._idle_drivers.put(driver)
+
+    @contextmanager
+    def lease(self, avoid: set = None):
+        """
+        Lend a browser for the duration of the `with` block. The browser is returned to the pool at the end of the
+        block. If an error happened in the block, the browser is quit only if it no longer responds (see is_healthy).
+        :param avoid: ids (`id(driver)`) of browsers not to be lent if another one is available
+        """
+        driver = self._acquire(avoid=avoid)
+        with self._lock:
+            nbr_pages_at_lease = self._nbr_pages.get(id(driver), 0)
+        broken = False
+        try:
+            yield driver
+        except BaseException:
+            broken = not self.is_healthy(driver)
+            raise
+        finally:
+            self._release(driver=driver, nbr_pages_at_lease=nbr_pages_at_lease, broken=broken)
+
+    def shutdown(self):
+        """
+        Quit all idle browsers. Browsers currently leased are quit when they are returned
+        """
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                driver = self._idle_drivers.get_nowait()
+            except queue.Empty:
+                break
+            self._discard_driver(driver)
+
+
+# --- Incremental extraction
+class IncrementalLinksCollector:
+    """
+    Collect the links of a listing that grows in the page ("View More" buttons, infinite scroll) without sending the
+    whole listing to Python at each step: the items are counted in the page, and only the links of the items added
+    since the last call are returned.
+    """
+    # arguments: items selector, index of the first item to return, link selector (in the item) or null, attribute
+    _COLLECT_SCRIPT = """
+        var items = document.querySelectorAll(arguments[0]);
+        var values = [];
+        for (var i = arguments[1]; i < items.length; i++) {
+            var link = arguments[2] ? items[i].querySelector(arguments[2]) : items[i];
+            values.push(link ? link.getAttribute(arguments[3]) : null);
+        }
+        return values;
+    """
+
+    def __init__(self, driver, items_selector: str, link_selector: str = None, attribute: str = "href"):
+        """
+        :param driver:
+        :param items_selector: css selector of the items of the listing (e.g. '#view-more-news-center a')
+        :param link_selector: css selector of the link in an item (e.g. 'a'). If None, the item is the link
+        :param attribute: attribute of the link returned
+        """
+        self.driver = driver
+        self.items_selector = items_selector
+        self.link_selector = link_selector
+        self.attribute = attribute
+        self._nbr_items = 0  # Number of items already collected (including those without link)
+        self._links = []
+
+    @property
+    def links(self) -> list:
+        return self._links
+
+    def count(self) -> int:
+        """
+        :return: number of items currently in the page
+        """
+        return count_items(driver=self.driver, css_selector=self.items_selector)
+
+    def collect_new(self) -> list:
+        """
+        :return: links of the items added to the page since the last call (they are also added to `links`)
+        """
+        values = self.driver.execute_script(self._COLLECT_SCRIPT, self.items_selector, self._nbr_items,
+                                            self.link_selector, self.attribute)
+        self._nbr_items += len(values)
+        new_links = [value for value in values if value]
+        self._links += new_links
+        return new_links
+
+
+_WEBDRIVER_POOL = None
+_WEBDRIVER_POOL_LOCK = threading.Lock()
+
+
+def get_webdriver_pool() -> WebDriverPool:
+    """
+    Return the pool shared by all scrapers (created at the first call, with the settings of the config file)
+    """
+    global _WEBDRIVER_POOL
+    with _WEBDRIVER_POOL_LOCK:
+        if _WEBDRIVER_POOL is None:
+            pool_config = CONFIG["general"]["webdriver_pool"]
+            _WEBDRIVER_POOL = WebDriverPool(size=pool_config["size"],
+                                            max_pages_per_driver=pool_config["max_pages_per_driver"],
+                                            lease_timeout_sec=pool_config["lease_timeout_sec"])
+        return _WEBDRIVER_POOL
+
+
+def count_webdriver_page(driver):
+    """
+    Count a page loaded by a browser, if it belongs to the shared pool (the browsers are replaced after
+    `webdriver_pool.max_pages_per_driver` pages)
+    """
+    pool = _WEBDRIVER_POOL
+    if pool is not None:
+        pool.count_page(driver=driver)
+
+
+def shutdown_webdriver_pool():
+    """
+    Quit all the browsers of the shared pool. A new pool is created if a browser is requested afterwards
+    """
+    global _WEBDRIVER_POOL
+    with _WEBDRIVER_POOL_LOCK:
+        pool, _WEBDRIVER_POOL = _WEBDRIVER_POOL, None
+    if pool is not None:
+        pool.shutdown()
+
+
+# --- Distribution of pages
+def distribute_pages(urls: list, load_page, nbr_browsers: int = 0, max_attempts: int = 0):
+    """
+    Load independent pages in parallel, each thread leasing a browser of the shared pool. The results are yielded in
+    the thread of the caller, as soon as they are ready (not in the order of `urls`), so that the caller can store them
+    in the database.
+    A page that fails in a browser (error or None returned) is retried in another browser of the pool.
+    :param urls:
+    :param load_page: function(driver, url) -> result (e.g. a BeautifulSoup object), or None if the page failed
+    :param nbr_browsers: number of pages loaded at the same time. Default: size of the pool
+    :param max_attempts: maximum number of attempts per page. Default: key `webdriver_pool.max_attempts_per_page` of
+    the config file
+    :return: generator of (url, result). result is None if all attempts failed
+    """
+    pool = get_webdriver_pool()
+    nbr_browsers = nbr_browsers if nbr_browsers else pool.size
+    max_attempts = max_attempts if max_attempts else CONFIG["general"]["webdriver_pool"]["max_attempts_per_page"]
+
+    def load_page_in_pool(url: str, avoid: set) -> tuple:
+        """
+        :return: (result, id of the browser used, error message)
+        """
+        driver_id = None
+        try:
+            with pool.lease(avoid=avoid) as driver:
+                driver_id = id(driver)
+                return load_page(driver, url), driver_id, ""
+        except BaseException as e:
+            return None, driver_id, e.__str__()
+
+    with ThreadPoolExecutor(max_workers=nbr_browsers) as executor:
+        # future -> (url, number of attempts, ids of the browsers in which the page failed)
+        pending = {executor.submit(load_page_in_pool, url, set()): (url, 1, set()) for url in urls}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, nbr_attempts, failed_driver_ids = pending.pop(future)
+                result, driver_id, error = future.result()
+                if result is not None:
+                    yield url, result
+                    continue
+
+                if driver_id is not None:
+                    failed_driver_ids.add(driver_id)
+                if nbr_attempts < max_attempts:
+                    pending[executor.submit(load_page_in_pool, url, failed_driver_ids)] = \
+                        (url, nbr_attempts + 1, failed_driver_ids)
+                    continue
+
+                msg = f"The page '{url}' could not be loaded after {nbr_attempts} attempt(s). {error}"
+                print(msg)
+                LogEvent(level=LogLevel.WARNING.value,
+                         message=msg,
+                         function_name=inspect.currentframe().f_code.co_name).save()
+                yield url, None
+
+
+# Make sure no Chrome process survives the program, even if it is interrupted by an error
+atexit.register(shutdown_webdriver_pool)
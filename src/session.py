@@ -1,6 +1,7 @@
 from . import SESSION_ERRORS
 from .common import *
 from .db_handler import DatabaseHandler
+from .files_fc import update_lst_err
 from .time_fc import timestamp_to_datetime_isoformat, get_now_utc_timestamp
 
 
@@ -45,6 +46,34 @@ class Session:
         self.ended_at = session['ended_at']
         self.errors_number = session['errors_number']
 
+    def resume_last_session(self) -> bool:
+        """
+        Continue the last interrupted session: the last one not ended (`ended_at` empty) with a scraper whose
+        checkpoint is not at the stage 'done'. The sessions without checkpoint (e.g. created by a process importing
+        `src` without running the scrapers) are ignored. The new session is deleted and the current instance takes the
+        id of the interrupted one, so that the scrapers can resume from their checkpoints
+        :return: True if a session is resumed
+        """
+        table_name = CONFIG["general"]["sessions_table"]
+        query = f"SELECT s.* FROM {table_name} s " \
+                f"JOIN {CONFIG['general']['checkpoints_table']} c ON c.session_id = s.id " \
+                f"WHERE s.id < ? AND (s.ended_at IS NULL OR s.ended_at = '') AND c.stage != 'done' " \
+                f"ORDER BY s.id DESC LIMIT 1"
+        sessions = self.db_handler.fetch_data(query=query, parameters=(self.id,))
+        if not sessions:
+            return False
+
+        self.db_handler.delete_from_table(table_name=table_name, condition="id = ?", condition_vals=(self.id,))
+        session = sessions[0]
+        self.id = session['id']
+        self.started_at = session['started_at']
+        self.errors_number = session['errors_number'] if session['errors_number'] else 0
+
+        SESSION_ERRORS['session']['id'] = self.id
+        SESSION_ERRORS['session']['errors_number'] = self.errors_number
+        update_lst_err()
+        return True
+
     def to_dict(self) -> dict:
         return {
             'id': self.id,
@@ -68,11 +97,14 @@ class Session:
         # TODO: Still thinking of the usefulness of this function ;D ??
         self.errors_number += 1
 
-    def interrupt(self):
+    def interrupt(self, is_completed: bool = True):
+        """
+        :param is_completed: if False (a scraper did not complete), `ended_at` is left empty: the session can be
+        resumed (see resume_last_session)
+        """
         self.errors_number = SESSION_ERRORS['session']['errors_number']
-        self.ended_at = timestamp_to_datetime_isoformat(timestamp=get_now_utc_timestamp())
-        data = {
-            "ended_at": self.ended_at,
-            "errors_number": self.errors_number
-        }
+        data = {"errors_number": self.errors_number}
+        if is_completed:
+            self.ended_at = timestamp_to_datetime_isoformat(timestamp=get_now_utc_timestamp())
+            data["ended_at"] = self.ended_at
         self.update_session(data=data)
@@ -0,0 +1,169 @@
+"""
+This file contains the discovery of the publications from the sitemaps of the websites (e.g. Drupal's `sitemap.xml`).
+A sitemap index lists sitemaps, each listing up to 50 000 urls with the date of their last modification (`lastmod`):
+reading them costs a few requests instead of one request per page of the listing (6 to 20 publications).
+The sitemaps are streamed and parsed incrementally: the urls are filtered as they are read and the parsed elements are
+freed, compressed sitemaps (.gz) are decompressed on the fly.
+
+The urls are filtered by a pattern (only the pages of the publications) and by their `lastmod`: only the pages
+modified since the start of the last session in which the scraper completed are kept, with the publications whose
+download failed (`retry_download_in_next_session`). The whole sitemap is taken when the full crawl of the scraper is
+due (see incremental_fc.is_full_sweep_due): its date is saved after the downloads.
+If the sitemap cannot be read, or if no url matches the pattern, the scrapers crawl their listing as before.
+"""
+import datetime
+import gzip
+import inspect
+import re
+
+from lxml import etree
+
+from .db_handler import get_last_completed_session_start, insert_temp_publications_urls, save_scraper_state, \
+    get_failed_publications_urls
+from .files_fc import CONFIG, LogEvent, LogLevel
+from .http_fc import get_http_session
+from .incremental_fc import is_full_sweep_due
+
+MAX_SITEMAP_INDEX_DEPTH = 3  # Sitemap index -> sitemaps. Protects against sitemaps referencing each other
+
+
+def get_lastmod_date(lastmod: str):
+    """
+    :param lastmod: e.g. '2023-10-01T12:00:00+02:00' or '2023-10-01'
+    :return: the date, or None
+    """
+    try:
+        return datetime.date.fromisoformat(lastmod.strip()[:10])
+    except:
+        return None
+
+
+def iter_sitemap_urls(sitemap_url: str, since: datetime.date = None, depth: int = 0):
+    """
+    Stream a sitemap (or a sitemap index, whose sitemaps are read one after the other)
+    :param sitemap_url:
+    :param since: if given, the urls (and sitemaps) modified before this date are skipped
+    :param depth:
+    :return: generator of urls
+    """
+    sitemaps_urls = []
+    with get_http_session().get(sitemap_url, stream=True,
+                                timeout=CONFIG['general']['request_time_out_in_second']) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True  # 'Content-Encoding: gzip' is decoded by urllib3
+        is_gzip_file = sitemap_url.endswith(".gz") or "gzip" in response.headers.get("Content-Type", "")
+        xml_file = gzip.GzipFile(fileobj=response.raw) if is_gzip_file else response.raw
+
+        for _, element in etree.iterparse(xml_file, events=("end",), tag=("{*}url", "{*}sitemap")):
+            url = (element.findtext("{*}loc") or "").strip()
+            lastmod = get_lastmod_date(element.findtext("{*}lastmod") or "")
+            is_sitemap = etree.QName(element).localname == "sitemap"
+
+            # Free the parsed elements
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+            if not url or (since is not None and lastmod is not None and lastmod < since):
+                continue
+            if is_sitemap:
+                sitemaps_urls.append(url)
+            else:
+                yield url
+
+    if depth < MAX_SITEMAP_INDEX_DEPTH:
+        for url in sitemaps_urls:
+            yield from iter_sitemap_urls(sitemap_url=url, since=since, depth=depth + 1)
+
+
+class SitemapDiscovery:
+    """
+    Usage in a scraper (links of the publications):
+        if self.sitemap_discovery.add_publications_urls(register_name=self.register_name,
+                                                        organization_id=self.organization.id):
+            return  # The urls are in the temporary table
+        ...  # Crawl the listing
+    then, after the downloads:
+        self.sitemap_discovery.save_full_sweep(register_name=self.register_name)
+    """
+
+    def __init__(self, sitemap_url: str, url_pattern: str):
+        """
+        :param sitemap_url: e.g. 'https://www.afro.who.int/sitemap.xml'
+        :param url_pattern: regular expression of the urls of the publications' pages
+        """
+        self.sitemap_url = sitemap_url
+        self.url_pattern = re.compile(url_pattern)
+        self.is_read = False  # True if the urls were taken from the sitemap in this session
+        self.is_partial_read = False  # True if only the pages modified since the last session were taken
+
+    def get_since_date(self, register_name: str):
+        """
+        :return: the date from which the modified pages are taken, or None to take all the pages
+        """
+        if is_full_sweep_due(register_name=register_name):
+            return None
+        last_session_start = get_last_completed_session_start(scraper_name=register_name)
+        if not last_session_start:
+            return None
+        lastmod_margin_days = CONFIG["general"]["sitemap_discovery"]["lastmod_margin_days"]
+        return datetime.datetime.fromisoformat(last_session_start).date() - \
+            datetime.timedelta(days=lastmod_margin_days)
+
+    def add_publications_urls(self, register_name: str, organization_id: int) -> bool:
+        """
+        Insert the urls of the publications found in the sitemap into the temporary table
+        :param register_name: name of the scraper in the register (e.g. 'who-africa')
+        :param organization_id: to add the publications whose download failed, if only the modified pages are taken
+        :return: False if the sitemap could not be used (the listing must be crawled)
+        """
+        if not CONFIG["general"]["sitemap_discovery"]["enabled"] or not self.sitemap_url:
+            return False
+
+        since = self.get_since_date(register_name=register_name)
+        print(f" Reading the sitemap {self.sitemap_url}" + (f" (pages modified since {since})" if since else ""))
+        try:
+            # dict: distinct urls, in the order of the sitemap
+            publications_urls = list(dict.fromkeys(url for url in iter_sitemap_urls(sitemap_url=self.sitemap_url,
+                                                                                    since=since)
+                                                   if self.url_pattern.match(url)))
+        except BaseException as e:
+            msg = f"The sitemap {self.sitemap_url} could not be read, the listing is crawled instead: {e}"
+            print(msg)
+            LogEvent(level=LogLevel.WARNING.value,
+                     message=msg,
+                     function_name=inspect.currentframe().f_code.co_name,
+                     exception=e.__str__()).save()
+            return False
+
+        if not publications_urls and since is None:
+            msg = f"No publication found in the sitemap {self.sitemap_url}, the listing is crawled instead"
+            print(msg)
+            LogEvent(level=LogLevel.WARNING.value,
+                     message=msg,
+                     function_name=inspect.currentframe().f_code.co_name).save()
+            return False
+
+        if since is not None and CONFIG["general"]["retry_download_in_next_session"]:
+            # The publications whose download failed: their pages were not necessarily modified since the last session
+            failed_publications_urls = sorted(get_failed_publications_urls(organization_id=organization_id))
+            publications_urls = list(dict.fromkeys(publications_urls + failed_publications_urls))
+        nbr_inserted_urls = insert_temp_publications_urls(urls=publications_urls)
+        self.is_read = True
+        self.is_partial_read = since is not None
+
+        msg = f"{nbr_inserted_urls} publications found in the sitemap {self.sitemap_url}"
+        print(f" {msg}")
+        LogEvent(level=LogLevel.INFO.value,
+                 message=msg,
+                 function_name=inspect.currentframe().f_code.co_name).save()
+        return True
+
+    def save_full_sweep(self, register_name: str):
+        """
+        To call after the downloads: if the whole sitemap was read, the date of the full crawl is saved. A session
+        interrupted before the end of the downloads takes the whole sitemap again
+        :param register_name:
+        """
+        if self.is_read and not self.is_partial_read:
+            save_scraper_state(name=register_name, data={"last_full_sweep_at": datetime.datetime.utcnow().isoformat()})
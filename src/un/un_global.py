@@ -3,8 +3,9 @@ and download the ones missing in the SQLite database"""
 
 import datetime
 import inspect
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import requests
 from bs4 import BeautifulSoup
 
 from src import CONFIG
@@ -12,16 +13,23 @@ from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.session import Session
 from src.common import filter_list_publications_and_details, get_page_from_url, generate_document_id, \
     add_base_url_if_missing, format_language
-from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls
+from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls, \
+    insert_temp_publications_urls, get_listing_segments, save_listing_segment, get_failed_publications_urls, \
+    save_scraper_state
 from src.document import start_downloads, Document
 from src.files_fc import LogEvent, LogLevel
 from src.organizations import get_organization_by_condition
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.http_fc import get_http_session
+from src.incremental_fc import is_full_sweep_due
+from src.record_cache_fc import RecordFilesCache
+from src.date_fc import format_publication_date
+from src.url_fc import canonicalize_url
 
 
 class UnGlobalScraper:
     _organization_acronym: str = "UN"
     _organization_region: str = "Global"
+    register_name: str = ""  # Name of the scraper in src/scrapers_register.yaml (set in src/__init__.py)
     _download_base_url = "https://digitallibrary.un.org/"
 
     def __init__(self, session: Session):
@@ -35,6 +43,10 @@ class UnGlobalScraper:
         self.total_number_of_pages = 0
         self.number_of_pdfs_found_in_current_session = 0
         self.number_of_downloaded_pdfs_in_current_session = 0
+        self.record_files_cache = RecordFilesCache()
+        self.crawled_segments = []  # Segments completely crawled in this session, saved once their PDFs are downloaded
+        self.is_full_sweep = False  # True if all the segments were crawled in this session
+        self.failed_publications_urls = set()  # Publications whose files could not be requested in this session
 
         self.pdf_files_directory = generate_organization_download_pdf_directory_path(
             organization_acronym_region=self.organization_acronym + "-" + self.organization_region,
@@ -67,88 +79,183 @@ class UnGlobalScraper:
         self.number_of_pdfs_found_in_current_session = results['total_of_pdfs_found']
         self.number_of_downloaded_pdfs_in_current_session = results['total_of_pdfs_downloaded']
 
+        # step 5: Save the state of the crawled segments, now that their publications were downloaded
+        self.save_listing_segments()
+
         return True
 
     def get_all_publications_links(self):
         """
-        This method retrieve the links of all the existing publications
+        This method retrieve the links of all the existing publications. The listing is crawled by segment (one per
+        year and type of publication), several segments at a time. A segment completely crawled in a previous session
+        is only crawled again if it is recent (`listing_segments.recent_years`), if its number of publications
+        changed or if some of its downloads failed (`retry_download_in_next_session`). All the segments are crawled
+        when a full sweep is due (see incremental_fc.is_full_sweep_due)
         :return:
         """
         oldest_year = 1945
         current_year = datetime.datetime.now().year
-        # For each page,
-        print(f" Retrieving publication (year {oldest_year}): 0", end="")
-        nbr_retrieved_publications = 0  # Number of retrieved publications
+        recent_years = CONFIG["general"]["listing_segments"]["recent_years"]
+        self.is_full_sweep = is_full_sweep_due(register_name=self.register_name)
+        segments_states = {} if self.is_full_sweep else get_listing_segments(scraper_name=self.register_name)
+        if CONFIG["general"]["retry_download_in_next_session"]:
+            segments_states = {name: state for name, state in segments_states.items() if not state['nbr_errors']}
+        self.crawled_segments = []
+        self.failed_publications_urls = set()
+
+        print(" Retrieving publications: 0", end="")
+        publications_urls = set()  # Distinct urls of the publications, instead of a `SELECT` per url
+        nbr_unchanged_segments = 0
+        with ThreadPoolExecutor(max_workers=CONFIG["general"]["listing_segments"]["nbr_workers"]) as executor:
+            futures = []
+            for year in range(oldest_year, current_year + 1, 1):
+                for pub_type in ['Reports', 'Publications']:
+                    # The recent segments are always crawled, the others are checked against their last state
+                    segment_state = None if year > current_year - recent_years else \
+                        segments_states.get(self.get_segment_name(year=year, pub_type=pub_type))
+                    futures.append(executor.submit(self.crawl_listing_segment, year=year, pub_type=pub_type,
+                                                   segment_state=segment_state))
+
+            for future in as_completed(futures):
+                segment = future.result()
+                if segment["is_unchanged"]:
+                    nbr_unchanged_segments += 1
+                    continue
+
+                new_urls = [url for url in segment["links"] if url not in publications_urls]
+                publications_urls.update(new_urls)
+                insert_temp_publications_urls(urls=new_urls)
+
+                if segment["is_complete"]:
+                    self.crawled_segments.append(segment)
+                else:
+                    self.is_full_sweep = False
+
+                print(end=f"\r Retrieving publications: {len(publications_urls)}")
+
+        msg = f"{len(publications_urls)} publications retrieved, {nbr_unchanged_segments} unchanged segments " \
+              f"(year and type) skipped"
+        print(f"\n {msg}")
+        LogEvent(level=LogLevel.INFO.value,
+                 message=msg,
+                 function_name=inspect.currentframe().f_code.co_name).save()
+
+    def save_listing_segments(self):
+        """
+        Save the state of the segments completely crawled in this session, with their number of publications whose
+        download failed: with `retry_download_in_next_session`, these segments are crawled again in the next session
+        """
+        failed_publications_urls = self.failed_publications_urls | \
+            get_failed_publications_urls(organization_id=self.organization.id)
+        for segment in self.crawled_segments:
+            save_listing_segment(data={
+                "scraper": self.register_name,
+                "segment": segment["name"],
+                "nbr_items": segment["nbr_items"],
+                "last_page": segment["last_page"],
+                "completed_at": datetime.datetime.utcnow().isoformat(),
+                "nbr_errors": len([url for url in segment["links"]
+                                   if canonicalize_url(url=url) in failed_publications_urls])
+            })
+        if self.is_full_sweep:
+            save_scraper_state(name=self.register_name,
+                               data={"last_full_sweep_at": datetime.datetime.utcnow().isoformat()})
+
+    @staticmethod
+    def get_segment_name(year: int, pub_type: str) -> str:
+        return f"{year}|{pub_type}"
+
+    @staticmethod
+    def get_total_number_of_records(soup_page: BeautifulSoup):
+        """
+        :return: the number of publications of a search, shown on its pages (e.g. '1,234 records found'), or None
+        """
+        text = soup_page.get_text(" ", strip=True)
+        for pattern in [r"([\d,]+)\s+records?\s+found", r"\bof\s+([\d,]+)\s+records?"]:
+            match = re.search(pattern, text, flags=re.IGNORECASE)
+            if match:
+                return int(match.group(1).replace(",", ""))
+        return None
+
+    def crawl_listing_segment(self, year: int, pub_type: str, segment_state=None) -> dict:
+        """
+        Crawl the pages of the publications of a year and a type. Runs in a thread: the database is not used here
+        :param year:
+        :param pub_type: e.g. 'Reports', 'Publications'
+        :param segment_state: state of the segment at its last complete crawl. If the number of publications did not
+        change since then, only the first page is requested. If None, the segment is crawled entirely
+        :return: {"name": ..., "links": [...], "nbr_items": ..., "last_page": ..., "is_complete": bool,
+        "is_unchanged": bool}
+        """
+        segment = {"name": self.get_segment_name(year=year, pub_type=pub_type), "links": [], "nbr_items": None,
+                   "last_page": 0, "is_complete": False, "is_unchanged": False}
         max_nbr_none = 3  # Maximum number of consecutive None values for `current_page_soup` before exiting the
         # `while` loop
-        for year in range(oldest_year, current_year+1, 1):
-            for pub_type in ['Reports', 'Publications']:
-                last_page = False
-                page = 1  # 1 is the first page
-                nbr_none = 0  # Number of consecutive None values for `current_page_soup`
-                nbr_unchanged_page = 0  # Number of times the content of the page remains unchanged after requests on
-                # new url
-                while not last_page:
-                    if nbr_none >= max_nbr_none:
-                        break
-                    # Get the url of the page
-                    page_ulr = self.get_page_url(page_number=page, pub_type=pub_type, year=year)
-
-                    # Get the current page (as a BeautifulSoup object)
-                    current_page_soup = get_page_from_url(url=page_ulr)
-
-                    if current_page_soup is None:
-                        nbr_none += 1
-                        msg = f"current_page_soup was None for the page ulr: {page_ulr}. \n " \
-                              f"Check your internet connection and/or the page ulr.",
-                        print(msg)
-                        LogEvent(level=LogLevel.WARNING.value,
-                                 message=msg,
-                                 function_name=inspect.currentframe().f_code.co_name).save()
-                        continue
-                    else:
-                        # reset the counter of the Number of consecutive None values for `current_page_soup`
-                        nbr_none = 0
-
-                    # --- Check if the current page is the last one
-                    # Find the img tag with aria-label="Next page"
-                    next_page_img = current_page_soup.find('img', {'aria-label': 'Next page'})
-
-                    # Check if any of the spans have the text "Next"
-                    if next_page_img is None:
-                        last_page = True
-                    # ---
-
-                    # Get list of publications with their link on the current page\
-                    publ_links = self.get_list_of_publication_links_from_page(soup_page=current_page_soup, url=page_ulr)
-
-                    old_nbr_retrieved_publications = nbr_retrieved_publications  # Just for testing
-
-                    for publ_link in publ_links:
-                        existing_url = self.session.db_handler.select_columns(
-                            columns=["*"],
-                            table_name=CONFIG["general"]["temp_publications_urls_table"],
-                            condition="url = ?",
-                            condition_vals=(publ_link,)
-                        )
-
-                        if not existing_url:
-                            self.session.db_handler.insert_data_into_table(
-                                table_name=CONFIG["general"]["temp_publications_urls_table"],
-                                data={"url": publ_link})
-                            nbr_retrieved_publications += 1
-
-                    print(end=f"\r Retrieving publications (year {year}): {nbr_retrieved_publications}")
-
-                    # --- If the page remains unchanged 3 times then we leave the loop and go to the next year
-                    if nbr_unchanged_page > 2:
-                        break
-                    if nbr_retrieved_publications == old_nbr_retrieved_publications:
-                        nbr_unchanged_page += 1
-                    # ----------------
-
-                    page += 1
-        print("")
+        links = {}  # Distinct links, in the order of the listing
+        last_page = False
+        page = 1  # 1 is the first page
+        nbr_none = 0  # Number of consecutive None values for `current_page_soup`
+        nbr_unchanged_page = 0  # Number of times the content of the page remains unchanged after requests on
+        # new url
+        while not last_page:
+            if nbr_none >= max_nbr_none:
+                segment["links"] = list(links)
+                return segment  # Incomplete: the segment will be crawled again in the next session
+
+            # Get the url of the page
+            page_ulr = self.get_page_url(page_number=page, pub_type=pub_type, year=year)
+
+            # Get the current page (as a BeautifulSoup object)
+            current_page_soup = get_page_from_url(url=page_ulr)
+
+            if current_page_soup is None:
+                nbr_none += 1
+                msg = f"current_page_soup was None for the page ulr: {page_ulr}. \n " \
+                      f"Check your internet connection and/or the page ulr.",
+                print(msg)
+                LogEvent(level=LogLevel.WARNING.value,
+                         message=msg,
+                         function_name=inspect.currentframe().f_code.co_name).save()
+                continue
+            else:
+                # reset the counter of the Number of consecutive None values for `current_page_soup`
+                nbr_none = 0
+
+            if page == 1:
+                segment["nbr_items"] = self.get_total_number_of_records(soup_page=current_page_soup)
+                if segment_state is not None and segment["nbr_items"] is not None and \
+                        segment["nbr_items"] == segment_state['nbr_items']:
+                    segment["is_unchanged"] = True
+                    return segment
+
+            # --- Check if the current page is the last one
+            # Find the img tag with aria-label="Next page"
+            next_page_img = current_page_soup.find('img', {'aria-label': 'Next page'})
+
+            # Check if any of the spans have the text "Next"
+            if next_page_img is None:
+                last_page = True
+            # ---
+
+            # Get list of publications with their link on the current page\
+            publ_links = self.get_list_of_publication_links_from_page(soup_page=current_page_soup, url=page_ulr)
+
+            old_nbr_retrieved_publications = len(links)
+            links.update(dict.fromkeys(publ_links))
+            segment["last_page"] = page
+
+            # --- If the page remains unchanged 3 times then we leave the loop and go to the next segment
+            if nbr_unchanged_page > 2:
+                break
+            if len(links) == old_nbr_retrieved_publications:
+                nbr_unchanged_page += 1
+            # ----------------
+
+            page += 1
+
+        segment["links"] = list(links)
+        segment["is_complete"] = True
+        return segment
 
     def get_publication_tags_list(self, publication_page_soup: BeautifulSoup) -> str:
         publication_tag_links_list = publication_page_soup.find_all('a',
@@ -161,55 +268,52 @@ class UnGlobalScraper:
 
         return tags_list
 
-    def get_publications_details_from_api(self, pub_id: int = 0) -> list:
+    def get_publications_details_from_api(self, pub_id: str) -> tuple:
         """
-        This method retrieve the links of all the existing publications.
-        Note: The API returns a maximum of 50 publications per request
-        :return:
+        This method retrieve the files (versions) of a publication. Runs in a thread: the database is not used here,
+        the errors are returned to be logged by the main thread (see RecordFilesCache.get_files)
+        :param pub_id: id of the record (recid)
+        :return: (list of files, "") or (None, error message) if the request failed
         """
         # API URL
         api_url = f"https://digitallibrary.un.org/api/v1/file?recid={pub_id}&file_types=[]&hidden_types=[" \
                   "%22pdf%3Bpdfa%22%2C%22tif%22%2C%22tiff%22]&ln=en&hr=1"
         try:
             # Send a GET request to the API
-            response = requests.get(api_url, timeout=CONFIG["general"]["request_time_out_in_second"])
+            response = get_http_session().get(api_url, timeout=CONFIG["general"]["request_time_out_in_second"])
 
             # Check if the request was successful (status code 200)
-            if response.status_code == 200:
-                # Parse JSON data
-                json_data = response.json()
+            if response.status_code != 200:
+                return None, f"The API returned the status code {response.status_code} (recid {pub_id})"
 
-                return json_data
-            else:
-                # If the request was not successful, print the status code
-                print(f"Error: Request failed with status code {response.status_code}")
-                return []
+            # Parse JSON data
+            json_data = response.json()
+            if not isinstance(json_data, list):
+                return None, f"The API did not return a list of files (recid {pub_id})"
+            return json_data, ""
 
-        except requests.exceptions.RequestException as e:
-            # If there was an error with the request, print the error message
-            msg = f"Error while retrieving data. Param recid = {pub_id}: {e}"
-            print(msg)
-            LogEvent(level=LogLevel.ERROR.value,
-                     message=msg,
-                     function_name=inspect.currentframe().f_code.co_name).save()
-            return []
+        except Exception as e:
+            return None, f"The files of the record could not be retrieved (recid {pub_id}): {e}"
 
-    def get_publication_details(self, publication_url: str) -> list:
+    @staticmethod
+    def get_recid(publication_url: str) -> str:
+        """
+        Extract publication's identifier from publication_url:
+        e.g. publication_url = https://digitallibrary.un.org/record/1633001?ln=en. We need 1633001
+        """
+        return publication_url.split("/")[-1].split("?")[0]
+
+    def get_publication_details(self, publication_url: str, pub_versions_details: list) -> list:
         """
         Return the details of a publication such as:
         Title
         publication_date
         download_link
+        :param publication_url:
+        :param pub_versions_details: files of the publication returned by the API (get_publications_details_from_api)
         """
         results = []
 
-        # --- Get publication's details using API
-        # Extract publication's identifier from publication_url :
-        # e.g. publication_url = https://digitallibrary.un.org/record/1633001?ln=en. We need 1633001
-        pub_id = publication_url.split("/")[-1].split("?")[0]
-        # Get details from request
-        pub_versions_details = self.get_publications_details_from_api(pub_id=int(pub_id))
-
         if not pub_versions_details:  # No details were returned
             return []
 
@@ -227,14 +331,9 @@ class UnGlobalScraper:
                 tags_list = ""  # Tags are not provided by the API
 
                 # --- Publication's date
-                publication_date = ""
-                publication_date_time = pub_version['modified']  # e.g. '2023-08-04 16:17:48'
-                try:
-                    y, m, d = publication_date_time.split(" ")[0].split("-")
-                    publication_timestamp = get_timestamp_from_date_and_time(year=y, month=m, day=d)
-                    publication_date = timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
-                except:
-                    pass
+                # e.g. '2023-08-04 16:17:48'
+                publication_date = format_publication_date(raw_date=pub_version.get('modified'),
+                                                           organization_acronym=self.organization_acronym)
 
                 # --- Get current file's language
                 name = pub_version['name']  # An attribute called 'name' returned by the API. e.g. 'A_77_56-AR'
@@ -345,6 +444,7 @@ class UnGlobalScraper:
         chunk_total = length_publications_urls / chunk_size
         chunk_total = int(chunk_total) + 1 if int(chunk_total) < chunk_total else int(chunk_total)
 
+        self.record_files_cache.start(organization_id=self.organization.id)
         start_id = 0
         ind = 0
         for i in range(chunk_total):
@@ -355,9 +455,18 @@ class UnGlobalScraper:
             last_url = result_publications_urls[-1]
             start_id = last_url['id'] + 1
 
+            # Files of the records of the chunk: from the cache, the other ones are requested several at a time
+            files_by_recid = self.record_files_cache.get_files(
+                recids=[self.get_recid(publication_url=page_url) for page_url in publications_urls],
+                fetch_files=self.get_publications_details_from_api)
+
             for page_url in publications_urls:
+                recid = self.get_recid(publication_url=page_url)
+                if recid not in files_by_recid:  # The request failed
+                    self.failed_publications_urls.add(page_url)
                 publication_details = self.get_publication_details(
-                    publication_url=page_url)  # Get the download link
+                    publication_url=page_url,
+                    pub_versions_details=files_by_recid.get(recid))
                 if not publication_details:
                     print("Warning. A pdf will be missing: Download link was not found for: ", page_url)
                 else:
@@ -371,6 +480,8 @@ class UnGlobalScraper:
 
                 print(end=f"\r Retrieving publication details: {round(100 * ind / length_publications_urls, 2)}% ")
 
+        self.record_files_cache.end()
+
     def get_page_url(self, page_number: int, pub_type: str, year: int) -> str:
         """
         This function generate the url of a page for UN publications based the page number and publication's type
@@ -381,7 +492,7 @@ class UnGlobalScraper:
         #       "}&jrec={}"
         # url = "https://digitallibrary.un.org/search?ln=en&p=&f=&rm=&sf=&so=d&rg=50&c=Resource%20Type&c=UN%20Bodies&c=&of=hb&fti=0&fct__1=Publications&fct__3=2018&fti=0"
         url = "https://digitallibrary.un.org/search?ln=en&p=&f=&rm=&sf=&so=d&rg={" \
-              "}&c=Resource%20Type&c=UN%20Bodies&c=&of=hb&fti=0&fct__1={}&fct__3={}&fti=0jrec={}"
+              "}&c=Resource%20Type&c=UN%20Bodies&c=&of=hb&fti=0&fct__1={}&fct__3={}&fti=0&jrec={}"
 
         # Number of publications to skip
         jrec = self.max_pb_per_page * (page_number - 1) + 1 if page_number > 1 else 0
@@ -2,22 +2,23 @@
 and their details, and download the ones missing in the SQLite database """
 import datetime
 import re
-import time
 
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 
 from src import CONFIG
-from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls
+from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls, \
+    insert_temp_publications_urls
 from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.session import Session
 from src.common import filter_list_publications_and_details, generate_document_id, add_base_url_if_missing, \
-    get_page_from_url, format_language
+    get_page_from_url, format_language, get_html_parser
 from src.document import start_downloads, Document
 from src.organizations import get_organization_by_condition
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.date_fc import format_publication_date
+from src.xhr_fc import load_listing_items
+from src.selenium_fc import IncrementalLinksCollector, wait_for_items_count_change, wait_for_network_idle, \
+    wait_for_dom_quiet
 
 
 class UnaidsGlobalScraper:
@@ -52,8 +53,7 @@ class UnaidsGlobalScraper:
 
     def run(self):
         # step 1: Load all publications
-        # We use a while loop to make sure we loaded all publications. For that, the number publications found
-        # in the current iteration should be equal to the one in the last iteration
+        # The XHR request sent by the 'Show more' button is replayed over HTTP if it was recorded in a previous run
         publications_links_list = self.load_all_publications()
 
         # step 2: Insert links of all publications into temp_publications_urls_table
@@ -77,32 +77,45 @@ class UnaidsGlobalScraper:
 
     def load_all_publications(self):
         """
-        This function load all available publications by clicking on 'View More' button until
-        it is no longer visible on the webpage.
-        It will then return the div block containing all
+        Load the links of all publications, without browser if the request of the 'Show more' button is known, else
+        by clicking on the button in a browser recording the request (see xhr_fc.load_listing_items)
         """
+        return load_listing_items(name=self.xhr_template_name,
+                                  extract_items=self.get_publications_list_from_html,
+                                  get_first_page_html=self.get_first_page_html,
+                                  load_items_with_driver=self.load_all_publications_with_driver)
 
-        # Set up Chrome options
-        chrome_options = Options()
-        chrome_options.add_argument(
-            "--headless")  # Run Chrome in headless mode: Without opening the Chrome browser in a visible window
+    @property
+    def xhr_template_name(self):
+        return f"{self.organization_acronym}-{self.organization_region}"
 
-        # Set up web driver with Chrome options
-        # driver = webdriver.Chrome()  # show browser
-        driver = webdriver.Chrome(options=chrome_options)  # Hide browser
+    def get_first_page_html(self):
+        """
+        :return: the html of the listing before any click, or None
+        """
+        first_page = get_page_from_url(url=self.publications_page_url)
+        return str(first_page) if first_page is not None else None
 
+    def load_all_publications_with_driver(self, driver):
+        """
+        See `load_all_publications`
+        :param driver: a browser leased from the web driver pool
+        :return: links of the publications
+        """
         # Navigate to the website
         driver.get(self.publications_page_url)
 
+        # The links of the publications are collected from the page as they are loaded
+        links_collector = IncrementalLinksCollector(driver=driver, items_selector='.views-row', link_selector='a')
+
         # view_more_block_locator = (By.CLASS_NAME, 'cta-button')  # div containing the "View More" button
         load_more_button_selector = (By.XPATH, "//a[contains(text(), 'Show more')]")
 
         print("\r", "Loaded page(s): 1", end="")
         i = 1
-        nbr_times_block_size_remained_unchanged = 0  # number of times the number of publications in
-        # publications_links_list
-        last_pubs_n = 0
-        current_publications_n = 0
+        nbr_times_block_size_remained_unchanged = 0  # number of consecutive clicks that did not load new publications
+        max_unchanged_clicks = CONFIG["general"]["webdriver_waits"]["max_unchanged_clicks"]
+        last_pubs_n = links_collector.count()
         while True:
             try:
                 # Before each new click
@@ -116,22 +129,12 @@ class UnaidsGlobalScraper:
             # Click the load more button
             driver.execute_script("arguments[0].click();", button_load_more)
 
-            # Wait for the new items to be loaded
-            k = 0  # number of times the number of publications in publications_links_list
-            # remains unchanged in the below while loop
-            last_publications_n = 0
-            is_view_more_button_visible = True
-            while True:
-                current_publications_n = len(self.get_publications_list(driver))
-                if last_publications_n < current_publications_n:
-                    current_publications_n = len(self.get_publications_list(driver))
-                    last_publications_n = current_publications_n  # Update the last length
-                elif k < 3:
-                    k += 1
-                    time.sleep(2)
-                else:
-                    # The length of the block containing the publication is not changing
-                    break
+            # Wait for the new items to be loaded, then for the end of the requests sent by the click
+            current_publications_n = wait_for_items_count_change(driver=driver,
+                                                                 css_selector=links_collector.items_selector,
+                                                                 previous_count=last_pubs_n)
+            wait_for_network_idle(driver=driver)
+            links_collector.collect_new()
             i += 1
 
             print(end=f"\r Loaded page(s): {i}, publications n: {current_publications_n}")
@@ -142,28 +145,16 @@ class UnaidsGlobalScraper:
             else:
                 nbr_times_block_size_remained_unchanged += 1
 
-            # We test at least 10 times to be sure all publications were displayed on the page
-            # (nbr_times_block_size_remained_unchanged > 10). If the total number of publications remains unchanged
-            # during those consecutive 10 assessments, then we consider we have all available publications
-            if not is_view_more_button_visible or nbr_times_block_size_remained_unchanged > 10:
-                last_publications_n = 0
-                k = 0
-                while True:
-                    time.sleep(1)
-                    current_publications_n = len(self.get_publications_list(driver))
-                    if last_publications_n != current_publications_n:
-                        current_publications_n = len(self.get_publications_list(driver))
-                        last_publications_n = current_publications_n  # Update the last length
-                    elif k < 3:
-                        k += 1
-                    else:
-                        # The length of the block containing the publication is not changing
-                        break
-
-                break  # Leave the main loop
-
-        print(end=f"\r Loaded page(s): {i}, publications n: {current_publications_n}")
-        return self.get_publications_list(driver)
+            # The button is still visible but the last clicks did not load anything: all publications are loaded
+            if nbr_times_block_size_remained_unchanged >= max_unchanged_clicks:
+                break
+
+        # Wait for the last publications to be displayed
+        wait_for_dom_quiet(driver=driver)
+
+        # The links are returned, as the browser is given back to the pool
+        links_collector.collect_new()
+        return links_collector.links
 
     def get_all_publications_links(self, publications_list):
         """
@@ -171,30 +162,19 @@ class UnaidsGlobalScraper:
         :return:
         """
         # Extract the links of all publications and insert them in temp_publications_urls_table
-        for a_tag in publications_list:
-            link = a_tag.attrs['href']
-            publ_link = add_base_url_if_missing(base_url=self.download_base_url, url=link)
-            self.session.db_handler.insert_data_into_table(
-                table_name=CONFIG["general"]["temp_publications_urls_table"],
-                data={"url": publ_link})
-
-    def get_publications_list(self, selenium_driver):
+        insert_temp_publications_urls(urls=[add_base_url_if_missing(base_url=self.download_base_url, url=link)
+                                            for link in publications_list])
+
+    def get_publications_list_from_html(self, html: str) -> list:
         """
-        This function extract the number of publications from a Selenium web element.
-        Each 'a' tag refers to a single publication
-        :param selenium_driver:
-        :return:
+        This function extract the links of the publications from the html of the page (or of a XHR response).
+        The first 'a' tag of each 'views-row' div refers to a single publication
+        :param html:
+        :return: list of links
         """
-        try:
-            publications_divs_list = selenium_driver.find_elements(*(By.CLASS_NAME, 'views-row'))
-
-            divs = [BeautifulSoup(selenium_item.get_attribute("outerHTML"), 'html.parser') for selenium_item in
-                    publications_divs_list if selenium_item]
-
-            # Return `a` tags of each `div`
-            return [div.find('a') for div in divs if div.find('a')]
-        except:
-            return []
+        soup = BeautifulSoup(html, get_html_parser())
+        a_tags = [div.find('a') for div in soup.find_all('div', class_='views-row')]
+        return [a_tag.get('href') for a_tag in a_tags if a_tag and a_tag.get('href')]
 
     def get_publication_details(self, publication_url: str) -> list:
         """
@@ -308,13 +288,7 @@ class UnaidsGlobalScraper:
             if div_to_remove:
                 div_to_remove.extract()
 
-            d, m, y = p_date_p.text.split(' ')  # day, month_name, year
-            d, y = int(d), int(y)
-            month_number = datetime.datetime.strptime(m, '%B').month  # get the integer representation of
-            # a full month's name
-
-            publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-            return timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
+            return format_publication_date(raw_date=p_date_p.text, organization_acronym=self.organization_acronym)
         except:
             return ""
 
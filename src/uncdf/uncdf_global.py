@@ -2,7 +2,6 @@
 and their details, and download the ones missing in the SQLite database """
 import datetime
 import inspect
-import time
 import urllib3
 from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
@@ -11,11 +10,14 @@ from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.session import Session
 from src.common import filter_list_publications_and_details, get_page_from_url, generate_document_id, \
     add_base_url_if_missing, format_language, clean_text, selenium_get_page_from_url
-from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls
+from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls, \
+    insert_temp_publications_urls
 from src.document import start_downloads, Document
 from src.files_fc import LogEvent, LogLevel
 from src.organizations import get_organization_by_condition
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.date_fc import format_publication_date
+from src.selenium_fc import get_webdriver_pool, get_attribute_value, wait_for_attribute_change, \
+    wait_for_network_idle
 
 # Disable the InsecureRequestWarning
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -76,6 +78,16 @@ class UncdfGlobalScraper:
         This method retrieve the links of all the existing publications
         :return:
         """
+        # The same browser is used to click through all the pages of the listing
+        with get_webdriver_pool().lease() as sel_driver:
+            self.get_all_publications_links_from_listing(sel_driver=sel_driver)
+
+    def get_all_publications_links_from_listing(self, sel_driver):
+        """
+        Browse the pages of the listing with the given browser and save the links of the publications
+        :param sel_driver: a browser leased from the web driver pool
+        :return:
+        """
         # For each page,
         print(f" Retrieving publications: 0", end="")
 
@@ -84,7 +96,7 @@ class UncdfGlobalScraper:
         # `while` loop
 
         next_button_locator = (By.CSS_SELECTOR, '.page-link.next')  # div containing the "Next" button
-        sel_driver = None
+        first_result_selector = ".search-result__description a"  # Link of the first publication of the page
 
         last_page = False
         page = self.starting_page  # 0 is the first page
@@ -96,12 +108,15 @@ class UncdfGlobalScraper:
             if page == self.starting_page:
                 # Open the publications' page at the first page
                 wait_el_loc_xpath = (By.XPATH, "//div[@class='search-result__description']")
-                sel_driver = selenium_get_page_from_url(
+                selenium_get_page_from_url(
                     url=self.publications_page_url,
                     wait_element_located_xpath=wait_el_loc_xpath,
-                    get_beautifulsoup=False
+                    get_beautifulsoup=False,
+                    driver=sel_driver
                 )
             else:  # Navigate to the next page
+                first_result_link = get_attribute_value(driver=sel_driver, css_selector=first_result_selector,
+                                                        attribute="href")
                 try:
                     # Before each new click, relocate the button 'Netx'
                     next_button = sel_driver.find_element(*next_button_locator)
@@ -118,7 +133,12 @@ class UncdfGlobalScraper:
                     last_page = True
 
             if not last_page:
-                time.sleep(5)  # wait for the page to be loaded
+                if page != self.starting_page:
+                    # Wait for the results of the next page to replace the current ones
+                    wait_for_attribute_change(driver=sel_driver, css_selector=first_result_selector,
+                                              attribute="href", previous_value=first_result_link)
+                # Wait for the end of the requests of the page
+                wait_for_network_idle(driver=sel_driver)
 
             # Get the HTML source of the page
             html_source = sel_driver.page_source
@@ -166,19 +186,7 @@ class UncdfGlobalScraper:
             except:
                 publ_links = []
 
-            for publ_link in publ_links:
-                existing_url = self.session.db_handler.select_columns(
-                    columns=["*"],
-                    table_name=CONFIG["general"]["temp_publications_urls_table"],
-                    condition="url = ?",
-                    condition_vals=(publ_link,)
-                )
-
-                if not existing_url:
-                    self.session.db_handler.insert_data_into_table(
-                        table_name=CONFIG["general"]["temp_publications_urls_table"],
-                        data={"url": publ_link})
-                    nbr_retrieved_publications += 1
+            nbr_retrieved_publications += insert_temp_publications_urls(urls=publ_links)
 
             print(end=f"\r Retrieving publications: {nbr_retrieved_publications}")
 
@@ -274,12 +282,7 @@ class UncdfGlobalScraper:
             p_date = soup_page.find(
                 "ul", class_="date-and-location-wrapper"
             ).find("li").text.strip()  # format: July 16, 2020
-            m_d, y = p_date.split(",")
-            m, d = m_d.split(" ")
-            y, m, d = int(y), m.strip(), int(d)
-            month_number = datetime.datetime.strptime(m, '%B').month  # get the integer representation of a month
-            publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-            p_date = timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
+            p_date = format_publication_date(raw_date=p_date, organization_acronym=self.organization_acronym)
 
             return p_date if p_date else ""
         except:
@@ -1,5 +1,4 @@
 import datetime
-import time
 
 from bs4 import BeautifulSoup
 
@@ -8,15 +7,13 @@ from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.session import Session
 from src.common import filter_list_publications_and_details, get_page_from_url, generate_document_id, \
     add_base_url_if_missing, format_language
-from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls
+from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls, \
+    insert_temp_publications_urls
 from src.document import start_downloads, Document
 from src.organizations import get_organization_by_condition
 
-from selenium import webdriver  # for simulating user action such as a click on a button
-from selenium.webdriver.chrome.options import Options  # Options while setting up the webdriver with chrome
-from selenium.webdriver.common.by import By
-
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.date_fc import format_publication_date
+from src.undp import view_more_fc
 
 
 class UndpAsiaAndThePacificScraper:
@@ -54,27 +51,13 @@ class UndpAsiaAndThePacificScraper:
 
         """
         # step 1: Load all publications
-        # We use a while loop to make sure we loaded all publications. For that, the number publications found
-        # in the current iteration should be equal to the one in the last iteration
-        publications_block = None
-        last_publications_n = 0
-        while True:
-            current_publications_block = self.load_all_publications()
-            current_publications_n = len(self.get_publications_list(current_publications_block))
-            if last_publications_n < current_publications_n:
-                publications_block = current_publications_block
-                last_publications_n = current_publications_n
-            else:
-                break
-
-        # step 2: Get the list of publications that are present in publications_block_element as 'a' tags
-        publications_list = self.get_publications_list(selenium_web_element=publications_block)
+        # The XHR request sent by the 'View More' button is replayed over HTTP if it was recorded in a previous run
+        publications_list = self.load_all_publications()
 
         # step 3: Get links of all publications and insert them into temp_publications_urls_table
         self.get_all_publications_links(publications_list=publications_list)
 
         # Free memory
-        del publications_block
         del publications_list
 
         # step 4: Get details togethers with the download links of each publication on the current page
@@ -92,118 +75,15 @@ class UndpAsiaAndThePacificScraper:
 
     def load_all_publications(self):
         """
-        This function load all available publications by clicking on 'View More' button until
-        it is no longer visible on the webpage.
-        It will then return the div block containing all
+        Load the links of all publications, without browser if the request of the 'View More' button is known (see
+        view_more_fc.py)
         """
+        return view_more_fc.load_all_publications(name=self.xhr_template_name,
+                                                  publications_page_url=self.publications_page_url)
 
-        # Set up Chrome options
-        chrome_options = Options()
-        chrome_options.add_argument(
-            "--headless")  # Run Chrome in headless mode: Without opening the Chrome browser in a visible window
-
-        # Set up web driver with Chrome options
-        # driver = webdriver.Chrome()  # show browser
-        driver = webdriver.Chrome(options=chrome_options)  # Hide browser
-
-        # Navigate to the website
-        driver.get(self.publications_page_url)
-
-        # Define the block element
-        publications_block_locator = (By.ID, 'view-more-news-center')
-
-        view_more_block_locator = (By.CLASS_NAME, 'cta-button')  # div containing the "View More" button
-        load_more_button_selector = (By.CLASS_NAME, 'load-more-custom')
-
-        print("\r", "Loaded page(s): 1", end="")
-        i = 1
-        nbr_times_block_size_remained_unchanged = 0  # number of times the number of publications in publications_block
-        last_pubs_n = 0
-        while True:
-            publications_block = driver.find_element(*publications_block_locator)
-            view_more_block_element = driver.find_element(*view_more_block_locator)
-
-            # Check if all publications was loaded
-            # For that we check if the div block containing the 'View More' button is still visible
-            if 'hide' in view_more_block_element.get_attribute('class'):
-                # If not visible then all publications are loaded. break the while loop
-                is_view_more_button_visible = False
-            else:
-                # Before each new click
-                button_view_more = driver.find_element(*load_more_button_selector)
-
-                # Scroll to the load more button
-                driver.execute_script("arguments[0].scrollIntoView();", button_view_more)
-
-                # Click the load more button
-                driver.execute_script("arguments[0].click();", button_view_more)
-
-                # Wait for the new items to be loaded
-                k = 0  # number of times the number of publications in publications_block
-                # remains unchanged in the below while loop
-                last_publications_n = 0
-                is_view_more_button_visible = True
-                while True:
-                    current_publications_n = len(self.get_publications_list(publications_block))
-                    # print(f"last_publications_n: {last_publications_n}, publications len: {get_publications_n(
-                    # view_more_block_element)}.find, k: {k}")
-                    if last_publications_n != current_publications_n:
-                        publications_block = driver.find_element(*publications_block_locator)
-                        current_publications_n = len(self.get_publications_list(publications_block))
-                        last_publications_n = current_publications_n  # Update the last length
-                    elif k < 3:
-                        k += 1
-                    else:
-                        # The length of the block containing the publication is not changing
-                        break
-                i += 1
-
-                print(end=f"\r Loaded page(s): {i}, publications n: {current_publications_n}")
-
-                if last_pubs_n < current_publications_n:
-                    last_pubs_n = current_publications_n
-                    nbr_times_block_size_remained_unchanged = 0
-                else:
-                    nbr_times_block_size_remained_unchanged += 1
-
-                # TODO: to be removed, was just for testing
-                # --------------------- Start test
-                # if i > 10:
-                #     return driver.find_element(*publications_block_locator)
-                # --------------------- End test
-
-            # We test at least 10 times to be sure all publications were displayed on the page
-            # (nbr_times_block_size_remained_unchanged > 10). If the total number of publications remains unchanged
-            # during those consecutive 1 assessments, then we consider we have all available publications
-            if not is_view_more_button_visible or nbr_times_block_size_remained_unchanged > 10:
-                last_publications_n = 0
-                k = 0
-                while True:
-                    time.sleep(1)
-                    current_publications_n = len(self.get_publications_list(publications_block))
-                    if last_publications_n != current_publications_n:
-                        # time.sleep(2)
-                        publications_block = driver.find_element(*publications_block_locator)
-                        current_publications_n = len(self.get_publications_list(publications_block))
-                        last_publications_n = current_publications_n  # Update the last length
-                    elif k < 3:
-                        k += 1
-                    else:
-                        # The length of the block containing the publication is not changing
-                        break
-
-                break  # Leave the main loop
-
-        return driver.find_element(*publications_block_locator)
-
-    def get_publications_list(self, selenium_web_element):
-        """
-        This function extract the number of publications from a Selenium web element.
-        Each 'a' tag refers to a single publication
-        :param selenium_web_element:
-        :return:
-        """
-        return BeautifulSoup(selenium_web_element.get_attribute("outerHTML"), 'html.parser').find_all('a')
+    @property
+    def xhr_template_name(self):
+        return f"{self.organization_acronym}-{self.organization_region}"
 
     def get_all_publications_links(self, publications_list):
         """
@@ -211,12 +91,8 @@ class UndpAsiaAndThePacificScraper:
         :return:
         """
         # Extract the links of all publications and insert them in temp_publications_urls_table
-        for a_tag in publications_list:
-            link = a_tag.attrs['href']
-            publ_link = add_base_url_if_missing(base_url=self.download_base_url, url=link)
-            self.session.db_handler.insert_data_into_table(
-                table_name=CONFIG["general"]["temp_publications_urls_table"],
-                data={"url": publ_link})
+        insert_temp_publications_urls(urls=[add_base_url_if_missing(base_url=self.download_base_url, url=link)
+                                            for link in publications_list])
 
     def get_publication_tags_list(self, publication_page_soup: BeautifulSoup) -> str:
         publication_tag_links_list = publication_page_soup.find_all('a',
@@ -242,7 +118,6 @@ class UndpAsiaAndThePacificScraper:
         # after the last '/' in the url. the '-' are replaced by single white spaces
         publication_date = ""
         publication_iso_formatted_date = ""
-        publication_timestamp = None
 
         publication_page = get_page_from_url(url=publication_url)  # Get the page where the 'Download' Button is
 
@@ -260,21 +135,8 @@ class UndpAsiaAndThePacificScraper:
         else:
             # Get publication date
             publication_date = publication_title_div.find('h6', class_='coh-heading').text
-            if publication_date is not None:
-                publication_date = publication_date.strip()  # remove spaces from both sides
-                try:
-                    m, d, y = publication_date.split(' ')  # month_name, day, year
-                    d = d.replace(',', '')  # remove the comma next to the day
-                    d, y = int(d), int(y)
-                    month_number = datetime.datetime.strptime(m, '%B').month  # get the integer representation of a
-                    # month
-
-                    publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-                except BaseException as e:
-                    pass
-        # Format date of publication
-        if publication_timestamp is not None:
-            publication_iso_formatted_date = timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
+            publication_iso_formatted_date = format_publication_date(raw_date=publication_date,
+                                                                     organization_acronym=self.organization_acronym)
 
         if not jump_to_get_any_pdf:
             publication_title = publication_title_div.find('h2',
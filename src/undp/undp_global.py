@@ -1,7 +1,7 @@
 import datetime
 import inspect
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
 from src import CONFIG
 from src.dir_fc import generate_organization_download_pdf_directory_path
@@ -9,18 +9,28 @@ from src.session import Session
 from src.common import get_total_number_pages, \
     filter_list_publications_and_details, get_page_from_url, generate_document_id, add_base_url_if_missing, \
     format_language
-from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls
+from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls, \
+    insert_temp_publications_urls
 from src.document import start_downloads, Document
 from src.files_fc import LogEvent, LogLevel
 from src.organizations import get_organization_by_condition
+from src.checkpoint_fc import CHECKPOINT
+from src.incremental_fc import IncrementalCrawl
+from src.sitemap_fc import SitemapDiscovery
 
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.date_fc import format_publication_date
 
 
 class UndpGlobalScraper:
     _organization_acronym: str = "UNDP"
     _organization_region: str = "Global"
+    register_name: str = ""  # Name of the scraper in src/scrapers_register.yaml (set in src/__init__.py)
+    resumable: bool = True  # Can continue from its checkpoint in a resumed session (see checkpoint_fc.py)
     _download_base_url = "https://www.undp.org"
+    _sitemap_url = "https://www.undp.org/sitemap.xml"
+    _sitemap_publication_url_pattern = r"^https://www\.undp\.org/publications/[^/?#]+$"
+    # Only the publications of the listing pages are parsed (see `get_page_from_url`)
+    _listing_page_strainer = SoupStrainer("div", class_="views-infinite-scroll-content-wrapper")
 
     def __init__(self, session: Session):
         self.session = session
@@ -33,6 +43,9 @@ class UndpGlobalScraper:
         self.total_number_of_pages = 0
         self.number_of_pdfs_found_in_current_session = 0
         self.number_of_downloaded_pdfs_in_current_session = 0
+        self.incremental_crawl = IncrementalCrawl()  # Update mode (see incremental_fc.py)
+        self.sitemap_discovery = SitemapDiscovery(sitemap_url=self._sitemap_url,
+                                                  url_pattern=self._sitemap_publication_url_pattern)  # sitemap_fc.py
 
         self.pdf_files_directory = generate_organization_download_pdf_directory_path(
             organization_acronym_region=self.organization_acronym + "-" + self.organization_region,
@@ -59,13 +72,14 @@ class UndpGlobalScraper:
                     publications is ordered from the most recent to the oldest
 
         --------------
-        If update_mode is True, then the script will go through all pdf files
-        that exist on the website, and download the ones that are missing in the relative local disk.
-
-        If update_mode is False, then the script will start downloading the pdf files from the most recent file
-        until it find some files that already exist. The condition of stopping further check is to find
-        at least a certain number of consecutive files that already exist. That 'certain number' can be the
-        maximum number of publication per page.
+        If the update mode is disabled (key `incremental` of src/scrapers_register.yaml), or if a full crawl is due,
+        then the script will go through all pdf files that exist on the website, and download the ones that are
+        missing in the relative local disk.
+
+        Otherwise, the script will start downloading the pdf files from the most recent file until it find some
+        files that already exist. The condition of stopping further check is to find at least a certain number of
+        consecutive files that already exist (`incremental_crawl.nbr_known_items_to_stop` of the config file). See
+        incremental_fc.py
         """
         # Get total number of publications and pages from the website
         self.total_publications_online = self.get_total_number_publications()
@@ -82,18 +96,27 @@ class UndpGlobalScraper:
             return False
 
         # step 1: Get links of all publications
-        self.get_all_publications_links()
+        if not CHECKPOINT.is_stage_done("links"):
+            self.incremental_crawl.start(register_name=self.register_name, organization_id=self.organization.id)
+            self.get_all_publications_links()
+            self.incremental_crawl.end()
+            CHECKPOINT.save(stage="details")
 
         # step 2: Get details togethers with the download links of each publication on the current page
-        self.get_publications_details_from_urls()
+        if not CHECKPOINT.is_stage_done("details"):
+            self.get_publications_details_from_urls()
+            CHECKPOINT.save(stage="filter")
 
         # step 3: Apply filter to the list of publications list
-        filter_list_publications_and_details()
+        if not CHECKPOINT.is_stage_done("filter"):
+            filter_list_publications_and_details()
+            CHECKPOINT.save(stage="downloads")
 
         # step 4: Download new publications
         results = start_downloads(pdf_files_directory=self.pdf_files_directory)
         self.number_of_pdfs_found_in_current_session = results['total_of_pdfs_found']
         self.number_of_downloaded_pdfs_in_current_session = results['total_of_pdfs_downloaded']
+        self.sitemap_discovery.save_full_sweep(register_name=self.register_name)  # Once the downloads are done
 
         return True
 
@@ -102,15 +125,24 @@ class UndpGlobalScraper:
         This method retrieve the links of all the existing publications
         :return:
         """
+        # Sitemap discovery, the listing is only crawled if the sitemap cannot be used (see sitemap_fc.py)
+        if self.sitemap_discovery.add_publications_urls(register_name=self.register_name,
+                                                        organization_id=self.organization.id):
+            # The listing is not crawled. The date of the full crawl is saved after the downloads (see run)
+            self.incremental_crawl.is_partial_crawl = True
+            return
+
         # For each page,
         print(f"Retrieving publication links: 0%", end="")
         # list_publ_link = []
-        for page in range(self.starting_page, self.total_number_of_pages + 1):
+        # Resumed session: the pages before the checkpoint were already retrieved (see checkpoint_fc.py)
+        first_page = CHECKPOINT.get_position(stage="links").get("page", self.starting_page)
+        for page in range(first_page, self.total_number_of_pages + 1):
             # Get the url of the page
             page_ulr = self.get_page_url(page_number=page)
 
             # Get the current page (as a BeautifulSoup object)
-            current_page_soup = get_page_from_url(url=page_ulr)
+            current_page_soup = get_page_from_url(url=page_ulr, parse_only=self._listing_page_strainer)
 
             if current_page_soup is None:
                 msg = f"current_page_soup was None for the page ulr: {page_ulr}. \n " \
@@ -119,17 +151,20 @@ class UndpGlobalScraper:
                 LogEvent(level=LogLevel.WARNING.value,
                          message=msg,
                          function_name=inspect.currentframe().f_code.co_name).save()
+                self.incremental_crawl.is_partial_crawl = True  # The publications of this page are missed
                 continue
 
             # Get list of publications with their link on the current page
             # list_publ_link += self.get_list_of_publication_links_from_page(soup_page=current_page_soup, url=page_ulr)
             publ_links = self.get_list_of_publication_links_from_page(soup_page=current_page_soup, url=page_ulr)
-            for publ_link in publ_links:
-                self.session.db_handler.insert_data_into_table(
-                    table_name=CONFIG["general"]["temp_publications_urls_table"],
-                    data={"url": publ_link})
+            insert_temp_publications_urls(urls=publ_links)
+
+            # Update mode: the rest of the listing is already known (see incremental_fc.py)
+            if self.incremental_crawl.add_listing_items(publication_urls=publ_links):
+                break
 
             print(end=f"\r Retrieving publication links: {round(100 * page / self.total_number_of_pages, 2)}% ")
+            CHECKPOINT.save(stage="links", position={"page": page + 1})
 
         print("\r Retrieving publication links: 100%")
 
@@ -165,7 +200,6 @@ class UndpGlobalScraper:
         # after the last '/' in the url. the '-' are replaced by single white spaces
 
         publication_iso_formatted_date = ""
-        publication_timestamp = None
 
         publication_page = get_page_from_url(url=publication_url)  # Get the page where the 'Download' Button is
 
@@ -183,21 +217,8 @@ class UndpGlobalScraper:
         else:
             # Get publication date
             publication_date = publication_title_div.find('h6', class_='coh-heading').text
-            if publication_date is not None:
-                publication_date = publication_date.strip()  # remove spaces from both sides
-                try:
-                    m, d, y = publication_date.split(' ')  # month_name, day, year
-                    d = d.replace(',', '')  # remove the comma next to the day
-                    d, y = int(d), int(y)
-                    month_number = datetime.datetime.strptime(m, '%B').month  # get the integer representation of a
-                    # month
-
-                    publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-                except:
-                    pass
-        # Format date of publication
-        if publication_timestamp is not None:
-            publication_iso_formatted_date = timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
+            publication_iso_formatted_date = format_publication_date(raw_date=publication_date,
+                                                                     organization_acronym=self.organization_acronym)
 
         if not jump_to_get_any_pdf:
             publication_title = publication_title_div.find('h2',
@@ -393,11 +414,13 @@ class UndpGlobalScraper:
         chunk_total = length_publications_urls / chunk_size
         chunk_total = int(chunk_total) + 1 if int(chunk_total) < chunk_total else int(chunk_total)
 
-        start_id = 0
+        start_id = CHECKPOINT.get_last_id_temp(stage="details") + 1  # Resumed session (see checkpoint_fc.py)
         ind = 0
         for i in range(chunk_total):
             result_publications_urls = get_chunk_temp_publications_urls(from_id=start_id,
                                                                         limit=chunk_size)
+            if not result_publications_urls:
+                break
             # print(f"result_publications_urls: {result_publications_urls}")
             publications_urls = [purl['url'] for purl in result_publications_urls]
             last_url = result_publications_urls[-1]
@@ -420,6 +443,8 @@ class UndpGlobalScraper:
 
                 print(end=f"\r Retrieving publication details: {round(100 * ind / length_publications_urls, 2)}% ")
 
+            CHECKPOINT.save(stage="details", last_id_temp=last_url['id'])
+
         # return result
 
     def get_pdf_download_link(self, download_page_soup: BeautifulSoup) -> str:
@@ -0,0 +1,117 @@
+"""
+This file contains the loading of the publications' listing shared by the regional UNDP websites (Africa, Arab States,
+Asia and the Pacific, Europe and the CIS, Latin America and the Caribbean). Their listings have the same 'View More'
+button: its XHR request is replayed over HTTP if it was recorded in a previous run, else the button is clicked in a
+browser recording the request (see xhr_fc.load_listing_items).
+"""
+from bs4 import BeautifulSoup
+from selenium.webdriver.common.by import By
+
+from src import CONFIG
+from src.common import get_page_from_url, get_html_parser
+from src.selenium_fc import IncrementalLinksCollector, wait_for_items_count_change, wait_for_network_idle, \
+    wait_for_dom_quiet
+from src.xhr_fc import load_listing_items
+
+PUBLICATIONS_BLOCK_ID = 'view-more-news-center'  # Block containing the 'a' tags of the publications
+
+
+def get_publications_list(html: str) -> list:
+    """
+    This function extract the links of the publications from the html of the publications block (or of a XHR
+    response). Each 'a' tag refers to a single publication
+    :param html:
+    :return: list of links
+    """
+    return [a_tag.get('href') for a_tag in BeautifulSoup(html, get_html_parser()).find_all('a') if a_tag.get('href')]
+
+
+def get_first_page_html(publications_page_url: str):
+    """
+    :return: the html of the publications block before any click, or None
+    """
+    first_page = get_page_from_url(url=publications_page_url)
+    publications_block = first_page.find(id=PUBLICATIONS_BLOCK_ID) if first_page is not None else None
+    return str(publications_block) if publications_block is not None else None
+
+
+def load_all_publications_with_driver(driver, publications_page_url: str) -> list:
+    """
+    This function load all available publications by clicking on 'View More' button until
+    it is no longer visible on the webpage.
+    :param driver: a browser recording its network activity (see xhr_fc.xhr_discovery)
+    :param publications_page_url:
+    :return: links of the publications
+    """
+    # Navigate to the website
+    driver.get(publications_page_url)
+
+    # The links of the publications are collected from the page as they are loaded
+    links_collector = IncrementalLinksCollector(driver=driver, items_selector=f'#{PUBLICATIONS_BLOCK_ID} a')
+
+    view_more_block_locator = (By.CLASS_NAME, 'cta-button')  # div containing the "View More" button
+    load_more_button_selector = (By.CLASS_NAME, 'load-more-custom')
+
+    print("\r", "Loaded page(s): 1", end="")
+    i = 1
+    nbr_times_block_size_remained_unchanged = 0  # number of consecutive clicks that did not load new publications
+    max_unchanged_clicks = CONFIG["general"]["webdriver_waits"]["max_unchanged_clicks"]
+    last_pubs_n = links_collector.count()
+    while True:
+        view_more_block_element = driver.find_element(*view_more_block_locator)
+
+        # Check if all publications was loaded
+        # For that we check if the div block containing the 'View More' button is still visible
+        if 'hide' in view_more_block_element.get_attribute('class'):
+            # If not visible then all publications are loaded. break the while loop
+            break
+
+        # Before each new click
+        button_view_more = driver.find_element(*load_more_button_selector)
+
+        # Scroll to the load more button
+        driver.execute_script("arguments[0].scrollIntoView();", button_view_more)
+
+        # Click the load more button
+        driver.execute_script("arguments[0].click();", button_view_more)
+
+        # Wait for the new items to be loaded, then for the end of the requests sent by the click
+        current_publications_n = wait_for_items_count_change(driver=driver,
+                                                             css_selector=links_collector.items_selector,
+                                                             previous_count=last_pubs_n)
+        wait_for_network_idle(driver=driver)
+        links_collector.collect_new()
+        i += 1
+
+        print(end=f"\r Loaded page(s): {i}, publications n: {current_publications_n}")
+
+        if last_pubs_n < current_publications_n:
+            last_pubs_n = current_publications_n
+            nbr_times_block_size_remained_unchanged = 0
+        else:
+            nbr_times_block_size_remained_unchanged += 1
+
+        # The button is still visible but the last clicks did not load anything: all publications are loaded
+        if nbr_times_block_size_remained_unchanged >= max_unchanged_clicks:
+            break
+
+    # Wait for the last publications to be displayed
+    wait_for_dom_quiet(driver=driver, css_selector=f'#{PUBLICATIONS_BLOCK_ID}')
+
+    # The links are returned before the browser is closed
+    links_collector.collect_new()
+    return links_collector.links
+
+
+def load_all_publications(name: str, publications_page_url: str) -> list:
+    """
+    :param name: name of the XHR template of the scraper (e.g. 'UNDP-Africa')
+    :param publications_page_url:
+    :return: links of all the publications of the listing
+    """
+    return load_listing_items(
+        name=name,
+        extract_items=get_publications_list,
+        get_first_page_html=lambda: get_first_page_html(publications_page_url=publications_page_url),
+        load_items_with_driver=lambda driver: load_all_publications_with_driver(
+            driver=driver, publications_page_url=publications_page_url))
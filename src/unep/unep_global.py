@@ -4,21 +4,18 @@ import datetime
 import inspect
 import urllib3
 from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options  # Options while setting up the webdriver with chrome
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from src import CONFIG
 from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.session import Session
 from src.common import filter_list_publications_and_details, get_page_from_url, generate_document_id, \
-    add_base_url_if_missing, format_language, clean_text
-from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls
+    add_base_url_if_missing, format_language, clean_text, selenium_get_page_from_url
+from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls, \
+    insert_temp_publications_urls
 from src.document import start_downloads, Document
 from src.files_fc import LogEvent, LogLevel
 from src.organizations import get_organization_by_condition
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.date_fc import format_publication_date
 
 # Disable the InsecureRequestWarning
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -136,19 +133,7 @@ class UnepGlobalScraper:
             except:
                 publ_links = []
 
-            for publ_link in publ_links:
-                existing_url = self.session.db_handler.select_columns(
-                    columns=["*"],
-                    table_name=CONFIG["general"]["temp_publications_urls_table"],
-                    condition="url = ?",
-                    condition_vals=(publ_link,)
-                )
-
-                if not existing_url:
-                    self.session.db_handler.insert_data_into_table(
-                        table_name=CONFIG["general"]["temp_publications_urls_table"],
-                        data={"url": publ_link})
-                    nbr_retrieved_publications += 1
+            nbr_retrieved_publications += insert_temp_publications_urls(urls=publ_links)
 
             print(end=f"\r Retrieving publications: {nbr_retrieved_publications}")
 
@@ -163,36 +148,12 @@ class UnepGlobalScraper:
         :param webpage_url:
         :return:
         """
-        # Set up Chrome options
-        chrome_options = Options()
-        chrome_options.add_argument(
-            "--headless")  # Run Chrome in headless mode: Without opening the Chrome browser in a visible window
-
-        # Set up web driver with Chrome options
-        # driver = webdriver.Chrome()  # show browser
-        driver = webdriver.Chrome(options=chrome_options)  # Hide browser
-
-        # Navigate to the webpage
-        driver.get(webpage_url)
-
-        try:
-            # # Wait 60 seconds for a specific element or attribute within the iframe to appear
-            WebDriverWait(driver, 60).until(
-                EC.presence_of_element_located((By.XPATH, "//div[@class='flex flex-col-reverse md:flex-row']"))
-            )
-
-            # Get the HTML source of the page
-            html_source = driver.page_source
-
-            # Create a BeautifulSoup object
-            soup = BeautifulSoup(html_source, "html.parser")
-
-            return soup
-
-        except Exception as e:
-            print("Error:", e)
-
-        return None
+        # Wait 60 seconds for a specific element or attribute within the iframe to appear
+        return selenium_get_page_from_url(
+            url=webpage_url,
+            wait_element_located_xpath=(By.XPATH, "//div[@class='flex flex-col-reverse md:flex-row']"),
+            max_wait_time_sec=60
+        )
 
     def get_publication_tags_list(self, publication_page_soup: BeautifulSoup) -> str:
         publication_tag_links_list = publication_page_soup.find_all('a', class_=['tag-link'])
@@ -299,36 +260,21 @@ class UnepGlobalScraper:
         return tags_list
 
     def get_publication_date(self, soup_page: BeautifulSoup) -> str:
-        try:
-            p_date = soup_page.find("span", class_="flagship_date").text
-            d, m, y = p_date.split(" ")
-            d, y = int(d), int(y)
-            month_number = datetime.datetime.strptime(m, '%B').month  # get the integer representation of a
-            publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-            publication_date = timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
-            return publication_date
-        except:
-            pass
-
-        try:
-            p_date = soup_page.find("span", class_="article_header_meta_info_date").text
-            d, m, y = p_date.split(" ")
-            d, y = int(d), int(y)
-            month_number = datetime.datetime.strptime(m, '%b').month  # get the integer representation of a
-            publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-            publication_date = timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
-            return publication_date
-        except:
-            pass
+        date_tags = [
+            ("span", "flagship_date"),  # e.g. '16 July 2020'
+            ("span", "article_header_meta_info_date"),  # e.g. '16 Jul 2020'
+        ]
+        for tag_name, class_name in date_tags:
+            p_date = soup_page.find(tag_name, class_=class_name)
+            if p_date is not None:
+                publication_date = format_publication_date(raw_date=p_date.text,
+                                                           organization_acronym=self.organization_acronym)
+                if publication_date:
+                    return publication_date
 
         try:
             p_date = soup_page.find("div", class_="report_header").find("small").text
-            d, m, y = p_date.split(" ")
-            d, y = int(d), int(y)
-            month_number = datetime.datetime.strptime(m, '%B').month  # get the integer representation of a
-            publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-            publication_date = timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
-            return publication_date
+            return format_publication_date(raw_date=p_date, organization_acronym=self.organization_acronym)
         except:
             return ""
 
@@ -12,7 +12,7 @@ from src.common import filter_list_publications_and_details, get_page_from_url,
 from src.document import start_downloads, Document
 from src.files_fc import LogEvent, LogLevel
 from src.organizations import get_organization_by_condition
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.date_fc import format_publication_date
 
 # Disable the InsecureRequestWarning
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -239,10 +239,7 @@ class UnHabitatGlobalScraper:
     def get_publication_date(self, soup_page: BeautifulSoup) -> str:
         try:
             p_date_year = soup_page.find("div", class_="knowledge-year").text
-            p_date_year = int(p_date_year)
-            pub_timestamp = get_timestamp_from_date_and_time(year=p_date_year, month=1, day=1)
-
-            return timestamp_to_datetime_isoformat(timestamp=pub_timestamp)
+            return format_publication_date(raw_date=p_date_year, organization_acronym=self.organization_acronym)
         except:
             return ""
 
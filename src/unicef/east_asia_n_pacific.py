@@ -2,21 +2,24 @@
 and their details, and download the ones missing in the SQLite database """
 import datetime
 import re
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from src import CONFIG
 from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.session import Session
 from src.common import filter_list_publications_and_details, generate_document_id, add_base_url_if_missing, \
-    get_page_from_url, format_language
+    get_page_from_url, format_language, get_lan_from_text
+from src.http_fc import iter_prefetched_pages
 from src.document import start_downloads, Document
 from src.organizations import get_organization_by_condition
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.date_fc import format_publication_date
 
 
 class EastAsiaAndPacificScraper:
     _organization_acronym: str = "UNICEF"
     _organization_region: str = "East Asia and Pacific"
     _download_base_url = "https://www.unicef.org/eap/"
+    # Only the publications of the listing pages are parsed (see `get_page_from_url`)
+    _listing_page_strainer = SoupStrainer("div", class_="list-wrapper grey-lighter-bc")
 
     def __init__(self, session: Session):
         self.session = session
@@ -121,12 +124,15 @@ class EastAsiaAndPacificScraper:
         last_page = False
         page = 0  # page number starts by 0 for this website
 
-        while not last_page:
-            # Get the url of the page
-            page_url = self.get_api_url(page_number=page)
+        # The next pages are requested while the current one is processed
+        pages = iter_prefetched_pages(
+            get_page=lambda page_number: get_page_from_url(url=self.get_api_url(page_number=page_number),
+                                                           parse_only=self._listing_page_strainer),
+            first_page_number=page)
 
+        while not last_page:
             # Request
-            soup_page = get_page_from_url(url=page_url)
+            soup_page = next(pages)
 
             if not soup_page:
                 break
@@ -184,12 +190,7 @@ class EastAsiaAndPacificScraper:
     def get_date(self, p_div: BeautifulSoup) -> str:
         try:
             p_date = p_div.find('span', class_="list-date")
-            d, m, y = p_date.text.strip().split(' ')  # day, month_name, year
-            d, y = int(d), int(y)
-            month_number = datetime.datetime.strptime(m, '%B').month  # get the integer representation of a month
-
-            publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-            return timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
+            return format_publication_date(raw_date=p_date.text, organization_acronym=self.organization_acronym)
         except:
             return ""
 
@@ -258,9 +259,7 @@ class EastAsiaAndPacificScraper:
                         file_name_span = seln.find('span', class_="file-name")
                         # Get the "href" attribute of the element
                         file_name = file_name_span.text
-                        lang = [lg for lg in set(CONFIG['general']['un_languages']['lang_dict'].values())
-                                if lg.lower() in file_name.lower()]
-                        lang = lang[0] if lang else ""
+                        lang = get_lan_from_text(text_=file_name)
                         lang_link_list.append({
                             "lang": lang,
                             "link": href_value
@@ -3,25 +3,29 @@ and their details, and download the ones missing in the SQLite database """
 import datetime
 import inspect
 import re
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from src import CONFIG
-from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls
+from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls, \
+    insert_temp_publications_urls
 from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.files_fc import LogEvent, LogLevel
 from src.session import Session
 from src.common import filter_list_publications_and_details, generate_document_id, add_base_url_if_missing, \
-    get_page_from_url, format_language
+    get_page_from_url, format_language, get_lan_from_text
+from src.http_fc import iter_prefetched_pages
 from src.document import start_downloads, Document
 from src.organizations import get_organization_by_condition
 from selenium import webdriver  # for simulating user action such as a click on a button
 from selenium.webdriver.chrome.options import Options  # Options while setting up the webdriver with chrome
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.date_fc import format_publication_date
 
 
 class EasternAndSouthernAfricaScraper:
     _organization_acronym: str = "UNICEF"
     _organization_region: str = "Eastern and Southern Africa"
     _download_base_url = "https://www.unicef.org/esa/"
+    # Only the publications of the listing pages are parsed (see `get_page_from_url`)
+    _listing_page_strainer = SoupStrainer("div", class_="list-wrapper grey-lighter-bc")
 
     def __init__(self, session: Session):
         self.session = session
@@ -76,12 +80,18 @@ class EasternAndSouthernAfricaScraper:
         last_page = False
         page = 0  # page number starts by 0 for this website
 
+        # The next pages are requested while the current one is processed
+        pages = iter_prefetched_pages(
+            get_page=lambda page_number: get_page_from_url(url=self.get_page_url(page_number=page_number),
+                                                           parse_only=self._listing_page_strainer),
+            first_page_number=page)
+
         while not last_page:
             # Get the url of the page
             page_ulr = self.get_page_url(page_number=page)
 
             # Request
-            soup_page = get_page_from_url(url=page_ulr)
+            soup_page = next(pages)
 
             if not soup_page:
                 break
@@ -103,19 +113,7 @@ class EasternAndSouthernAfricaScraper:
             publ_links = self.get_list_of_publication_links_from_page(publication_divs_list=publication_divs,
                                                                       url=page_ulr)
 
-            for publ_link in publ_links:
-                existing_url = self.session.db_handler.select_columns(
-                    columns=["*"],
-                    table_name=CONFIG["general"]["temp_publications_urls_table"],
-                    condition="url = ?",
-                    condition_vals=(publ_link,)
-                )
-
-                if not existing_url:
-                    self.session.db_handler.insert_data_into_table(
-                        table_name=CONFIG["general"]["temp_publications_urls_table"],
-                        data={"url": publ_link})
-                    total_retrieved_publication += 1
+            total_retrieved_publication += insert_temp_publications_urls(urls=publ_links)
             page += 1
 
             print(end=f"\r Retrieving publications links (page - {page}): {total_retrieved_publication} ")
@@ -286,7 +284,8 @@ class EasternAndSouthernAfricaScraper:
 
     def get_date(self, soup_block: BeautifulSoup) -> str:
         try:
-            return soup_block.find('time').get('datetime')
+            return format_publication_date(raw_date=soup_block.find('time').get('datetime'),
+                                           organization_acronym=self.organization_acronym)
         except:
             return ""
 
@@ -320,9 +319,7 @@ class EasternAndSouthernAfricaScraper:
                             file_name_span = seln.find('span', class_="file-name")
                             # Get the "href" attribute of the element
                             file_name = file_name_span.text
-                            lang = [lg for lg in set(CONFIG['general']['un_languages']['lang_dict'].values())
-                                    if lg.lower() in file_name.lower()]
-                            lang = lang[0] if lang else ""
+                            lang = get_lan_from_text(text_=file_name)
                             lang_link_list.append({
                                 "lang": lang,
                                 "link": href_value
@@ -7,12 +7,11 @@ from src import CONFIG
 from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.session import Session
 from src.common import filter_list_publications_and_details, generate_document_id, add_base_url_if_missing, \
-    get_page_from_url, format_language
+    get_page_from_url, format_language, get_lan_from_text, get_json_wrapped_page_from_url
+from src.http_fc import iter_prefetched_pages
 from src.document import start_downloads, Document
 from src.organizations import get_organization_by_condition
-from selenium import webdriver  # for simulating user action such as a click on a button
-from selenium.webdriver.chrome.options import Options  # Options while setting up the webdriver with chrome
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.date_fc import format_publication_date
 
 
 class UnicefGlobalScraper:
@@ -123,12 +122,14 @@ class UnicefGlobalScraper:
         last_page = False
         page = 0  # page number starts by 0 for this website
 
-        while not last_page:
-            # Get the url of the page
-            api_url = self.get_api_url(page_number=page)
+        # The next pages are requested while the current one is processed
+        pages = iter_prefetched_pages(
+            get_page=lambda page_number: self.get_page_from_url(url=self.get_api_url(page_number=page_number)),
+            first_page_number=page)
 
+        while not last_page:
             # Request
-            soup_page = self.get_page_from_url(url=api_url)
+            soup_page = next(pages)
 
             if not soup_page:
                 break
@@ -171,44 +172,10 @@ class UnicefGlobalScraper:
                f"/222a00e2-d992-4d68-a2a7-e2b7e76ca311?p_id=2&js=true%2Ctrue&page=%2C%2C{page_number} "
 
     def get_page_from_url(self, url: str):
-        # Set up Chrome options
-        chrome_options = Options()
-        # Run Chrome in headless mode: Without opening the Chrome browser in a visible window
-        chrome_options.add_argument("--headless")
-
-        # Set up web driver with Chrome options
-        driver = webdriver.Chrome(options=chrome_options)
-
-        # Navigate to the website
-
-        driver.get(url)
-
-        body_text = driver.find_element("css selector", "body").text
-
-        body_text = body_text.removeprefix("for(;;); ")
-        # Decoding Unicode escape sequences
-        decoded_text = bytes(body_text, "utf-8").decode("unicode_escape")
-
-        decoded_text = decoded_text.replace("\\", "").replace("\t", "").replace("\n", "")
-
-        # Define the start and end markers
-        start_marker = "<form "
-        end_marker = "</form>"
-
-        # Construct the regular expression pattern
-        pattern = re.escape(start_marker) + r"(.*?)" + re.escape(end_marker)
-
-        # Search for the pattern in the text
-        match = re.search(pattern, decoded_text)
-
-        html_soup = None
-
-        if match:
-            extracted_text = match.group(1).strip()
-            extracted_text = start_marker + extracted_text + end_marker
-            html_soup = BeautifulSoup(extracted_text, 'html.parser')
-
-        return html_soup
+        """
+        The API returns the html of the page wrapped in JSON. The publications are in its 'form' tag
+        """
+        return get_json_wrapped_page_from_url(url=url, tag_name="form")
 
     def get_title(self, p_div: BeautifulSoup) -> str:
         try:
@@ -227,12 +194,7 @@ class UnicefGlobalScraper:
     def get_date(self, p_div: BeautifulSoup) -> str:
         try:
             p_date = p_div.find('span', class_="list-date")
-            d, m, y = p_date.text.strip().split(' ')  # day, month_name, year
-            d, y = int(d), int(y)
-            month_number = datetime.datetime.strptime(m, '%B').month  # get the integer representation of a month
-
-            publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-            return timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
+            return format_publication_date(raw_date=p_date.text, organization_acronym=self.organization_acronym)
         except:
             return ""
 
@@ -301,9 +263,7 @@ class UnicefGlobalScraper:
                         file_name_span = seln.find('span', class_="file-name")
                         # Get the "href" attribute of the element
                         file_name = file_name_span.text
-                        lang = [lg for lg in set(CONFIG['general']['un_languages']['lang_dict'].values())
-                                if lg.lower() in file_name.lower()]
-                        lang = lang[0] if lang else ""
+                        lang = get_lan_from_text(text_=file_name)
                         lang_link_list.append({
                             "lang": lang,
                             "link": href_value
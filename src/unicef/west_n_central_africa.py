@@ -2,21 +2,22 @@
 and their details, and download the ones missing in the SQLite database """
 import datetime
 import re
-import time
 
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 
 from src import CONFIG
-from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls
+from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls, \
+    insert_temp_publications_urls
 from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.session import Session
 from src.common import filter_list_publications_and_details, generate_document_id, add_base_url_if_missing, \
-    get_page_from_url, format_language
+    get_page_from_url, format_language, get_lan_from_text
 from src.document import start_downloads, Document
 from src.organizations import get_organization_by_condition
+from src.date_fc import format_publication_date
+from src.selenium_fc import get_webdriver_pool, count_items, wait_for_items_count_change, wait_for_network_idle, \
+    wait_for_dom_quiet
 
 
 class WestAndCentralAfricaScraper:
@@ -78,18 +79,17 @@ class WestAndCentralAfricaScraper:
         """
         This function load all available publications by clicking on 'View More' button until
         it is no longer visible on the webpage.
-        It will then return the div block containing all
+        It will then return the list of 'a' tags of the publications
         """
+        with get_webdriver_pool().lease() as driver:
+            return self.load_all_publications_with_driver(driver=driver)
 
-        # Set up Chrome options
-        chrome_options = Options()
-        chrome_options.add_argument(
-            "--headless")  # Run Chrome in headless mode: Without opening the Chrome browser in a visible window
-
-        # Set up web driver with Chrome options
-        # driver = webdriver.Chrome()  # show browser
-        driver = webdriver.Chrome(options=chrome_options)  # Hide browser
-
+    def load_all_publications_with_driver(self, driver):
+        """
+        See `load_all_publications`
+        :param driver: a browser leased from the web driver pool
+        :return: list of 'a' tags of the publications
+        """
         # Navigate to the website
         driver.get(self.publications_page_url)
 
@@ -98,10 +98,11 @@ class WestAndCentralAfricaScraper:
 
         print("\r", "Loaded p(s): 1", end="")
         i = 1
-        # Number of times the number of publications in publications_links_list
+        # Number of consecutive clicks that did not load new publications
         nbr_times_block_size_remained_unchanged = 0
-        last_pubs_n = 0
-        current_publications_n = 0
+        max_unchanged_clicks = CONFIG["general"]["webdriver_waits"]["max_unchanged_clicks"]
+        last_pubs_n = count_items(driver=driver, css_selector='.card')
+        current_publications_n = last_pubs_n
         while True:
             try:
                 # Before each new click
@@ -115,22 +116,10 @@ class WestAndCentralAfricaScraper:
             # Click the load more button
             driver.execute_script("arguments[0].click();", button_load_more)
 
-            # Wait for the new items to be loaded
-            k = 0  # number of times the number of publications in publications_links_list
-            # remains unchanged in the below while loop
-            last_publications_n = 0
-            is_view_more_button_visible = True
-            while True:
-                current_publications_n = len(self.get_publications_list(driver))
-                if last_publications_n != current_publications_n:
-                    # publications_links_list = driver.find_element(*publications_links_list_locator)
-                    current_publications_n = len(self.get_publications_list(driver))
-                    last_publications_n = current_publications_n  # Update the last length
-                elif k < 3:
-                    k += 1
-                else:
-                    # The length of the block containing the publication is not changing
-                    break
+            # Wait for the new items to be loaded, then for the end of the requests sent by the click
+            current_publications_n = wait_for_items_count_change(driver=driver, css_selector='.card',
+                                                                 previous_count=last_pubs_n)
+            wait_for_network_idle(driver=driver)
             i += 1
             print(end=f"\r Loaded page(s): {i}, publications n: {current_publications_n}")
 
@@ -140,26 +129,12 @@ class WestAndCentralAfricaScraper:
             else:
                 nbr_times_block_size_remained_unchanged += 1
 
-            # We test at least 10 times to be sure all publications were displayed on the page
-            # (nbr_times_block_size_remained_unchanged > 10). If the total number of publications remains unchanged
-            # during those consecutive 10 assessments, then we consider we have all available publications
-            if not is_view_more_button_visible or nbr_times_block_size_remained_unchanged > 10:
-                last_publications_n = 0
-                k = 0
-                while True:
-                    time.sleep(1)
-                    current_publications_n = len(self.get_publications_list(driver))
-                    if last_publications_n != current_publications_n:
-                        # publications_links_list = driver.find_element(*publications_links_list_locator)
-                        current_publications_n = len(self.get_publications_list(driver))
-                        last_publications_n = current_publications_n  # Update the last length
-                    elif k < 3:
-                        k += 1
-                    else:
-                        # The length of the block containing the publication is not changing
-                        break
-
-                break  # Leave the main loop
+            # The button is still visible but the last clicks did not load anything: all publications are loaded
+            if nbr_times_block_size_remained_unchanged >= max_unchanged_clicks:
+                break
+
+        # Wait for the last publications to be displayed
+        wait_for_dom_quiet(driver=driver)
 
         print(end=f"\r Loaded page(s): {i}, publications n: {current_publications_n}")
         return self.get_publications_list(driver)
@@ -170,12 +145,9 @@ class WestAndCentralAfricaScraper:
         :return:
         """
         # Extract the links of all publications and insert them in temp_publications_urls_table
-        for a_tag in publications_list:
-            link = a_tag.attrs['href']
-            publ_link = add_base_url_if_missing(base_url=self.download_base_url, url=link)
-            self.session.db_handler.insert_data_into_table(
-                table_name=CONFIG["general"]["temp_publications_urls_table"],
-                data={"url": publ_link})
+        insert_temp_publications_urls(urls=[add_base_url_if_missing(base_url=self.download_base_url,
+                                                                    url=a_tag.attrs['href'])
+                                            for a_tag in publications_list])
 
     def get_publications_list(self, selenium_driver):
         """
@@ -305,7 +277,8 @@ class WestAndCentralAfricaScraper:
     def get_date(self, p_div: BeautifulSoup) -> str:
         try:
             p_date_div = p_div.find('div', class_="field_publication_pub_date")
-            return p_date_div.find('time').get("datetime").strip()
+            return format_publication_date(raw_date=p_date_div.find('time').get("datetime"),
+                                           organization_acronym=self.organization_acronym)
         except:
             return ""
 
@@ -324,9 +297,7 @@ class WestAndCentralAfricaScraper:
                         file_name_span = seln.find('span', class_="file-name")
                         # Get the "href" attribute of the element
                         file_name = file_name_span.text
-                        lang = [lg for lg in set(CONFIG['general']['un_languages']['lang_dict'].values())
-                                if lg.lower() in file_name.lower()]
-                        lang = lang[0] if lang else ""
+                        lang = get_lan_from_text(text_=file_name)
                         lang_link_list.append({
                             "lang": lang,
                             "link": href_value
@@ -19,11 +19,13 @@ from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.session import Session
 from src.common import filter_list_publications_and_details, get_page_from_url, generate_document_id, \
     add_base_url_if_missing, clean_text, selenium_get_page_from_url, get_lan_from_text
-from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls
+from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls, \
+    insert_temp_publications_urls
 from src.document import start_downloads, Document
 from src.files_fc import LogEvent, LogLevel
 from src.organizations import get_organization_by_condition
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.date_fc import format_publication_date
+from src.selenium_fc import get_webdriver_pool, distribute_pages
 
 # Disable the InsecureRequestWarning
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -33,6 +35,7 @@ class UnwtoGlobalScraper:
     _organization_acronym: str = "UNWTO"
     _organization_region: str = "Global"
     _download_base_url = "https://www.e-unwto.org"
+    _nbr_browsers = 1  # Pages loaded at the same time (see `distribute_pages`): the website blocks the busy addresses
 
     def __init__(self, session: Session):
         self.session = session
@@ -43,6 +46,9 @@ class UnwtoGlobalScraper:
         self.max_pb_per_page = 100  # Maximum number of publications per page
         self.total_publications_online = 0
         self.total_number_of_pages = 0
+        self.headers = [{
+            "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                          "Chrome/58.0.3029.110 Safari/537.3"}]
         self.number_of_pdfs_found_in_current_session = 0
         self.number_of_downloaded_pdfs_in_current_session = 0
 
@@ -97,84 +103,73 @@ class UnwtoGlobalScraper:
 
     def get_all_publications_links(self):
         """
-        This method retrieve the links of all the existing publications
+        This method retrieve the links of all the existing publications.
+        The first page gives the total number of pages. The other pages are then loaded by the pooled browsers (see
+        `distribute_pages`), one at a time by default (`_nbr_browsers`)
         :return:
         """
         # For each page,
         print(f" Retrieving publications: 0", end="")
-        nbr_retrieved_publications = 0  # Number of retrieved publications
-        max_nbr_none = 3  # Maximum number of consecutive None values for `current_page_soup` before exiting the
-        # `while` loop
-        last_page = False
-        page = self.starting_page  # 0 is the first page
-        nbr_none = 0  # Number of consecutive None values for `current_page_soup`
-        total_pages = 0  # the total number of pages that will be accessed
-        while not last_page:
-            if nbr_none >= max_nbr_none:
-                break
-            # Get the url of the page
-            page_ulr = self.get_page_url(page_number=page)
-
-            # ## Get the current page (as a BeautifulSoup object)
-            headers = [{
-                "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
-                              "Chrome/58.0.3029.110 Safari/537.3"}]
-            # Wait until a form of id 'browsePublicationsForm' is present on the page
-            wait_el_loc_xpath = (By.XPATH, "//form[@id='browsePublicationsForm']")
-            current_page_soup = selenium_get_page_from_url(url=page_ulr,
-                                                           headers=headers,
-                                                           wait_element_located_xpath=wait_el_loc_xpath)
 
+        first_page_url = self.get_page_url(page_number=self.starting_page)
+        with get_webdriver_pool().lease() as driver:
+            first_page_soup = self.load_publications_page(driver=driver, url=first_page_url)
+
+        if first_page_soup is None:
+            msg = f"current_page_soup was None for the page ulr: {first_page_url}. \n " \
+                  f"Check your internet connection and/or the page ulr."
+            print(msg)
+            LogEvent(level=LogLevel.WARNING.value,
+                     message=msg,
+                     function_name=inspect.currentframe().f_code.co_name).save()
+            return
+
+        nbr_retrieved_publications = self.insert_publications_links(soup=first_page_soup)
+        print(end=f"\r Retrieving publications: {nbr_retrieved_publications}")
+
+        # The pages are addressed by their number (`startPage`): they can be loaded independently
+        total_pages = self.get_total_pages(soup=first_page_soup)
+        pages_urls = [self.get_page_url(page_number=page)
+                      for page in range(self.starting_page + 1, self.starting_page + total_pages)]
+
+        for page_ulr, current_page_soup in distribute_pages(urls=pages_urls, load_page=self.load_publications_page,
+                                                            nbr_browsers=self._nbr_browsers):
             if current_page_soup is None:
-                nbr_none += 1
-                msg = f"current_page_soup was None for the page ulr: {page_ulr}. \n " \
-                      f"Check your internet connection and/or the page ulr.",
-                print(msg)
-                LogEvent(level=LogLevel.WARNING.value,
-                         message=msg,
-                         function_name=inspect.currentframe().f_code.co_name).save()
                 continue
-            else:
-                # reset the counter of the Number of consecutive None values for `current_page_soup`
-                nbr_none = 0
-
-            if page == self.starting_page:
-                total_pages = self.get_total_pages(soup=current_page_soup)
-
-            # Check if there are some publications on the current page
-            publication_urls = self.get_publications_urls_list_from_page(soup=current_page_soup)
-            if not publication_urls:
-                break
-
-            # --- Check if the current page is the last one
-            if page - 1 >= total_pages:
-                last_page = True
-            # ---
-
-            # Add base url to each publication's url where missing
-            publ_links = [add_base_url_if_missing(base_url=self.download_base_url, url=url)
-                          for url in publication_urls]
-
-            for publ_link in publ_links:
-                existing_url = self.session.db_handler.select_columns(
-                    columns=["*"],
-                    table_name=CONFIG["general"]["temp_publications_urls_table"],
-                    condition="url = ?",
-                    condition_vals=(publ_link,)
-                )
-
-                if not existing_url:
-                    self.session.db_handler.insert_data_into_table(
-                        table_name=CONFIG["general"]["temp_publications_urls_table"],
-                        data={"url": publ_link})
-                    nbr_retrieved_publications += 1
-
+            nbr_retrieved_publications += self.insert_publications_links(soup=current_page_soup)
             print(end=f"\r Retrieving publications: {nbr_retrieved_publications}")
 
-            page += 1
-            break
         print("")
 
+    def load_publications_page(self, driver, url: str):
+        """
+        Load a page of the list of publications in the given browser
+        :return: a BeautifulSoup object, or None
+        """
+        # Wait until a form of id 'browsePublicationsForm' is present on the page
+        wait_el_loc_xpath = (By.XPATH, "//form[@id='browsePublicationsForm']")
+        return selenium_get_page_from_url(url=url,
+                                          headers=self.headers,
+                                          wait_element_located_xpath=wait_el_loc_xpath,
+                                          driver=driver)
+
+    def insert_publications_links(self, soup: BeautifulSoup) -> int:
+        """
+        Insert the links of the publications of a page in temp_publications_urls_table
+        :return: number of new links
+        """
+        # Check if there are some publications on the current page
+        publication_urls = self.get_publications_urls_list_from_page(soup=soup)
+
+        # Add base url to each publication's url where missing
+        publ_links = [add_base_url_if_missing(base_url=self.download_base_url, url=url)
+                      for url in publication_urls]
+
+        nbr_new_links = 0
+        nbr_new_links += insert_temp_publications_urls(urls=publ_links)
+
+        return nbr_new_links
+
     def get_total_pages(self, soup: BeautifulSoup) -> int:
         """
         Return the total number of pages that will be accessed
@@ -221,21 +216,30 @@ class UnwtoGlobalScraper:
 
         return tags_list
 
-    def get_publication_details(self, publication_url: str) -> list:
+    def load_publication_page(self, driver, url: str):
+        """
+        Load the page of a publication in the given browser
+        :return: a BeautifulSoup object, or None
+        """
+        # Wait until a div of class 'tocListWidgetContainer' is present on the page
+        wait_el_loc_xpath = (By.XPATH, "//div[@class='tocListWidgetContainer']")
+        return selenium_get_page_from_url(url=url,
+                                          headers=self.headers,
+                                          wait_element_located_xpath=wait_el_loc_xpath,
+                                          driver=driver)
+
+    def get_publication_details(self, publication_url: str, pub_page: BeautifulSoup = None) -> list:
         """
         Return the details of a publication
+        :param publication_url:
+        :param pub_page: page of the publication, if already loaded
         """
         results = []
 
         # Get publication's page
-        headers = [{
-            "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
-                          "Chrome/58.0.3029.110 Safari/537.3"}]
-        # Wait until a div of class 'tocListWidgetContainer' is present on the page
-        wait_el_loc_xpath = (By.XPATH, "//div[@class='tocListWidgetContainer']")
-        pub_page = selenium_get_page_from_url(url=publication_url,
-                                              headers=headers,
-                                              wait_element_located_xpath=wait_el_loc_xpath)
+        if pub_page is None:
+            with get_webdriver_pool().lease() as driver:
+                pub_page = self.load_publication_page(driver=driver, url=publication_url)
 
         if not pub_page:  # No page related to the publication's url were returned
             return []
@@ -312,18 +316,8 @@ class UnwtoGlobalScraper:
 
             # Get the next sibling, which should be the date
             date = published_tag.next_sibling.text.strip().replace("\xa0", " ")
-            date = date.split(" ")
-            d, m, y = 1, None, None  # The day is not provided in the dates, So we'll the `1` as the day of the month
-            if len(date) == 2:
-                m, y = date
-                m = clean_text(text=m)
-            else:
-                m, y = date[0], "January"  # If month is not provided then use `January`
-
-            y = int(y)
-            month_number = datetime.datetime.strptime(m, '%B').month  # get the integer representation of a
-            publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-            publication_date = timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
+            # The day is not provided in the dates (e.g. 'July 2020'), so the 1st of the month is used
+            publication_date = format_publication_date(raw_date=date, organization_acronym=self.organization_acronym)
 
             return publication_date if publication_date else ""
         except:
@@ -385,9 +379,12 @@ class UnwtoGlobalScraper:
             last_url = result_publications_urls[-1]
             start_id = last_url['id'] + 1
 
-            for page_url in publications_urls:
-                publication_details = self.get_publication_details(
-                    publication_url=page_url)  # Get the download link
+            # The pages of the chunk are loaded by the pooled browsers (`_nbr_browsers` at a time)
+            for page_url, pub_page in distribute_pages(urls=publications_urls, load_page=self.load_publication_page,
+                                                       nbr_browsers=self._nbr_browsers):
+                # Get the download link
+                publication_details = self.get_publication_details(publication_url=page_url, pub_page=pub_page) \
+                    if pub_page is not None else []
                 if not publication_details:
                     print("Warning. A pdf will be missing: Download link was not found for: ", page_url)
                 else:
@@ -0,0 +1,90 @@
+"""
+This file contains the canonicalization of the urls of the publications' pages before they are inserted in the
+temporary table of the publications' urls. The same page is often linked with variants of its url (tracking
+parameters, fragment, trailing slash, case of the host, http/https): once canonicalized, the variants are a single row
+of the table (unique index on the url), so the page is fetched once.
+Generic rules:
+- scheme and host in lower case, default port removed, fragment removed
+- tracking parameters removed (`utm_*`, `fbclid`, ...)
+- trailing slash of the path removed (except for the root)
+Rules of the hosts (HOST_RULES): https, parameters removed or added with their default value.
+Only the urls of the pages are canonicalized: the links of the files are kept as they are, since they are used in the
+ids of the documents already downloaded (see common.generate_document_id).
+"""
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Parameters added to the urls for the analytics of the websites
+TRACKING_PARAMETERS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "_ga", "_gl", "igshid", "ref_src"}
+TRACKING_PARAMETER_PREFIXES = ("utm_",)
+
+# Rules of the websites (host without 'www.'):
+# - https: the http urls are turned into https urls
+# - drop_parameters: parameters without effect on the page
+# - default_parameters: parameters added if missing, with the value used by the links of the listings (e.g. the UN
+#   digital library's record pages are linked with '?ln=en': the ids of its documents are built from these urls)
+HOST_RULES = {
+    "digitallibrary.un.org": {"https": True, "default_parameters": {"ln": "en"}},
+    "undp.org": {"https": True},
+    "who.int": {"https": True},
+    "afro.who.int": {"https": True},
+    "emro.who.int": {"https": True},
+    "paho.org": {"https": True},
+    "iris.paho.org": {"https": True},
+    "ilo.org": {"https": True},
+    "wfp.org": {"https": True},
+    "wipo.int": {"https": True},
+    "unep.org": {"https": True},
+    "wedocs.unep.org": {"https": True},
+    "openknowledge.worldbank.org": {"https": True},
+}
+
+
+def get_host_rules(host: str) -> dict:
+    """
+    :param host: e.g. 'www.undp.org'
+    :return: the rules of the host, {} if none
+    """
+    return HOST_RULES.get(host[4:] if host.startswith("www.") else host, {})
+
+
+def is_tracking_parameter(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMETERS or name.startswith(TRACKING_PARAMETER_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    :param url: absolute url of a page (e.g. 'HTTP://www.UNDP.org/publications/report/?utm_source=x#top')
+    :return: the canonical url (e.g. 'https://www.undp.org/publications/report'), or the url as it is if it is not an
+    http(s) url
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return url
+
+    host = parts.hostname.lower()
+    rules = get_host_rules(host=host)
+    if rules.get("https"):
+        scheme = "https"
+    netloc = host if port is None or (scheme, port) in (("http", 80), ("https", 443)) else f"{host}:{port}"
+    if parts.username:  # Kept as it is
+        netloc = parts.netloc.rsplit("@", 1)[0] + "@" + netloc
+
+    path = parts.path.rstrip("/") if len(parts.path) > 1 else parts.path
+    drop_parameters = set(rules.get("drop_parameters", []))
+    all_parameters = parse_qsl(parts.query, keep_blank_values=True)
+    parameters = [(name, value) for name, value in all_parameters
+                  if not is_tracking_parameter(name=name) and name not in drop_parameters]
+    for name, value in rules.get("default_parameters", {}).items():
+        if name not in {parameter[0] for parameter in parameters}:
+            parameters.append((name, value))
+    # The query is encoded again only if it changed (the encoding of the other urls is kept)
+    query = parts.query if parameters == all_parameters else urlencode(parameters)
+
+    return urlunsplit((scheme, netloc, path or "/", query, ""))
@@ -7,15 +7,20 @@ from src.files_fc import LogEvent, LogLevel
 from src.session import Session
 from src.common import filter_list_publications_and_details, get_page_from_url, generate_document_id, \
     add_base_url_if_missing
-from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls
+from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls, \
+    insert_temp_publications_urls
 from src.document import start_downloads, Document
 from src.organizations import get_organization_by_condition
+from src.sitemap_fc import SitemapDiscovery
 
 
 class WhoAfricaScraper:
     _organization_acronym: str = "WHO"
     _organization_region: str = "Africa"
+    register_name: str = ""  # Name of the scraper in src/scrapers_register.yaml (set in src/__init__.py)
     _download_base_url = "https://www.afro.who.int"
+    _sitemap_url = "https://www.afro.who.int/sitemap.xml"
+    _sitemap_publication_url_pattern = r"^https://www\.afro\.who\.int/publications/[^/?#]+$"
 
     def __init__(self, session: Session):
         self.session = session
@@ -24,6 +29,8 @@ class WhoAfricaScraper:
         self.publications_page_url = self.organization.publication_urls
         self.number_of_pdfs_found_in_current_session = 0
         self.number_of_downloaded_pdfs_in_current_session = 0
+        self.sitemap_discovery = SitemapDiscovery(sitemap_url=self._sitemap_url,
+                                                  url_pattern=self._sitemap_publication_url_pattern)  # sitemap_fc.py
 
         self.pdf_files_directory = generate_organization_download_pdf_directory_path(
             organization_acronym_region=self.organization_acronym + "-" + self.organization_region,
@@ -55,6 +62,7 @@ class WhoAfricaScraper:
         results = start_downloads(pdf_files_directory=self.pdf_files_directory)
         self.number_of_pdfs_found_in_current_session = results['total_of_pdfs_found']
         self.number_of_downloaded_pdfs_in_current_session = results['total_of_pdfs_downloaded']
+        self.sitemap_discovery.save_full_sweep(register_name=self.register_name)  # Once the downloads are done
 
         return True
 
@@ -63,6 +71,11 @@ class WhoAfricaScraper:
         This method retrieve the links of all the existing publications
         :return:
         """
+        # Sitemap discovery, the listing is only crawled if the sitemap cannot be used (see sitemap_fc.py)
+        if self.sitemap_discovery.add_publications_urls(register_name=self.register_name,
+                                                        organization_id=self.organization.id):
+            return
+
         # For each page,
         print(f" Retrieving publications: 0", end="")
         nbr_retrieved_publications = 0  # Number of retrieved publications
@@ -94,10 +107,7 @@ class WhoAfricaScraper:
 
             nbr_retrieved_publications += len(publ_links)
 
-            for publ_link in publ_links:
-                self.session.db_handler.insert_data_into_table(
-                    table_name=CONFIG["general"]["temp_publications_urls_table"],
-                    data={"url": publ_link})
+            insert_temp_publications_urls(urls=publ_links)
 
             print(end=f"\r Retrieving publications: {nbr_retrieved_publications} ")
 
@@ -9,17 +9,22 @@ from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.files_fc import LogEvent, LogLevel
 from src.session import Session
 from src.common import filter_list_publications_and_details, get_page_from_url, generate_document_id, \
-    add_base_url_if_missing
-from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls
+    add_base_url_if_missing, PageMemo
+from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls, \
+    insert_temp_publications_urls
 from src.document import start_downloads, Document
 from src.organizations import get_organization_by_condition
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.sitemap_fc import SitemapDiscovery
+from src.date_fc import format_publication_date
 
 
 class WhoAmericaPahoScraper:
     _organization_acronym: str = "WHO"
     _organization_region: str = "America-PAHO"
+    register_name: str = ""  # Name of the scraper in src/scrapers_register.yaml (set in src/__init__.py)
     _download_base_url = "https://www.paho.org"
+    _sitemap_url = "https://www.paho.org/sitemap.xml"
+    _sitemap_publication_url_pattern = r"^https://www\.paho\.org/en/documents/[^/?#]+$"
 
     def __init__(self, session: Session):
         self.session = session
@@ -28,6 +33,8 @@ class WhoAmericaPahoScraper:
         self.publications_page_url = self.organization.publication_urls
         self.number_of_pdfs_found_in_current_session = 0
         self.number_of_downloaded_pdfs_in_current_session = 0
+        self.sitemap_discovery = SitemapDiscovery(sitemap_url=self._sitemap_url,
+                                                  url_pattern=self._sitemap_publication_url_pattern)  # sitemap_fc.py
 
         self.pdf_files_directory = generate_organization_download_pdf_directory_path(
             organization_acronym_region=self.organization_acronym + "-" + self.organization_region,
@@ -59,6 +66,7 @@ class WhoAmericaPahoScraper:
         results = start_downloads(pdf_files_directory=self.pdf_files_directory)
         self.number_of_pdfs_found_in_current_session = results['total_of_pdfs_found']
         self.number_of_downloaded_pdfs_in_current_session = results['total_of_pdfs_downloaded']
+        self.sitemap_discovery.save_full_sweep(register_name=self.register_name)  # Once the downloads are done
 
         return True
 
@@ -67,6 +75,11 @@ class WhoAmericaPahoScraper:
         This method retrieve the url of all the existing publications
         :return:
         """
+        # Sitemap discovery, the listing is only crawled if the sitemap cannot be used (see sitemap_fc.py)
+        if self.sitemap_discovery.add_publications_urls(register_name=self.register_name,
+                                                        organization_id=self.organization.id):
+            return
+
         # For each page,
         print(f" Retrieving publications: 0", end="")
         nbr_retrieved_publications = 0  # Number of retrieved publications
@@ -97,10 +110,7 @@ class WhoAmericaPahoScraper:
 
             nbr_retrieved_publications += len(publ_links)
 
-            for publ_link in publ_links:
-                self.session.db_handler.insert_data_into_table(
-                    table_name=CONFIG["general"]["temp_publications_urls_table"],
-                    data={"url": publ_link})
+            insert_temp_publications_urls(urls=publ_links)
 
             print(end=f"\r Retrieving publications: {nbr_retrieved_publications} ")
 
@@ -127,8 +137,9 @@ class WhoAmericaPahoScraper:
         """
         results = []
 
-        # Get both response and BeautifulSoup objects
-        response, publication_page = get_page_from_url(url=publication_url, get_response=True)
+        # Get both response and BeautifulSoup objects. The final page is kept to not fetch it again below
+        page_memo = PageMemo()
+        response, publication_page = page_memo.get_page(url=publication_url, get_response=True)
 
         if publication_page is None:
             return []
@@ -145,13 +156,16 @@ class WhoAmericaPahoScraper:
         publication_detail = None
 
         if "https://www.paho.org/" in final_url:  # For `https://www.paho.org/` base url
-            publication_detail = self.get_publication_details_from_paho(publication_url=final_url)
+            publication_detail = self.get_publication_details_from_paho(publication_url=final_url,
+                                                                        page_memo=page_memo)
 
         if publication_detail is None and "iris.paho.org/" in final_url:  # For `iris.paho.org` base url
-            publication_detail = self.get_publication_details_from_iris(publication_url=final_url)
+            publication_detail = self.get_publication_details_from_iris(publication_url=final_url,
+                                                                        page_memo=page_memo)
 
         if "who.int/" in final_url:  # For `https://www.who.int/` base url
-            publication_detail = self.get_publication_details_from_who(publication_url=final_url)
+            publication_detail = self.get_publication_details_from_who(publication_url=final_url,
+                                                                       page_memo=page_memo)
 
         if publication_detail is not None:
             publication_title = publication_detail["title"]
@@ -239,10 +253,11 @@ class WhoAmericaPahoScraper:
 
         return results
 
-    def get_publication_details_from_iris(self, publication_url: str):
+    def get_publication_details_from_iris(self, publication_url: str, page_memo: PageMemo = None):
         """
         Get publication's details if the publication's url has the base url `https://iris.paho.org/`
         :param publication_url:
+        :param page_memo: pages already fetched for the publication (see get_publication_details)
         :return:
         """
         base_url = "https://iris.paho.org/"
@@ -250,7 +265,9 @@ class WhoAmericaPahoScraper:
                                                                    " ")  # By default, the title is set to string
         # after the last '/' in the url. the '-' are replaced by single white spaces
 
-        publication_page = get_page_from_url(url=publication_url)  # Get the page where the 'Download' Button is
+        # Get the page where the 'Download' Button is
+        publication_page = page_memo.get_page(url=publication_url) if page_memo else \
+            get_page_from_url(url=publication_url)
 
         if publication_page is None:
             return None
@@ -274,18 +291,8 @@ class WhoAmericaPahoScraper:
             pass
         publication_date = publication_date.strip() if publication_date is not None else ""
 
-        if len(publication_date) > 4:  # For day, month, year
-            try:
-                y, m, d = publication_date.split(' ')  # day, month_name, year
-                d = d.replace(',', '')  # remove the comma next to the day
-                d, m, y = int(str(d)), int(str(m)), int(str(y))  # all are already integers
-
-                publication_timestamp = get_timestamp_from_date_and_time(year=y, month=m, day=d)
-                publication_date = timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
-            except:
-                pass
-        elif publication_date == 4:
-            publication_date = int(str(publication_date))  # Only year
+        publication_date = format_publication_date(raw_date=publication_date,
+                                                   organization_acronym=self.organization_acronym)
 
         # ----- Language
         publication_language = ""  # No language was observed for this website
@@ -317,10 +324,11 @@ class WhoAmericaPahoScraper:
             download_links=download_links
         )
 
-    def get_publication_details_from_who(self, publication_url: str):
+    def get_publication_details_from_who(self, publication_url: str, page_memo: PageMemo = None):
         """
         Get publication's details if the publication's url has the base url `https://www.who.int/`
         :param publication_url:
+        :param page_memo: pages already fetched for the publication (see get_publication_details)
         :return:
         """
         base_url = "https://www.who.int/"
@@ -328,7 +336,9 @@ class WhoAmericaPahoScraper:
                                                                    " ")  # By default, the title is set to string
         # after the last '/' in the url. the '-' are replaced by single white spaces
 
-        publication_page = get_page_from_url(url=publication_url)  # Get the page where the 'Download' Button is
+        # Get the page where the 'Download' Button is
+        publication_page = page_memo.get_page(url=publication_url) if page_memo else \
+            get_page_from_url(url=publication_url)
 
         if publication_page is None:
             return None
@@ -349,19 +359,8 @@ class WhoAmericaPahoScraper:
 
         publication_date = publication_date.strip() if publication_date is not None else ""
 
-        if len(publication_date) > 4:  # For day, month, year
-            try:
-                d, m, y = publication_date.split(' ')  # day, month_name, year
-                d = d.replace(',', '')  # remove the comma next to the day
-                d, m, y = int(str(d)), str(m).strip(), int(str(y))
-
-                month_number = datetime.datetime.strptime(m, '%B').month  # get the integer representation of month
-                publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-                publication_date = timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
-            except:
-                pass
-        elif publication_date == 4:
-            publication_date = int(str(publication_date))  # Only year
+        publication_date = format_publication_date(raw_date=publication_date,
+                                                   organization_acronym=self.organization_acronym)
 
         # ----- Language
         publication_language = ""  # No language was observed for this website
@@ -398,10 +397,11 @@ class WhoAmericaPahoScraper:
             download_links=download_links
         )
 
-    def get_publication_details_from_paho(self, publication_url: str):
+    def get_publication_details_from_paho(self, publication_url: str, page_memo: PageMemo = None):
         """
         Get publication's details if the publication's url has the base url `https://www.paho.org/`
         :param publication_url:
+        :param page_memo: pages already fetched for the publication (see get_publication_details)
         :return:
         """
         base_url = "https://www.paho.org/"
@@ -409,7 +409,9 @@ class WhoAmericaPahoScraper:
                                                                    " ")  # By default, the title is set to string
         # after the last '/' in the url. the '-' are replaced by single white spaces
 
-        publication_page = get_page_from_url(url=publication_url)  # Get the page where the 'Download' Button is
+        # Get the page where the 'Download' Button is
+        publication_page = page_memo.get_page(url=publication_url) if page_memo else \
+            get_page_from_url(url=publication_url)
 
         if publication_page is None:
             return None
@@ -443,20 +445,8 @@ class WhoAmericaPahoScraper:
         publication_date = publication_page.find('div', class_="author")
         publication_date = publication_date.text.strip() if publication_date is not None else ""
 
-        if len(publication_date) > 4:  # For day, month, year
-            try:
-                d, m, y = publication_date.split(' ')  # day, month_name, year
-                d = d.replace(',', '')  # remove the comma next to the day
-                d, m, y = int(str(d)), str(m).strip(), int(str(y))
-
-                # we'll use %b (for abbreviations like 'Jul') instead of %B (for values like 'July', full month's name)
-                month_number = datetime.datetime.strptime(m, '%b').month  # get the integer representation of month
-                publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-                publication_date = timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
-            except:
-                pass
-        elif publication_date == 4:
-            publication_date = int(str(publication_date))  # Only year
+        publication_date = format_publication_date(raw_date=publication_date,
+                                                   organization_acronym=self.organization_acronym)
         # ----- Language
         publication_language = ""  # No language was observed for this website
 
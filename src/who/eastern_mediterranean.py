@@ -7,13 +7,14 @@ from bs4 import BeautifulSoup
 from src import Session, CONFIG
 from src.common import filter_list_publications_and_details, generate_document_id, is_valid_url, get_page_from_url, \
     format_language
-from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls
+from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls, \
+    insert_temp_publications_urls
 from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.document import start_downloads, Document
 from src.files_fc import LogEvent, LogLevel
 from src.organizations import get_organization_by_condition
 
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.date_fc import format_publication_date
 
 
 class WhoEasternMediterraneanScraper:
@@ -122,10 +123,7 @@ class WhoEasternMediterraneanScraper:
 
             nbr_retrieved_publications += len(publ_links)
 
-            for publ_link in publ_links:
-                self.session.db_handler.insert_data_into_table(
-                    table_name=CONFIG["general"]["temp_publications_urls_table"],
-                    data={"url": publ_link})
+            insert_temp_publications_urls(urls=publ_links)
 
             print(end=f"\r Retrieving publications: {nbr_retrieved_publications}")
 
@@ -220,22 +218,10 @@ class WhoEasternMediterraneanScraper:
             if dates:  # If dates are found
                 break
 
-        publication_timestamp = None
-        if dates and dates is not None:
-            try:
-                dates = dates[0].split(",")
-                m, y = dates[0].strip(), int(dates[1].strip())  # month_name, year
-                month_number = datetime.datetime.strptime(m, '%B').month  # get the integer representation of a
-                # month
-                # This website does not specify the days in the publication's dates, therefore we'll set it to 1
-                d = 1
-                publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-            except:
-                pass
-
-        # Format date of publication
-        if publication_timestamp is not None:
-            publication_iso_formatted_date = timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
+        # This website does not specify the days in the publication's dates, therefore the 1st of the month is used
+        if dates:
+            publication_iso_formatted_date = format_publication_date(raw_date=dates[0],
+                                                                     organization_acronym=self.organization_acronym)
 
         # ----- Extract publication tags/topics
         tags_list = ""
@@ -346,22 +332,14 @@ class WhoEasternMediterraneanScraper:
         if not is_valid_url(p_link):
             p_link = ""
 
-        publication_timestamp = ""
-        try:
-            d, m, y = publication["PublicationDateAndTime"].split(' ')  # month_name, day, year
-            d = d.replace(',', '')  # remove the comma next to the day
-            d, y = int(d), int(y)
-            month_number = datetime.datetime.strptime(m, '%B').month  # get the integer representation of a
-            # month
-            publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-        except:
-            pass
+        publication_date = format_publication_date(raw_date=publication.get("PublicationDateAndTime"),
+                                                   organization_acronym=self.organization_acronym)
 
         return Document(_id=document_id,
                         session_id=self.session.id,
                         organization_id=self.organization.id,
                         tags=publication["Tag"],
-                        publication_date=publication_timestamp,
+                        publication_date=publication_date,
                         publication_url=p_link,
                         downloaded_at=datetime.datetime.utcnow().isoformat(),
                         pdf_link=download_link,
@@ -13,7 +13,7 @@ from src.document import start_downloads, Document
 from src.files_fc import LogEvent, LogLevel
 from src.organizations import get_organization_by_condition
 
-from src.time_fc import get_timestamp_from_date_and_time
+from src.date_fc import format_publication_date
 
 
 class WhoSouthEastAsiaScraper:
@@ -153,16 +153,8 @@ class WhoSouthEastAsiaScraper:
 
         publication_title = publication["TrimmedTitle"]
         download_link = publication["DownloadUrl"].strip()
-        publication_timestamp = ""
-        try:
-            d, m, y = publication["FormatedDate"].split(' ')  # month_name, day, year
-            d = d.replace(',', '')  # remove the comma next to the day
-            d, y = int(d), int(y)
-            month_number = datetime.datetime.strptime(m, '%B').month  # get the integer representation of a
-            # month
-            publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-        except:
-            pass
+        publication_date = format_publication_date(raw_date=publication.get("FormatedDate"),
+                                                   organization_acronym=self.organization_acronym)
 
         # Create and id for the current pdf
         document_id = generate_document_id(organization_acronym=self.organization_acronym,
@@ -174,7 +166,7 @@ class WhoSouthEastAsiaScraper:
                         session_id=self.session.id,
                         organization_id=self.organization.id,
                         tags=publication["Tag"],
-                        publication_date=publication_timestamp,
+                        publication_date=publication_date,
                         publication_url="",
                         downloaded_at=datetime.datetime.utcnow().isoformat(),
                         pdf_link=download_link,
@@ -10,14 +10,19 @@ from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.document import start_downloads, Document
 from src.files_fc import LogEvent, LogLevel
 from src.organizations import get_organization_by_condition
+from src.checkpoint_fc import CHECKPOINT
+from src.incremental_fc import IncrementalCrawl
 
-from src.time_fc import get_timestamp_from_date_and_time
+from src.date_fc import format_publication_date
 
 
 class WhoGlobalScraper:
     _organization_acronym: str = "WHO"
     _organization_region: str = "Global"
+    register_name: str = ""  # Name of the scraper in src/scrapers_register.yaml (set in src/__init__.py)
+    resumable: bool = True  # Can continue from its checkpoint in a resumed session (see checkpoint_fc.py)
     _api_rqst_max_items: int = 50  # This is the maximum number of publications returned by the API per request
+    _api_url: str = "https://www.who.int/api/hubs/publications"
 
     def __init__(self, session: Session):
         self.session = session
@@ -25,6 +30,7 @@ class WhoGlobalScraper:
             condition=f"acronym='{self.organization_acronym}' AND region='{self._organization_region}'")
         self.number_of_pdfs_found_in_current_session = 0
         self.number_of_downloaded_pdfs_in_current_session = 0
+        self.incremental_crawl = IncrementalCrawl()  # Update mode (see incremental_fc.py)
 
         self.pdf_files_directory = generate_organization_download_pdf_directory_path(
             organization_acronym_region=self.organization_acronym + "-" + self.organization_region,
@@ -42,12 +48,22 @@ class WhoGlobalScraper:
     def api_rqst_max_items(self):
         return self._api_rqst_max_items
 
+    @property
+    def api_url(self):
+        return self._api_url
+
     def run(self):
         # step 1: Get details togethers with the download links of all publication
-        self.get_all_publications_details_from_api()
+        if not CHECKPOINT.is_stage_done("links"):
+            self.incremental_crawl.start(register_name=self.register_name, organization_id=self.organization.id)
+            self.get_all_publications_details_from_api()
+            self.incremental_crawl.end()
+            CHECKPOINT.save(stage="filter")  # The details are retrieved together with the publications
         #
         # # step 2: Apply filter to the list of publications list
-        filter_list_publications_and_details()
+        if not CHECKPOINT.is_stage_done("filter"):
+            filter_list_publications_and_details()
+            CHECKPOINT.save(stage="downloads")
 
         # step 3: Download new publications
         results = start_downloads(pdf_files_directory=self.pdf_files_directory)
@@ -64,7 +80,7 @@ class WhoGlobalScraper:
         """
 
         # API URL
-        api_url = f"https://www.who.int/api/hubs/publications?$skip={skip}&$orderby=PublicationDateAndTime%20desc"
+        api_url = f"{self.api_url}?$skip={skip}&$orderby=PublicationDateAndTime%20desc"
 
         try:
             # Send a GET request to the API
@@ -99,11 +115,15 @@ class WhoGlobalScraper:
         load_more = True  # Becomes False
         i = 0
         print("\r", f"Retrieving publication using API: 0", end="")
-        total_publications_retrieved = 0
+        # Resumed session: the publications before the checkpoint were already retrieved (see checkpoint_fc.py)
+        total_publications_retrieved = CHECKPOINT.get_position(stage="links").get("skip", 0)
         total_unique_documents_retrieved = 0
         while load_more:
             response = self.get_publications_list_from_api(skip=total_publications_retrieved)
-            if response is None or "value" not in response or not len(response["value"]):
+            if response is None or "value" not in response:
+                self.incremental_crawl.is_partial_crawl = True  # The request failed before the end of the listing
+                break
+            if not len(response["value"]):
                 break
 
             publications_list = response["value"]
@@ -120,6 +140,11 @@ class WhoGlobalScraper:
             total_publications_retrieved += len(publications_list)
             total_unique_documents_retrieved += len(new_documents_details_list)
             print(end=f"\r Retrieving publication using API: {total_publications_retrieved}")
+            CHECKPOINT.save(stage="links", position={"skip": total_publications_retrieved})
+
+            # Update mode: the rest of the publications (sorted by date, newest first) are already known
+            if self.incremental_crawl.add_listing_items(document_ids=[doc.id for doc in documents_details_list]):
+                break
 
             if len(publications_list) < self.api_rqst_max_items:
                 # if the maximum number of publications returned is less than 50 then do not try to load more as we
@@ -160,22 +185,14 @@ class WhoGlobalScraper:
         if not is_valid_url(p_link):
             p_link = ""
 
-        publication_timestamp = ""
-        try:
-            d, m, y = publication["PublicationDateAndTime"].split(' ')  # month_name, day, year
-            d = d.replace(',', '')  # remove the comma next to the day
-            d, y = int(d), int(y)
-            month_number = datetime.datetime.strptime(m, '%B').month  # get the integer representation of a
-            # month
-            publication_timestamp = get_timestamp_from_date_and_time(year=y, month=month_number, day=d)
-        except:
-            pass
+        publication_date = format_publication_date(raw_date=publication.get("PublicationDateAndTime"),
+                                                   organization_acronym=self.organization_acronym)
 
         return Document(_id=document_id,
                         session_id=self.session.id,
                         organization_id=self.organization.id,
                         tags=publication["Tag"],
-                        publication_date=publication_timestamp,
+                        publication_date=publication_date,
                         publication_url=p_link,
                         downloaded_at=datetime.datetime.utcnow().isoformat(),
                         pdf_link=download_link,
@@ -3,8 +3,8 @@ and their details, and download the ones missing in the SQLite database """
 import datetime
 import inspect
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-import requests
 import urllib3
 from bs4 import BeautifulSoup
 
@@ -13,11 +13,15 @@ from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.session import Session
 from src.common import filter_list_publications_and_details, get_page_from_url, generate_document_id, \
     add_base_url_if_missing, format_language, clean_text
-from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls
-from src.document import start_downloads, Document
+from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls, \
+    insert_temp_documents, get_scraper_state, save_scraper_state, get_failed_documents_dates
+from src.document import start_downloads
 from src.files_fc import LogEvent, LogLevel
 from src.organizations import get_organization_by_condition
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.checkpoint_fc import CHECKPOINT
+from src.http_fc import RateLimiter, get_http_session, iter_json_object_items
+from src.incremental_fc import is_full_sweep_due
+from src.date_fc import format_publication_dates
 
 # Disable the InsecureRequestWarning
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -26,7 +30,13 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 class DocumentsReportsScraper:
     _organization_acronym: str = "World Bank"
     _organization_region: str = "Documents and Reports"
+    register_name: str = ""  # Name of the scraper in src/scrapers_register.yaml (set in src/__init__.py)
+    resumable: bool = True  # Can continue from its checkpoint in a resumed session (see checkpoint_fc.py)
     _download_base_url = "https://documents.worldbank.org/"
+    _api_url = "https://search.worldbank.org/api/v2/wds"
+    _api_max_offset = 100_000  # The maximum value of `os` allowed by the API
+    # Fields requested to the API (`fl`): only the ones used to create the documents
+    _api_fields = ["docdt", "pdfurl", "display_title", "topicv3", "lang", "url_friendly_title"]
 
     def __init__(self, session: Session):
         self.session = session
@@ -39,6 +49,9 @@ class DocumentsReportsScraper:
         self.total_number_of_pages = 0
         self.number_of_pdfs_found_in_current_session = 0
         self.number_of_downloaded_pdfs_in_current_session = 0
+        self.is_full_sweep = False  # True if all the years are requested in this session
+        self.rate_limiter = RateLimiter(
+            max_requests_per_second=CONFIG["general"]["worldbank_api"]["max_requests_per_second"])
 
         self.pdf_files_directory = generate_organization_download_pdf_directory_path(
             organization_acronym_region=self.organization_acronym + "-" + self.organization_region,
@@ -56,41 +69,52 @@ class DocumentsReportsScraper:
     def download_base_url(self):
         return self._download_base_url
 
+    @property
+    def api_url(self):
+        return self._api_url
+
     def run(self):
+        # Same value in a resumed session: the date of the last full sweep is only saved at the end of the run
+        self.is_full_sweep = is_full_sweep_due(register_name=self.register_name)
+
         # step 1: Get links of all publications and details
-        self.get_publications_details_from_api()
+        if not CHECKPOINT.is_stage_done("links"):
+            self.get_publications_details_from_api()
+            CHECKPOINT.save(stage="filter")  # The details are retrieved together with the publications
 
         # step 2: Apply filter to the list of publications list
-        filter_list_publications_and_details()
+        if not CHECKPOINT.is_stage_done("filter"):
+            filter_list_publications_and_details()
+            CHECKPOINT.save(stage="downloads")
 
         # step 3: Download new publications
         results = start_downloads(pdf_files_directory=self.pdf_files_directory)
         self.number_of_pdfs_found_in_current_session = results['total_of_pdfs_found']
         self.number_of_downloaded_pdfs_in_current_session = results['total_of_pdfs_downloaded']
 
+        # step 4: The documents were downloaded, the next sessions can start from the most recent one
+        self.save_watermark()
+
         return True
 
-    def get_publication_details(self, response) -> list:
+    def get_documents_rows(self, publications: list) -> list:
         """
-        Return the details of a publication such as:
+        Return the rows of the temporary documents' table (see Document.to_dict) of the publications returned by the
+        API, with details such as:
         Title
         publication_date
         """
         results = []
-        try:
-            docs = response['documents']
-        except:
+        if not publications:
             return []
 
-        docs_keys_list = list(docs.keys())[0:-1]
-
-        doc_details_list = [docs[key] for key in docs_keys_list]
-
-        if not doc_details_list:
-            return []
+        # Publication's dates: all the dates of the response are parsed at once (e.g. '2020-07-16T00:00:00Z')
+        raw_dates = [publication.get('docdt') for publication in publications]
+        publication_dates = format_publication_dates(raw_dates=raw_dates, date_format="%Y-%m-%dT%H:%M:%SZ")
+        downloaded_at = datetime.datetime.utcnow().isoformat()
 
         # ---------- Get the details
-        for publication in doc_details_list:
+        for publication, publication_date in zip(publications, publication_dates):
             # --- Get download link
             try:
                 link = publication['pdfurl']
@@ -102,7 +126,6 @@ class DocumentsReportsScraper:
 
             # --- Get publication's title
             try:
-                # Note: The title is not returned by the API, therefore we'll use the publication url as the title
                 publication_title = clean_text(text=publication['display_title'])
             except:
                 publication_title = ""
@@ -114,12 +137,6 @@ class DocumentsReportsScraper:
             except:
                 tags_list = ""
 
-            # --- Publication's date
-            try:
-                publication_date = publication['docdt']
-            except:
-                publication_date = ""
-
             # --- Get current file's language
             try:
                 lang = publication['lang']
@@ -138,93 +155,163 @@ class DocumentsReportsScraper:
                                                publication_title=publication_title,
                                                pdf_download_link=link)
 
-            results.append(
-                Document(_id=document_id,
-                         session_id=self.session.id,
-                         organization_id=self.organization.id,
-                         title=publication_title,
-                         tags=tags_list,
-                         publication_date=f"{publication_date}",
-                         publication_url=publication_url,
-                         downloaded_at=datetime.datetime.utcnow().isoformat(),
-                         pdf_link=link,
-                         lang=lang
-                         )
-            )
+            # The rows are inserted in bulk: no `Document` object (and no organization lookup) per publication
+            results.append({
+                'id': document_id,
+                'session_id': self.session.id,
+                'organization_id': self.organization.id,
+                'language': lang,
+                'tags': tags_list,
+                'publication_date': f"{publication_date}",
+                'downloaded_at': downloaded_at,
+                'publication_url': publication_url,
+                'pdf_link': link,
+                'error': 0
+            })
 
         return results
 
     def get_publications_details_from_api(self):
         """
-        This function stores the list of all publications and their corresponding details in the database
+        This function stores the list of all publications and their corresponding details in the database.
+        The pages of the API (years and offsets) are requested by several threads under a rate limit, their JSON is
+        parsed while it is received and the documents are inserted in bulk.
+        Once all the pages were retrieved, the most recent `docdt` is kept as pending watermark, saved as watermark
+        once the documents were downloaded (see save_watermark): the next sessions only request the documents from
+        this date. A full sweep (see incremental_fc.is_full_sweep_due) requests all the years again, e.g. to get the
+        old documents published late
         """
-
         year_from = 1946
-        print("\r", f"Retrieving publication details (year - {year_from}): 0", end="")
-
-        total_retrieved_publication = 0
         year_to = datetime.datetime.utcnow().year
-        for year in range(year_from, year_to + 1, 1):
-            last_page = False
-            skip_ = 0
-            while not last_page:
-                # Get the url of the page
-                api_url = self.get_api_url(year=year, skip=skip_)
-
-                # Request
-                response = self.get_response_from_api(url=api_url)
-
-                if not response or not response.ok:
-                    break
-
-                try:
-                    response = response.json()
-                except:
-                    break
-
-                try:
-                    docs_dict = response['documents']
-                    doc_list_len = len(list(docs_dict.keys())) - 1
-                except:
-                    doc_list_len = 0
+        state = get_scraper_state(name=self.register_name)
+        watermark = None if self.is_full_sweep or state is None else state['watermark']
+        save_scraper_state(name=self.register_name, data={"pending_watermark": ""})
+        date_from = watermark[:10] if watermark else f"{year_from}-01-01"
+        # Resumed session: the years before the checkpoint were already retrieved (see checkpoint_fc.py)
+        first_year = max(int(date_from[:4]), CHECKPOINT.get_position(stage="links").get("year", year_from))
+        print("\r", f"Retrieving publication details (from {date_from}): 0", end="")
 
-                if not doc_list_len:
-                    break
-
-                if doc_list_len < self.max_pb_per_page:
-                    last_page = True
-
-                # Gets publications
-                publication_details = self.get_publication_details(response=response)
-
-                for doc in publication_details:
-                    # Check if already in temporary documents table
-                    if not doc.exist_in_temporary_table():
-                        doc.insert_in_temporary_table()
-                        total_retrieved_publication += 1
-
-                skip_ += self.max_pb_per_page
-
-                if skip_ > 100_000:  # The maximum value allowed by the API is 100_000
-                    break
-
-                print(end=f"\r Retrieving publication details "
-                          f"(years {year_from} to {year}): {total_retrieved_publication} ")
-
-    def get_api_url(self, year: int, skip: int) -> str:
+        total_retrieved_publication = 0
+        max_docdt = watermark if watermark else ""
+        is_complete = True  # False if a page could not be retrieved
+        nbr_pending_pages = {}  # year -> number of pages requested and not processed yet
+        failed_years = set()  # Years with a page which could not be retrieved
+        with ThreadPoolExecutor(max_workers=CONFIG["general"]["worldbank_api"]["nbr_workers"]) as executor:
+            futures = {}  # future -> (year, skip)
+
+            def request_page(year_: int, skip_: int):
+                page_date_from = date_from if year_ == int(date_from[:4]) else f"{year_}-01-01"
+                futures[executor.submit(self.get_api_page, year=year_, skip=skip_, date_from=page_date_from)] = \
+                    (year_, skip_)
+                nbr_pending_pages[year_] = nbr_pending_pages.get(year_, 0) + 1
+
+            for year in range(first_year, year_to + 1, 1):
+                request_page(year_=year, skip_=0)
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    year, skip = futures.pop(future)
+                    nbr_pending_pages[year] -= 1
+                    page, error = future.result()
+                    if page is None:
+                        is_complete = False
+                        failed_years.add(year)
+                        print(f"\n {error}")
+                        LogEvent(level=LogLevel.ERROR.value,
+                                 message=error,
+                                 function_name=inspect.currentframe().f_code.co_name).save()
+                        continue
+
+                    if skip == 0:
+                        # The other pages of the year are requested once its number of documents is known
+                        for next_skip in range(self.max_pb_per_page, min(page["total"], self._api_max_offset + 1),
+                                               self.max_pb_per_page):
+                            request_page(year_=year, skip_=next_skip)
+
+                    total_retrieved_publication += insert_temp_documents(
+                        documents=self.get_documents_rows(publications=page["publications"]))
+                    max_docdt = max([max_docdt] + [p.get('docdt') or "" for p in page["publications"]])
+
+                # Checkpoint: first year whose pages are not all retrieved (or with a failed page)
+                pending_years = [year for year, nbr_pages in nbr_pending_pages.items() if nbr_pages > 0]
+                CHECKPOINT.save(stage="links", position={"year": min(pending_years + list(failed_years),
+                                                                     default=year_to + 1)})
+
+                print(end=f"\r Retrieving publication details (from {date_from}): {total_retrieved_publication} ")
+
+        if is_complete and max_docdt:
+            save_scraper_state(name=self.register_name, data={"pending_watermark": max_docdt})
+
+    def save_watermark(self):
+        """
+        Save the pending watermark (most recent `docdt` of a complete retrieval) once the documents were downloaded.
+        If the failed downloads are retried in the next sessions (`retry_download_in_next_session`), the watermark is
+        moved back to the oldest document whose download failed, or removed if its date is unknown
+        """
+        state = get_scraper_state(name=self.register_name)
+        watermark = state['pending_watermark'] if state is not None else ""
+        if not watermark:  # The retrieval was not complete: the watermark is kept as it is
+            return
+
+        if CONFIG["general"]["retry_download_in_next_session"]:
+            failed_documents_dates = get_failed_documents_dates(organization_id=self.organization.id)
+            if failed_documents_dates:
+                watermark = "" if "" in failed_documents_dates else min([watermark] + failed_documents_dates)
+
+        data = {"watermark": watermark, "pending_watermark": ""}
+        if self.is_full_sweep:
+            data["last_full_sweep_at"] = datetime.datetime.utcnow().isoformat()
+        save_scraper_state(name=self.register_name, data=data)
+
+    def get_api_page(self, year: int, skip: int, date_from: str) -> tuple:
+        """
+        Request a page of the API and parse its JSON while it is received. Runs in a thread: the database is not used
+        here, the errors are returned to be logged by the main thread
+        :param year:
+        :param skip: number of publications to skip
+        :param date_from: first date of the page's documents (e.g. '2023-01-01', or the date of the last session's
+        most recent document)
+        :return: ({"total": number of documents of the year, "publications": [...]}, "") or (None, error message)
+        """
+        page = {"publications": []}
+        try:
+            response = self.get_response_from_api(url=self.get_api_url(year=year, skip=skip, date_from=date_from),
+                                                  max_attempt=CONFIG['general']['max_request_attempt'],
+                                                  max_waiting_time_sec=CONFIG['general']['max_waiting_time_sec'],
+                                                  stream=True)
+            with response:
+                if not response.ok:
+                    return None, f"The API returned the status code {response.status_code} (year {year}, skip {skip})"
+                for key, publication in iter_json_object_items(chunks=response.iter_content(chunk_size=64 * 1024),
+                                                               member="documents",
+                                                               other_members=page):
+                    if key != "facets":  # The last member of `documents` is not a publication
+                        page["publications"].append(publication)
+            page["total"] = int(page.get("total") or 0)
+        except Exception as e:
+            return None, f"The page of the API could not be retrieved (year {year}, skip {skip}): {e}"
+
+        return page, ""
+
+    def get_api_url(self, year: int, skip: int, date_from: str = "") -> str:
         """
         This function generate the url of a page for UN publications based the page number and publication's type
         param: skip: number of publication to skip. From 0 to 100_000
         param: year: Year of the publication. From 1st January to 31st December
+        param: date_from: first date of the documents (default: 1st January of the year)
         """
-        api_url = "https://search.worldbank.org/api/v2/wds?format=json&fl=docdt,docty&strdate={}-01-01&enddate={" \
-                  "}-12-31&os={}&rows={}&sort=docdt&order=asc"
+        api_url = self.api_url + "?format=json&fl={}&strdate={}&enddate={}-12-31&os={}&rows={}&sort=docdt&order=asc"
 
-        return api_url.format(year, year, skip, self.max_pb_per_page)
+        return api_url.format(",".join(self._api_fields), date_from if date_from else f"{year}-01-01", year, skip,
+                              self.max_pb_per_page)
 
     def get_response_from_api(self, url, max_attempt=1, max_waiting_time_sec=0,
-                              timeout=CONFIG['general']['request_time_out_in_second']):
-
+                              timeout=CONFIG['general']['request_time_out_in_second'], stream=False):
+        """
+        Request the API under the rate limit, again after a while if it answers 'Too many requests'. Runs in a
+        thread: the exceptions of the request are raised to the caller
+        """
         response = None
         max_attempt = 1 if not max_attempt else max_attempt
         waiting_time_step = 0  # 0 second
@@ -232,24 +319,15 @@ class DocumentsReportsScraper:
         if max_attempt and max_waiting_time_sec:
             waiting_time_step = int(max_waiting_time_sec / max_attempt)
 
-        try:
-            for atp in range(max_attempt + 1):
-                time.sleep(current_waiting_time)  # wait before next request attempt
-                response = requests.get(url, timeout=timeout)
-
-                if response.status_code == 429:  # If error is due to 'Too many requests'
-                    if atp < max_attempt - 1:
-                        current_waiting_time += waiting_time_step
-                        print(f"\n  Too many requests: Will retry in {current_waiting_time} second(s)")
-
-        except BaseException as e:
-            is_success = False
-            print(e)
-            # Save the error in logs
-            LogEvent(level=LogLevel.ERROR.value,
-                     message=e.__str__(),
-                     function_name=inspect.currentframe().f_code.co_name,
-                     exception=e.__str__()).save()
-            return None
+        for atp in range(max_attempt + 1):
+            time.sleep(current_waiting_time)  # wait before next request attempt
+            self.rate_limiter.wait()
+            response = get_http_session().get(url, timeout=timeout, stream=stream)
+
+            if response.status_code != 429:  # Only the errors due to 'Too many requests' are retried
+                break
+            if atp < max_attempt - 1:
+                current_waiting_time += waiting_time_step
+                print(f"\n  Too many requests: Will retry in {current_waiting_time} second(s)")
 
         return response
@@ -3,7 +3,6 @@ and their details, and download the ones missing in the SQLite database """
 import datetime
 import inspect
 
-import requests
 import urllib3
 from bs4 import BeautifulSoup
 
@@ -12,11 +11,13 @@ from src.dir_fc import generate_organization_download_pdf_directory_path
 from src.session import Session
 from src.common import filter_list_publications_and_details, get_page_from_url, generate_document_id, \
     add_base_url_if_missing, format_language, clean_text
-from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls
+from src.db_handler import get_total_temp_publications_urls, get_chunk_temp_publications_urls, \
+    insert_temp_publications_urls
 from src.document import start_downloads, Document
 from src.files_fc import LogEvent, LogLevel
 from src.organizations import get_organization_by_condition
-from src.time_fc import get_timestamp_from_date_and_time, timestamp_to_datetime_isoformat
+from src.checkpoint_fc import CHECKPOINT
+from src.date_fc import format_publication_date
 
 # Disable the InsecureRequestWarning
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -25,6 +26,7 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 class OpenKnowledgeRepoScraper:
     _organization_acronym: str = "World Bank"
     _organization_region: str = "Openknowledge"
+    resumable: bool = True  # Can continue from its checkpoint in a resumed session (see checkpoint_fc.py)
     _download_base_url = "https://openknowledge.worldbank.org/"
 
     def __init__(self, session: Session):
@@ -57,13 +59,19 @@ class OpenKnowledgeRepoScraper:
 
     def run(self):
         # step 1: Get links of all publications
-        self.get_all_publications_links()
+        if not CHECKPOINT.is_stage_done("links"):
+            self.get_all_publications_links()
+            CHECKPOINT.save(stage="details")
 
         # step 2: Get details togethers with the download links of each publication on the current page
-        self.get_publications_details_from_urls()
+        if not CHECKPOINT.is_stage_done("details"):
+            self.get_publications_details_from_urls()
+            CHECKPOINT.save(stage="filter")
 
         # step 3: Apply filter to the list of publications list
-        filter_list_publications_and_details()
+        if not CHECKPOINT.is_stage_done("filter"):
+            filter_list_publications_and_details()
+            CHECKPOINT.save(stage="downloads")
 
         # step 4: Download new publications
         results = start_downloads(pdf_files_directory=self.pdf_files_directory)
@@ -83,7 +91,7 @@ class OpenKnowledgeRepoScraper:
         max_nbr_none = 3  # Maximum number of consecutive None values for `current_page_soup` before exiting the
         # `while` loop
         last_page = False
-        page = 1  # 1 is the first page
+        page = CHECKPOINT.get_position(stage="links").get("page", 1)  # 1 is the first page. Resumed session
         nbr_none = 0  # Number of consecutive None values for `current_page_soup`
         while not last_page:
             if nbr_none >= max_nbr_none:
@@ -119,23 +127,12 @@ class OpenKnowledgeRepoScraper:
             # Get list of publications with their link on the current page
             publ_links = self.get_list_of_publication_links_from_page(soup_page=current_page_soup, url=page_ulr)
 
-            for publ_link in publ_links:
-                existing_url = self.session.db_handler.select_columns(
-                    columns=["*"],
-                    table_name=CONFIG["general"]["temp_publications_urls_table"],
-                    condition="url = ?",
-                    condition_vals=(publ_link,)
-                )
-
-                if not existing_url:
-                    self.session.db_handler.insert_data_into_table(
-                        table_name=CONFIG["general"]["temp_publications_urls_table"],
-                        data={"url": publ_link})
-                    nbr_retrieved_publications += 1
+            nbr_retrieved_publications += insert_temp_publications_urls(urls=publ_links)
 
             print(end=f"\r Retrieving publications: {nbr_retrieved_publications}")
 
             page += 1
+            CHECKPOINT.save(stage="links", position={"page": page})
         print("")
 
     def get_publication_tags_list(self, publication_page_soup: BeautifulSoup) -> str:
@@ -148,39 +145,6 @@ class OpenKnowledgeRepoScraper:
 
         return tags_list
 
-    def get_publications_details_from_api(self, pub_id: int = 0) -> list:
-        """
-        This method retrieve the links of all the existing publications.
-        Note: The API returns a maximum of 50 publications per request
-        :return:
-        """
-        # API URL
-        api_url = f"https://digitallibrary.un.org/api/v1/file?recid={pub_id}&file_types=[]&hidden_types=[" \
-                  "%22pdf%3Bpdfa%22%2C%22tif%22%2C%22tiff%22]&ln=en&hr=1"
-        try:
-            # Send a GET request to the API
-            response = requests.get(api_url, timeout=CONFIG["general"]["request_time_out_in_second"])
-
-            # Check if the request was successful (status code 200)
-            if response.status_code == 200:
-                # Parse JSON data
-                json_data = response.json()
-
-                return json_data
-            else:
-                # If the request was not successful, print the status code
-                print(f"Error: Request failed with status code {response.status_code}")
-                return []
-
-        except requests.exceptions.RequestException as e:
-            # If there was an error with the request, print the error message
-            msg = f"Error while retrieving data. Param recid = {pub_id}: {e}"
-            print(msg)
-            LogEvent(level=LogLevel.ERROR.value,
-                     message=msg,
-                     function_name=inspect.currentframe().f_code.co_name).save()
-            return []
-
     def get_publication_details(self, publication_url: str) -> list:
         """
         Return the details of a publication
@@ -210,13 +174,8 @@ class OpenKnowledgeRepoScraper:
         # --- Publication's date
         publication_date = pub_page.find('span', class_="dont-break-out ng-star-inserted")  # e.g. '1947-09-12'
         publication_date = clean_text(text=publication_date.text) if publication_date is not None else ""
-        try:
-            y, m, d = [int(dt) for dt in publication_date.split("-")]
-            publication_timestamp = get_timestamp_from_date_and_time(year=y, month=m, day=d)
-            publication_date = timestamp_to_datetime_isoformat(timestamp=publication_timestamp)
-        except:
-            publication_date = ""
-            pass
+        publication_date = format_publication_date(raw_date=publication_date,
+                                                   organization_acronym=self.organization_acronym)
 
         # -- Get versions languages and file urls
         pub_versions_links_n_lang = self.get_links_n_lang_from_page(soup_page=pub_page)
@@ -357,11 +316,13 @@ class OpenKnowledgeRepoScraper:
         chunk_total = length_publications_urls / chunk_size
         chunk_total = int(chunk_total) + 1 if int(chunk_total) < chunk_total else int(chunk_total)
 
-        start_id = 0
+        start_id = CHECKPOINT.get_last_id_temp(stage="details") + 1  # Resumed session (see checkpoint_fc.py)
         ind = 0
         for i in range(chunk_total):
             result_publications_urls = get_chunk_temp_publications_urls(from_id=start_id,
                                                                         limit=chunk_size)
+            if not result_publications_urls:
+                break
 
             publications_urls = [purl['url'] for purl in result_publications_urls]
             last_url = result_publications_urls[-1]
@@ -383,6 +344,8 @@ class OpenKnowledgeRepoScraper:
 
                 print(end=f"\r Retrieving publication details: {round(100 * ind / length_publications_urls, 2)}% ")
 
+            CHECKPOINT.save(stage="details", last_id_temp=last_url['id'])
+
     def get_page_url(self, page_number: int) -> str:
         """
         This function generate the url of a page for UN publications based the page number and publication's type
@@ -0,0 +1,333 @@
+"""
+This file contains the functions used to replace the clicks on the "Load more" buttons by plain HTTP requests.
+
+Some websites load the next items of a listing with an XHR request each time the button is clicked. In discovery mode,
+the browser records its network activity (Chrome performance log) while the button is clicked. The paginated XHR
+request is then turned into a template (url, parameters, name of the page parameter) and saved per scraper.
+The next runs replay the template with the shared HTTP client, page by page, without starting a browser. If the
+template stops working (error, no items), it is deleted and the scraper goes back to the browser (and a new discovery).
+Usage in a scraper: see load_listing_items.
+"""
+import copy
+import inspect
+import json
+import os
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qsl, urlunparse
+
+import requests
+
+from .files_fc import CONFIG, LogEvent, LogLevel, save_to_json, load_json
+from .http_fc import get_http_session, get_html_strings_from_json
+from .selenium_fc import create_webdriver, quit_webdriver
+
+# Names of the parameters usually used for the pagination (lower case), by order of preference
+PAGE_PARAMETER_NAMES = ["page", "p", "pg", "pagenumber", "page_number", "offset", "start", "skip", "from"]
+
+
+# --- Templates storage
+def get_xhr_templates_directory() -> str:
+    return os.path.join(*CONFIG["general"]["xhr_replay"]["templates_path"])
+
+
+def get_xhr_template_path(name: str) -> str:
+    return os.path.join(get_xhr_templates_directory(), f"{name.lower().replace(' ', '_')}.json")
+
+
+def load_xhr_template(name: str):
+    """
+    :param name: name of the scraper (e.g. 'undp-africa')
+    :return: the saved template or None
+    """
+    filepath = get_xhr_template_path(name=name)
+    if not os.path.exists(filepath):
+        return None
+    try:
+        return load_json(filepath=filepath)
+    except:
+        return None
+
+
+def save_xhr_template(name: str, template: dict) -> bool:
+    os.makedirs(get_xhr_templates_directory(), exist_ok=True)
+    return save_to_json(obj=template, filepath=get_xhr_template_path(name=name))
+
+
+def delete_xhr_template(name: str):
+    filepath = get_xhr_template_path(name=name)
+    if os.path.exists(filepath):
+        os.remove(filepath)
+
+
+# --- Discovery
+def get_xhr_requests_from_performance_log(driver) -> list:
+    """
+    Return the XHR/fetch requests sent by the browser since the last call (Chrome performance log)
+    :param driver: a browser started with `capture_network=True`
+    :return: list of dicts {"method", "url", "headers", "post_data"}
+    """
+    xhr_requests = []
+    for entry in driver.get_log("performance"):
+        try:
+            message = json.loads(entry["message"])["message"]
+        except:
+            continue
+        if message.get("method") != "Network.requestWillBeSent":
+            continue
+        params = message.get("params", {})
+        if params.get("type") not in ["XHR", "Fetch"]:
+            continue
+        request = params.get("request", {})
+        xhr_requests.append({
+            "method": request.get("method", "GET"),
+            "url": request.get("url", ""),
+            "headers": request.get("headers", {}),
+            "post_data": request.get("postData"),
+        })
+    return xhr_requests
+
+
+def split_request_parameters(xhr_request: dict) -> tuple:
+    """
+    :return: (url without query string, query parameters, form data parameters or None)
+    """
+    parsed_url = urlparse(xhr_request["url"])
+    base_url = urlunparse(parsed_url._replace(query=""))
+    params = dict(parse_qsl(parsed_url.query, keep_blank_values=True))
+    data = None
+    if xhr_request.get("post_data"):
+        data = dict(parse_qsl(xhr_request["post_data"], keep_blank_values=True))
+    return base_url, params, data
+
+
+def find_page_parameter(requests_parameters: list):
+    """
+    Find the parameter used for the pagination among the parameters of consecutive requests to the same endpoint
+    :param requests_parameters: list of (location, parameters) of the requests, in order. location: 'params' or 'data'
+    :return: (location, name, first value, step) or None
+    """
+    candidates = []
+    first_location, first_parameters = requests_parameters[0]
+    for name, value in first_parameters.items():
+        if not value.isdigit():
+            continue
+        values = [int(value)]
+        for location, parameters in requests_parameters[1:]:
+            if location == first_location and str(parameters.get(name, "")).isdigit():
+                values.append(int(parameters[name]))
+        steps = {b - a for a, b in zip(values, values[1:])}
+        if len(values) > 1 and (len(steps) != 1 or steps == {0}):
+            continue  # The value does not increase regularly: not a page parameter
+        step = steps.pop() if steps else 1
+        rank = PAGE_PARAMETER_NAMES.index(name.lower()) if name.lower() in PAGE_PARAMETER_NAMES else None
+        if len(values) == 1 and rank is None:
+            continue  # A single request: only the usual names can be trusted
+        candidates.append((len(values) > 1, -(rank if rank is not None else len(PAGE_PARAMETER_NAMES)),
+                           (first_location, name, int(value), step)))
+
+    if not candidates:
+        return None
+    return max(candidates, key=lambda c: (c[0], c[1]))[2]
+
+
+def infer_xhr_template(xhr_requests: list):
+    """
+    Build the template of the paginated request among the XHR requests recorded while clicking on "Load more"
+    :param xhr_requests: see get_xhr_requests_from_performance_log
+    :return: the template (dict) or None if no paginated request was found
+    """
+    # Group the requests by endpoint
+    endpoints = {}
+    for xhr_request in xhr_requests:
+        base_url, params, data = split_request_parameters(xhr_request=xhr_request)
+        endpoints.setdefault((xhr_request["method"].upper(), base_url), []).append((xhr_request, params, data))
+
+    # The endpoint called the most (once per click) is tried first
+    for (method, base_url), endpoint_requests in sorted(endpoints.items(), key=lambda e: -len(e[1])):
+        requests_parameters = [("data", data) if data is not None else ("params", params)
+                               for _, params, data in endpoint_requests]
+        # The page parameter can be in the query string even for POST requests
+        page_parameter = find_page_parameter(requests_parameters=requests_parameters) or \
+            find_page_parameter(requests_parameters=[("params", params) for _, params, _ in endpoint_requests])
+        if page_parameter is None:
+            continue
+
+        xhr_request, params, data = endpoint_requests[0]
+        location, name, first_value, step = page_parameter
+        headers = {key: value for key, value in xhr_request["headers"].items()
+                   if key.lower() in ["accept", "x-requested-with", "content-type"]}
+        return {
+            "method": method,
+            "url": base_url,
+            "params": params,
+            "data": data,
+            "headers": headers,
+            "page_parameter": {"location": location, "name": name, "first_value": first_value, "step": step},
+        }
+
+    return None
+
+
+@contextmanager
+def xhr_discovery(name: str):
+    """
+    Lend a browser recording its network activity. At the end of the `with` block, the template of the paginated XHR
+    request (if any) is saved for the scraper `name`.
+    This browser is not taken from the pool: the recording of the network activity slows the browser down.
+    :param name: name of the scraper (e.g. 'undp-africa')
+    """
+    driver = create_webdriver(lean=True, capture_network=True)
+    try:
+        yield driver
+        template = infer_xhr_template(xhr_requests=get_xhr_requests_from_performance_log(driver=driver))
+        if template is not None:
+            save_xhr_template(name=name, template=template)
+            msg = f"XHR endpoint discovered for {name}: {template['url']}"
+            LogEvent(level=LogLevel.INFO.value,
+                     message=msg,
+                     function_name=inspect.currentframe().f_code.co_name).save()
+    finally:
+        quit_webdriver(driver)
+
+
+# --- Replay
+def get_xhr_page_request(template: dict, page_index: int) -> dict:
+    """
+    :param template:
+    :param page_index: 0 for the first request recorded (first click), 1 for the next one, ...
+    :return: arguments of `requests.Session.request`
+    """
+    page_parameter = template["page_parameter"]
+    params, data = copy.deepcopy(template["params"]), copy.deepcopy(template["data"])
+    value = str(page_parameter["first_value"] + page_index * page_parameter["step"])
+    if page_parameter["location"] == "data" and data is not None:
+        data[page_parameter["name"]] = value
+    else:
+        params[page_parameter["name"]] = value
+    return {"method": template["method"], "url": template["url"], "params": params, "data": data,
+            "headers": template["headers"]}
+
+
+def get_html_from_xhr_response(response) -> str:
+    """
+    Return the html of a XHR response. JSON responses (e.g. Drupal's AJAX commands: [{"command": "insert",
+    "data": "<div>...</div>"}, ...]) are reduced to the concatenation of their html strings.
+    """
+    try:
+        payload = response.json()
+    except:
+        return response.text
+    return "".join(get_html_strings_from_json(payload=payload))
+
+
+def replay_xhr_template(name: str, template: dict, extract_items, get_item_key=None, first_page_html: str = None):
+    """
+    Load all the items of a listing by replaying the saved XHR template of the scraper, page by page, until a page
+    brings no new item. A page is requested again after an error (`xhr_replay.max_page_attempts` times at most).
+    :param name: name of the scraper (e.g. 'undp-africa')
+    :param template: see load_xhr_template
+    :param extract_items: function(html: str) -> list of items (e.g. BeautifulSoup 'a' tags)
+    :param get_item_key: function(item) -> key used to detect the items already seen (default: the item itself)
+    :param first_page_html: html of the listing before any click (its items are returned first)
+    :return: the list of items, or None if the template stopped working or a page could not be loaded (the browser
+    must be used)
+    """
+    xhr_replay_config = CONFIG["general"]["xhr_replay"]
+    get_item_key = get_item_key if get_item_key else (lambda item: item)
+    items, seen_keys = [], set()
+
+    def add_items(new_items: list) -> int:
+        nbr_new_items = 0
+        for item in new_items:
+            key = get_item_key(item)
+            if key not in seen_keys:
+                seen_keys.add(key)
+                items.append(item)
+                nbr_new_items += 1
+        return nbr_new_items
+
+    def request_page(page_index_: int):
+        """
+        :return: the html of the page, after several attempts if needed
+        """
+        for attempt in range(xhr_replay_config["max_page_attempts"]):
+            try:
+                response = http_session.request(timeout=CONFIG["general"]["request_time_out_in_second"],
+                                                **get_xhr_page_request(template=template, page_index=page_index_))
+                response.raise_for_status()
+                return get_html_from_xhr_response(response=response)
+            except (requests.RequestException, ValueError):
+                if attempt == xhr_replay_config["max_page_attempts"] - 1:
+                    raise
+
+    if first_page_html:
+        add_items(extract_items(first_page_html))
+
+    http_session = get_http_session()
+    for page_index in range(xhr_replay_config["max_pages"]):
+        try:
+            nbr_new_items = add_items(extract_items(request_page(page_index_=page_index)))
+        except (requests.RequestException, ValueError) as e:
+            if page_index:  # The template worked for the first pages: the error is probably temporary
+                msg = f"The page {page_index + 1} of the XHR template of {name} could not be loaded " \
+                      f"({e.__str__()}). The browser will be used."
+            else:
+                msg = f"The XHR template of {name} failed ({e.__str__()}). It is deleted, the browser will be used."
+                delete_xhr_template(name=name)
+            print(f"\n {msg}")
+            LogEvent(level=LogLevel.WARNING.value,
+                     message=msg,
+                     function_name=inspect.currentframe().f_code.co_name).save()
+            return None
+
+        if not nbr_new_items:
+            if not page_index:  # The template does not give any item anymore
+                msg = f"The XHR template of {name} returned no item. It is deleted, the browser will be used."
+                print(msg)
+                LogEvent(level=LogLevel.WARNING.value,
+                         message=msg,
+                         function_name=inspect.currentframe().f_code.co_name).save()
+                delete_xhr_template(name=name)
+                return None
+            break
+
+        print(end=f"\r Loaded page(s): {page_index + 2}, publications n: {len(items)}")
+    else:
+        msg = f"The XHR template of {name} still returned items after {xhr_replay_config['max_pages']} pages " \
+              f"(xhr_replay.max_pages): the next items of the listing are not loaded"
+        print(f"\n {msg}")
+        LogEvent(level=LogLevel.WARNING.value,
+                 message=msg,
+                 function_name=inspect.currentframe().f_code.co_name).save()
+
+    print("")
+    return items
+
+
+def load_listing_items(name: str, extract_items, get_first_page_html, load_items_with_driver, get_item_key=None):
+    """
+    Load all the items of a "Load more" listing: by replaying the XHR template of the scraper if it was recorded in a
+    previous run, else (or if the replay failed) with a browser recording the XHR request (see xhr_discovery).
+    Usage in a scraper:
+        publications_links = load_listing_items(name=self.xhr_template_name,
+                                                extract_items=self.get_publications_list,
+                                                get_first_page_html=self.get_first_page_html,
+                                                load_items_with_driver=self.load_all_publications_with_driver)
+    :param name: name of the scraper (e.g. 'undp-africa')
+    :param extract_items: see replay_xhr_template
+    :param get_first_page_html: function() -> html of the listing before any click, or None
+    :param load_items_with_driver: function(driver) -> list of items, clicking on the "Load more" button
+    :param get_item_key: see replay_xhr_template
+    :return: the list of items
+    """
+    template = load_xhr_template(name=name) if CONFIG["general"]["xhr_replay"]["enabled"] else None
+    if template is not None:
+        first_page_html = get_first_page_html()
+        if first_page_html is not None:
+            items = replay_xhr_template(name=name, template=template, extract_items=extract_items,
+                                        get_item_key=get_item_key, first_page_html=first_page_html)
+            if items is not None:
+                return items
+
+    with xhr_discovery(name=name) as driver:
+        return load_items_with_driver(driver)